@@ -43,10 +43,19 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Database init skipped (may not be configured): {e}")
 
+    from src.services.job_queue import get_job_queue
+    from src.api.agent_events import get_event_queue
+    job_queue = get_job_queue()
+    job_queue.start()
+    event_queue = get_event_queue()
+    event_queue.start()
+
     yield
 
     # Shutdown
     logger.info("Shutting down...")
+    await job_queue.stop()
+    await event_queue.stop()
     await close_db()
 
 
@@ -128,6 +137,7 @@ async def root():
             "websocket": "/v1/ws",
             "models": "/api/v1/models/info",
             "health": "/api/v1/health",
+            "queue_stats": "/api/v1/queue/stats",
             "core_execute": "/api/v1/core/execute",
             "core_agents": "/api/v1/core/agents",
             "core_register": "/api/v1/core/agents/register",
@@ -185,6 +195,11 @@ async def health():
         checks["redis"] = "unavailable"
         overall = "degraded"
 
+    from src.services.task_store import fallback_store_stats
+    checks["fallback_store"] = fallback_store_stats()
+    from src.services.shared_cache import shared_cache_stats
+    checks["shared_cache"] = shared_cache_stats()
+
     # Check OpenRouter key is set (primary LLM gateway)
     settings = get_settings()
     checks["openrouter"] = "configured" if settings.openrouter_api_key else "missing"
@@ -206,4 +221,5 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=settings.service_port,
         reload=True,
+        ws_per_message_deflate=settings.ws_per_message_deflate,
     )
@@ -0,0 +1,494 @@
+"""
+Tests for the orchestrator execution store:
+- LRU/TTL bounds on the in-memory store
+- Serialization round-trips for executions and workflows
+- Resume and checkpoint recovery across orchestrator instances
+- Replicas never resume the same run twice or serve stale paused copies
+- The /orchestrate/{id}/recover route
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../.."))
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+
+def _build_workflow(workflow_id="store_test"):
+    from src.orchestration.orchestrator import WorkflowBuilder
+
+    return (
+        WorkflowBuilder(workflow_id)
+        .name("Store Test")
+        .add_step("step_1", "qa_agent", "check", {"url": "$context.url"}, condition="context.url != None")
+        .add_human_review("review_1")
+        .add_step("step_2", "qa_agent", "final_check", {})
+        .connect("step_1", "review_1")
+        .connect("review_1", "step_2")
+        .build()
+    )
+
+
+def test_in_memory_store_evicts_least_recently_used():
+    from src.orchestration.store import InMemoryExecutionStore
+    from src.orchestration.workflow import WorkflowExecution
+
+    store = InMemoryExecutionStore(max_entries=2)
+    for i in range(3):
+        store.put(WorkflowExecution(id=f"e{i}", workflow_id="w"))
+
+    assert store.peek("e0") is None
+    assert store.peek("e1") is not None
+    assert store.peek("e2") is not None
+
+
+def test_in_memory_store_expires_finished_executions():
+    from src.orchestration.store import InMemoryExecutionStore
+    from src.orchestration.workflow import WorkflowExecution, WorkflowStatus
+
+    store = InMemoryExecutionStore(finished_ttl=0)
+    store.put(WorkflowExecution(id="done", workflow_id="w", status=WorkflowStatus.COMPLETED))
+    store.put(WorkflowExecution(id="running", workflow_id="w", status=WorkflowStatus.RUNNING))
+
+    assert store.peek("done") is None
+    assert store.peek("running") is not None
+
+
+def test_workflow_and_execution_round_trip():
+    from datetime import datetime
+    from src.orchestration.workflow import Workflow, WorkflowExecution, WorkflowStatus
+
+    workflow = _build_workflow()
+    restored = Workflow.from_dict(workflow.to_dict())
+    assert [s.id for s in restored.steps] == [s.id for s in workflow.steps]
+    assert restored.steps[0].condition.expression == "context.url != None"
+    assert restored.steps[1].step_type == workflow.steps[1].step_type
+
+    execution = WorkflowExecution(
+        id="e1", workflow_id="w", status=WorkflowStatus.PAUSED,
+        context={"url": "x"}, completed_steps=["step_1"], started_at=datetime.now(),
+    )
+    restored_exec = WorkflowExecution.from_dict(execution.to_dict())
+    assert restored_exec.checkpointed_at is None
+    assert restored_exec.status == WorkflowStatus.PAUSED
+    assert restored_exec.started_at == execution.started_at
+    assert restored_exec.completed_steps == ["step_1"]
+
+
+def test_trigger_and_condition_description_round_trip():
+    from src.orchestration.workflow import (
+        TriggerType, Workflow, WorkflowCondition, WorkflowTrigger,
+    )
+
+    workflow = _build_workflow()
+    workflow.trigger = WorkflowTrigger(
+        type=TriggerType.EVENT,
+        config={"source": "erp"},
+        event_type="project.created",
+        event_filter={"tier": "premium"},
+    )
+    workflow.steps[0].condition = WorkflowCondition(
+        expression="context.url != None", description="Only when a URL was given",
+    )
+
+    restored = Workflow.from_dict(workflow.to_dict())
+    assert restored.trigger == workflow.trigger
+    assert restored.steps[0].condition == workflow.steps[0].condition
+    assert restored.to_dict() == workflow.to_dict()
+
+
+def test_workflow_from_legacy_checkpoint():
+    from src.orchestration.workflow import TriggerType, Workflow
+
+    data = _build_workflow().to_dict()
+    data.pop("trigger")
+    data["trigger_type"] = "webhook"
+    data["steps"][0]["condition"] = "context.url != None"
+
+    restored = Workflow.from_dict(data)
+    assert restored.trigger.type == TriggerType.WEBHOOK
+    assert restored.steps[0].condition.expression == "context.url != None"
+
+
+class _DictBackend:
+    """Durable-backend stand-in that only keeps serialized checkpoints."""
+
+    def __init__(self):
+        self.executions = {}
+        self.workflows = {}
+
+    async def save_execution(self, execution):
+        self.executions[execution.id] = execution.to_dict()
+
+    async def load_execution(self, execution_id):
+        from src.orchestration.workflow import WorkflowExecution
+        data = self.executions.get(execution_id)
+        return WorkflowExecution.from_dict(data) if data else None
+
+    async def compare_and_set_execution(self, execution, expected_checkpoint):
+        data = self.executions.get(execution.id)
+        expected = expected_checkpoint.isoformat() if expected_checkpoint else None
+        if data is None or data["checkpointed_at"] != expected:
+            return False
+        await self.save_execution(execution)
+        return True
+
+    async def delete_execution(self, execution_id):
+        self.executions.pop(execution_id, None)
+
+    async def save_workflow(self, execution_id, workflow):
+        self.workflows[execution_id] = workflow.to_dict()
+
+    async def load_workflow(self, execution_id):
+        from src.orchestration.workflow import Workflow
+        data = self.workflows.get(execution_id)
+        return Workflow.from_dict(data) if data else None
+
+
+@pytest.mark.asyncio
+async def test_resume_on_another_replica():
+    """A paused execution can be resumed by an orchestrator with a cold cache."""
+    from src.orchestration.orchestrator import AgentOrchestrator
+    from src.orchestration.store import TieredExecutionStore
+    from src.orchestration.workflow import WorkflowStatus
+
+    mock_agent = MagicMock()
+    mock_agent._execute_tool = AsyncMock(return_value={"result": "ok"})
+    backend = _DictBackend()
+
+    first = AgentOrchestrator(
+        agent_factory=lambda agent_id: mock_agent,
+        execution_store=TieredExecutionStore(backend),
+    )
+    execution = await first.run_workflow(_build_workflow(), {"url": "https://example.com"})
+    assert execution.status == WorkflowStatus.PAUSED
+    assert backend.executions[execution.id]["status"] == "paused"
+
+    second = AgentOrchestrator(
+        agent_factory=lambda agent_id: mock_agent,
+        execution_store=TieredExecutionStore(backend),
+    )
+    assert second.get_execution(execution.id) is None
+    resumed = await second.resume_workflow(execution.id, approval=True)
+    assert resumed.status == WorkflowStatus.COMPLETED
+    assert "step_2" in resumed.completed_steps
+    assert backend.executions[execution.id]["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_replica_does_not_serve_stale_paused_copy():
+    """A replica that paused a run sees it finished after another replica resumes it."""
+    from src.orchestration.orchestrator import AgentOrchestrator
+    from src.orchestration.store import TieredExecutionStore
+    from src.orchestration.workflow import WorkflowStatus
+
+    mock_agent = MagicMock()
+    mock_agent._execute_tool = AsyncMock(return_value={"result": "ok"})
+    backend = _DictBackend()
+    first = AgentOrchestrator(
+        agent_factory=lambda agent_id: mock_agent,
+        execution_store=TieredExecutionStore(backend),
+    )
+    second = AgentOrchestrator(
+        agent_factory=lambda agent_id: mock_agent,
+        execution_store=TieredExecutionStore(backend),
+    )
+    execution = await first.run_workflow(_build_workflow(), {"url": "https://example.com"})
+    assert first.get_execution(execution.id).status == WorkflowStatus.PAUSED
+
+    await second.resume_workflow(execution.id, approval=True)
+    assert mock_agent._execute_tool.await_count == 2
+
+    assert (await first.load_execution(execution.id)).status == WorkflowStatus.COMPLETED
+    with pytest.raises(ValueError, match="not paused"):
+        await first.resume_workflow(execution.id, approval=True)
+    assert mock_agent._execute_tool.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_resumes_only_one_wins():
+    """Two replicas that both loaded the paused run can't both continue it."""
+    import asyncio
+    from src.orchestration.orchestrator import AgentOrchestrator, ExecutionConflictError
+    from src.orchestration.store import TieredExecutionStore
+    from src.orchestration.workflow import WorkflowStatus
+
+    class RacingBackend(_DictBackend):
+        """Holds each load until both replicas have read the paused checkpoint."""
+
+        def __init__(self):
+            super().__init__()
+            self.racing = False
+            self.loads = 0
+            self.both_loaded = asyncio.Event()
+
+        async def load_execution(self, execution_id):
+            execution = await super().load_execution(execution_id)
+            if self.racing:
+                self.loads += 1
+                if self.loads == 2:
+                    self.both_loaded.set()
+                await self.both_loaded.wait()
+            return execution
+
+    mock_agent = MagicMock()
+    mock_agent._execute_tool = AsyncMock(return_value={"result": "ok"})
+    backend = RacingBackend()
+    replicas = [
+        AgentOrchestrator(
+            agent_factory=lambda agent_id: mock_agent,
+            execution_store=TieredExecutionStore(backend),
+        )
+        for _ in range(2)
+    ]
+    execution = await replicas[0].run_workflow(_build_workflow(), {"url": "https://example.com"})
+    assert mock_agent._execute_tool.await_count == 1
+
+    backend.racing = True
+    results = await asyncio.gather(
+        *(r.resume_workflow(execution.id, approval=True) for r in replicas),
+        return_exceptions=True,
+    )
+
+    assert sum(isinstance(r, ExecutionConflictError) for r in results) == 1
+    assert [r.status for r in results if not isinstance(r, Exception)] == [WorkflowStatus.COMPLETED]
+    assert mock_agent._execute_tool.await_count == 2  # step_2 ran once
+    assert backend.executions[execution.id]["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_redis_store_expires_definition_with_finished_execution(monkeypatch):
+    import time
+    from src.orchestration.store import ACTIVE_TTL, FINISHED_TTL, RedisExecutionStore
+    from src.orchestration.workflow import WorkflowExecution, WorkflowStatus
+    from src.services import task_store
+
+    async def no_redis():
+        return None
+
+    fallback = task_store.FallbackStore()
+    monkeypatch.setattr(task_store, "_get_redis", no_redis)
+    monkeypatch.setattr(task_store, "_fallback_store", fallback)
+
+    def ttl(key):
+        return fallback._entries[key][1] - time.monotonic()
+
+    store = RedisExecutionStore()
+    execution = WorkflowExecution(id="exec-ttl", workflow_id="w", status=WorkflowStatus.RUNNING)
+    await store.save_execution(execution)
+    await store.save_workflow(execution.id, _build_workflow())
+    assert ttl("workflow_definition:exec-ttl") > FINISHED_TTL
+
+    execution.status = WorkflowStatus.COMPLETED
+    await store.save_execution(execution)
+    assert ttl("workflow_definition:exec-ttl") <= FINISHED_TTL
+    assert ttl("workflow_execution:exec-ttl") <= FINISHED_TTL < ACTIVE_TTL
+
+
+@pytest.mark.asyncio
+async def test_redis_store_compare_and_set_checks_checkpoint(monkeypatch):
+    from datetime import datetime, timedelta
+    from src.orchestration.store import RedisExecutionStore
+    from src.orchestration.workflow import WorkflowExecution, WorkflowStatus
+    from src.services import task_store
+
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(task_store, "_get_redis", no_redis)
+    monkeypatch.setattr(task_store, "_fallback_store", task_store.FallbackStore())
+
+    store = RedisExecutionStore()
+    loaded_at = datetime.now() - timedelta(minutes=5)
+    execution = WorkflowExecution(
+        id="exec-cas", workflow_id="w", status=WorkflowStatus.PAUSED, checkpointed_at=loaded_at,
+    )
+    assert not await store.compare_and_set_execution(execution, None)  # nothing stored yet
+    await store.save_execution(execution)
+
+    execution.status = WorkflowStatus.RUNNING
+    execution.checkpointed_at = datetime.now()
+    assert await store.compare_and_set_execution(execution, loaded_at)
+    assert not await store.compare_and_set_execution(execution, loaded_at)
+    assert (await store.load_execution("exec-cas")).status == WorkflowStatus.RUNNING
+
+
+@pytest.mark.asyncio
+async def test_recover_skips_checkpointed_steps():
+    """recover_workflow() continues a RUNNING execution without re-running completed steps."""
+    from src.orchestration.orchestrator import AgentOrchestrator, WorkflowBuilder
+    from src.orchestration.store import TieredExecutionStore
+    from src.orchestration.workflow import WorkflowExecution, WorkflowStatus
+
+    workflow = (
+        WorkflowBuilder("recover_test")
+        .add_step("s1", "qa_agent", "first", {})
+        .add_step("s2", "qa_agent", "second", {})
+        .connect("s1", "s2")
+        .build()
+    )
+    backend = _DictBackend()
+    execution = WorkflowExecution(
+        id="exec-1", workflow_id=workflow.id, status=WorkflowStatus.RUNNING,
+        step_results={"s1": {"done": True}}, completed_steps=["s1"], current_steps=["s2"],
+    )
+    await backend.save_execution(execution)
+    await backend.save_workflow(execution.id, workflow)
+
+    mock_agent = MagicMock()
+    mock_agent._execute_tool = AsyncMock(return_value={"result": "ok"})
+    orchestrator = AgentOrchestrator(
+        agent_factory=lambda agent_id: mock_agent,
+        execution_store=TieredExecutionStore(backend),
+    )
+    recovered = await orchestrator.recover_workflow("exec-1")
+
+    assert recovered.status == WorkflowStatus.COMPLETED
+    assert recovered.completed_steps == ["s1", "s2"]
+    mock_agent._execute_tool.assert_awaited_once_with("second", {})
+
+
+@pytest.mark.asyncio
+async def test_memoized_step_skips_agent_on_rerun():
+    """Steps with memoize=True reuse stored results for identical input."""
+    from src.orchestration.orchestrator import AgentOrchestrator, WorkflowBuilder
+    from src.orchestration.store import InMemoryExecutionStore
+    from src.orchestration.workflow import WorkflowStatus
+
+    workflow = (
+        WorkflowBuilder("memo_test")
+        .add_step("research", "competitor_agent", "research", {"brand": "$brand"}, memoize=True)
+        .add_step("report", "report_agent", "summarize", {})
+        .connect("research", "report")
+        .build()
+    )
+    mock_agent = MagicMock()
+    mock_agent._execute_tool = AsyncMock(return_value={"result": "ok"})
+    orchestrator = AgentOrchestrator(
+        agent_factory=lambda agent_id: mock_agent,
+        execution_store=InMemoryExecutionStore(),
+    )
+
+    await orchestrator.run_workflow(workflow, {"brand": "acme"}, organization_id="org-1")
+    assert mock_agent._execute_tool.await_count == 2
+
+    execution = await orchestrator.run_workflow(workflow, {"brand": "acme"}, organization_id="org-1")
+    assert execution.status == WorkflowStatus.COMPLETED
+    assert mock_agent._execute_tool.await_count == 3  # only the non-memoized step re-ran
+
+    await orchestrator.run_workflow(workflow, {"brand": "acme"}, organization_id="org-2")
+    assert mock_agent._execute_tool.await_count == 5  # results are not shared across orgs
+
+    workflow.steps[0].memo_version = "2"
+    await orchestrator.run_workflow(workflow, {"brand": "acme"}, organization_id="org-1")
+    assert mock_agent._execute_tool.await_count == 7  # version bump invalidates
+
+
+async def _recover_via_route(monkeypatch, backend, execution_id, mock_agent, **params):
+    from fastapi import FastAPI
+    from httpx import ASGITransport, AsyncClient
+
+    import src.services  # noqa: F401 -- import before src.api to avoid the agents/services cycle
+    from src.api import routes
+    from src.orchestration.store import TieredExecutionStore
+
+    store = TieredExecutionStore(backend)
+    monkeypatch.setattr(routes, "get_execution_store", lambda: store)
+    monkeypatch.setattr(routes, "_resolve_agent", lambda agent_id: mock_agent)
+
+    app = FastAPI()
+    app.include_router(routes.router)
+    app.dependency_overrides[routes.verify_service_key] = lambda: None
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return await client.post(f"/api/v1/orchestrate/{execution_id}/recover", params=params)
+
+
+@pytest.mark.asyncio
+async def test_recover_route_continues_execution_from_dead_replica(monkeypatch):
+    """A run interrupted after its first step is finished by another replica via the API."""
+    import asyncio
+    from datetime import datetime, timedelta
+    from src.orchestration.orchestrator import AgentOrchestrator, WorkflowBuilder
+    from src.orchestration.store import TieredExecutionStore
+    from src.orchestration.workflow import WorkflowStatus
+
+    workflow = (
+        WorkflowBuilder("recover_route")
+        .add_step("s1", "qa_agent", "first", {})
+        .add_step("s2", "qa_agent", "second", {})
+        .connect("s1", "s2")
+        .build()
+    )
+    backend = _DictBackend()
+
+    # First replica dies while the second step is in flight
+    blocked = asyncio.Event()
+    dying_agent = MagicMock()
+
+    async def execute(tool, tool_input):
+        if tool == "second":
+            blocked.set()
+            await asyncio.Event().wait()
+        return {"result": tool}
+
+    dying_agent._execute_tool = AsyncMock(side_effect=execute)
+    first = AgentOrchestrator(
+        agent_factory=lambda agent_id: dying_agent,
+        execution_store=TieredExecutionStore(backend),
+    )
+    run = asyncio.create_task(first.run_workflow(workflow, {}))
+    await blocked.wait()
+    # A crashed process writes nothing more; keep the checkpoint as it was
+    (execution_id, checkpoint), = [(k, dict(v)) for k, v in backend.executions.items()]
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+    backend.executions[execution_id] = checkpoint
+    assert checkpoint["status"] == "running"
+    assert checkpoint["completed_steps"] == ["s1"]
+
+    survivor = MagicMock()
+    survivor._execute_tool = AsyncMock(return_value={"result": "ok"})
+
+    # A fresh checkpoint may belong to a replica that's still working
+    resp = await _recover_via_route(monkeypatch, backend, execution_id, survivor)
+    assert resp.status_code == 409
+    survivor._execute_tool.assert_not_awaited()
+
+    stale = datetime.now() - timedelta(hours=1)
+    backend.executions[execution_id]["checkpointed_at"] = stale.isoformat()
+    resp = await _recover_via_route(monkeypatch, backend, execution_id, survivor)
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "completed"
+    assert resp.json()["completed_steps"] == ["s1", "s2"]
+    survivor._execute_tool.assert_awaited_once_with("second", {})
+    assert backend.executions[execution_id]["status"] == "completed"
+
+    # Finished executions can't be recovered again
+    resp = await _recover_via_route(monkeypatch, backend, execution_id, survivor, force="true")
+    assert resp.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_recover_route_force_and_missing(monkeypatch):
+    from src.orchestration.orchestrator import WorkflowBuilder
+    from src.orchestration.workflow import WorkflowExecution, WorkflowStatus
+    from datetime import datetime
+
+    workflow = WorkflowBuilder("recover_force").add_step("s1", "qa_agent", "first", {}).build()
+    backend = _DictBackend()
+    await backend.save_execution(WorkflowExecution(
+        id="exec-f", workflow_id=workflow.id, status=WorkflowStatus.RUNNING,
+        checkpointed_at=datetime.now(),
+    ))
+    await backend.save_workflow("exec-f", workflow)
+    agent = MagicMock()
+    agent._execute_tool = AsyncMock(return_value={"result": "ok"})
+
+    resp = await _recover_via_route(monkeypatch, backend, "missing", agent)
+    assert resp.status_code == 404
+
+    resp = await _recover_via_route(monkeypatch, backend, "exec-f", agent, force="true")
+    assert resp.status_code == 200
+    assert resp.json()["completed_steps"] == ["s1"]
@@ -0,0 +1,116 @@
+"""
+Tests for orchestrator step retries:
+- Per-error retry policies
+- Backoff releases the concurrency slot
+- Workflow deadlines bound attempts and retries
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../.."))
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+
+def test_retry_policy_full_jitter_is_capped():
+    from src.orchestration.workflow import RetryPolicy
+
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    for attempt in range(10):
+        assert 0 <= policy.backoff(attempt) <= 4.0
+
+
+def test_retry_policy_filters_error_kinds():
+    from src.orchestration.workflow import RetryPolicy
+
+    policy = RetryPolicy(retry_on=["timeout"], non_retryable=["401"])
+    assert policy.should_retry("timeout", "Step timed out")
+    assert not policy.should_retry("exception", "boom")
+    assert not policy.should_retry("timeout", "HTTP 401 Unauthorized")
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_error_fails_without_retrying():
+    from src.orchestration.orchestrator import AgentOrchestrator, WorkflowBuilder
+    from src.orchestration.workflow import RetryPolicy, WorkflowStatus
+
+    workflow = WorkflowBuilder("no_retry").add_step("s1", "qa_agent", "check", {}).build()
+    workflow.steps[0].retry_count = 3
+    workflow.steps[0].retry_policy = RetryPolicy(non_retryable=["invalid api key"])
+
+    mock_agent = MagicMock()
+    mock_agent._execute_tool = AsyncMock(return_value={"error": "invalid api key"})
+    orchestrator = AgentOrchestrator(agent_factory=lambda agent_id: mock_agent)
+
+    execution = await orchestrator.run_workflow(workflow, {})
+    assert execution.status == WorkflowStatus.FAILED
+    assert mock_agent._execute_tool.await_count == 1
+    assert execution.failed_steps["s1"]["error"] == "invalid api key"
+
+
+@pytest.mark.asyncio
+async def test_backoff_does_not_hold_concurrency_slot():
+    """With one slot, a sibling runs while the flaky step is backing off."""
+    from src.orchestration.orchestrator import AgentOrchestrator, WorkflowBuilder
+    from src.orchestration.workflow import RetryPolicy, StepType, WorkflowStatus
+
+    workflow = (
+        WorkflowBuilder("slots")
+        .add_step("flaky", "qa_agent", "flaky", {}, step_type=StepType.PARALLEL)
+        .add_step("steady", "qa_agent", "steady", {}, step_type=StepType.PARALLEL)
+        .build()
+    )
+    workflow.max_parallel_steps = 1
+    workflow.steps[0].retry_count = 2
+    workflow.steps[0].retry_policy = RetryPolicy(base_delay=0.2, max_delay=0.2)
+
+    calls = []
+    flaky_attempts = 0
+
+    async def execute_tool(tool, tool_input):
+        nonlocal flaky_attempts
+        calls.append(tool)
+        if tool == "flaky":
+            flaky_attempts += 1
+            if flaky_attempts == 1:
+                return {"error": "upstream 503"}
+        return {"ok": True}
+
+    mock_agent = MagicMock()
+    mock_agent._execute_tool = execute_tool
+    orchestrator = AgentOrchestrator(agent_factory=lambda agent_id: mock_agent)
+
+    # Force a non-zero jitter so the retry actually waits
+    workflow.steps[0].retry_policy.backoff = lambda attempt: 0.05
+    execution = await orchestrator.run_workflow(workflow, {})
+
+    assert execution.status == WorkflowStatus.COMPLETED
+    assert calls == ["flaky", "steady", "flaky"]
+
+
+@pytest.mark.asyncio
+async def test_workflow_deadline_caps_step_timeout():
+    from src.orchestration.orchestrator import AgentOrchestrator, WorkflowBuilder
+    from src.orchestration.workflow import WorkflowStatus
+
+    workflow = WorkflowBuilder("deadline").add_step("slow", "qa_agent", "slow", {}).build()
+    workflow.timeout_seconds = 0.05
+    workflow.steps[0].retry_count = 3
+
+    async def slow_tool(tool, tool_input):
+        await asyncio.sleep(1)
+        return {"ok": True}
+
+    mock_agent = MagicMock()
+    mock_agent._execute_tool = slow_tool
+    orchestrator = AgentOrchestrator(agent_factory=lambda agent_id: mock_agent)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    execution = await orchestrator.run_workflow(workflow, {})
+
+    assert execution.status == WorkflowStatus.FAILED
+    assert loop.time() - started < 0.5
+    assert "timed out" in execution.failed_steps["slow"]["error"]
@@ -27,6 +27,7 @@ from ..protocols.work import (
 )
 from ..protocols.artifacts import ArtifactEvent, ArtifactEventType, Artifact, ArtifactType, ArtifactPreview, ARTIFACT_DATA_SCHEMAS, validate_artifact_data
 from ..protocols.events import MessageWithAttachments
+from ..protocols.sse import DeltaCoalescer, sse_frame
 from ..tools.erp_tool_definitions import (
     ERP_READ_TOOLS, ERP_WRITE_TOOLS, AGENT_WRITE_TOOL_MAP,
     ERP_TOOL_NAMES,
@@ -74,6 +75,9 @@ class AgentContext:
     # Format-aware creation (Mission Control routing)
     artifact_format: Optional[str] = None  # e.g., "calendar", "deck", "brief"
 
+    # Prior conversation turns ({"role", "content"}), oldest first
+    history: list[dict] = field(default_factory=list)
+
     # SSE callback for emitting events
     _sse_callback: Optional[Callable] = field(default=None, repr=False)
 
@@ -163,6 +167,10 @@ class BaseAgent(ABC):
                     if tool_def["function"]["name"] in moodboard_tool_names:
                         self.tools.append(tool_def)
 
+        self.reset_run_state()
+
+    def reset_run_state(self) -> None:
+        """Clear per-run tracking so a cached agent can serve the next turn."""
         # State tracking
         self._state = AgentState.IDLE
         self._work_state: Optional[AgentWorkState] = None
@@ -815,10 +823,29 @@ class BaseAgent(ABC):
         Execute the agent loop: Think → Act → Create
         With state machine transitions and work event emission.
         """
+        try:
+            return await self._run_loop(context)
+        except asyncio.CancelledError:
+            # Caller cancelled (chat:cancel, disconnect, shutdown): drop any
+            # in-flight LLM/provider connections before propagating.
+            await self._abort()
+            raise
+
+    async def _abort(self) -> None:
+        """Close LLM and provider clients so cancelled runs stop billing."""
+        for close in (getattr(self.client, "close", None), self.close):
+            if close is None:
+                continue
+            try:
+                await close()
+            except Exception:
+                pass
+
+    async def _run_loop(self, context: AgentContext) -> AgentResult:
         # THINKING
         await self._set_state(AgentState.THINKING, context)
 
-        messages = [self._build_user_message(context)]
+        messages = [*context.history, self._build_user_message(context)]
         all_outputs = []
         artifact_emitted = False
 
@@ -949,12 +976,14 @@ class BaseAgent(ABC):
         event_queue: asyncio.Queue[str] = asyncio.Queue()
 
         async def sse_callback(event: dict):
-            await event_queue.put(f"data: {json.dumps(event)}\n\n")
+            await event_queue.put(sse_frame(event))
 
         context._sse_callback = sse_callback
 
-        messages = [self._build_user_message(context)]
+        messages = [*context.history, self._build_user_message(context)]
         artifact_emitted = False
+        # Token deltas are merged into one message:stream frame per window
+        deltas = DeltaCoalescer()
 
         while True:
             # Accumulate the full response from streaming chunks
@@ -980,7 +1009,9 @@ class BaseAgent(ABC):
                 # Stream text content
                 if delta.get("content"):
                     full_text += delta["content"]
-                    yield f"data: {json.dumps({'type': 'message:stream', 'text': delta['content']})}\n\n"
+                    frame = deltas.add(delta["content"])
+                    if frame:
+                        yield frame
 
                 # Accumulate tool calls from deltas
                 for tc_delta in delta.get("tool_calls", []):
@@ -999,6 +1030,10 @@ class BaseAgent(ABC):
                     if func_delta.get("arguments"):
                         tool_calls_accum[idx]["function"]["arguments"] += func_delta["arguments"]
 
+            frame = deltas.flush()
+            if frame:
+                yield frame
+
             # No tool calls — we're done
             if not tool_calls_accum:
                 break
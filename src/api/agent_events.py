@@ -3,18 +3,39 @@ Agent Event Handler — receives events routed by spokestack-core's event proces
 
 When a subscription has handler: "agent:{agentId}", core posts the event here.
 The agent is triggered with the event as context.
+
+Deliveries are queued rather than run inline:
+- Dedup: a retried webhook delivery (same X-Event-Id, or same body when no
+  id is sent) within agent_event_dedup_ttl is acknowledged but not re-run.
+- Coalescing: the first event for an agent and entity queues a run delayed
+  by agent_event_coalesce_seconds; events that arrive before it starts are
+  folded into that single run.
+- Per-org caps: runs go through a dedicated job queue whose tenants are
+  organizations, capped at agent_event_org_concurrency per process.
+- Retries: a failed run puts its events back and queues a fresh run with
+  backoff, up to job_queue_max_deliveries attempts.
 """
 
+import hashlib
 import json
 import logging
-import os
 from typing import Optional
 
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException
 from pydantic import BaseModel, Field
 
+from .auth import require_agent_secret
+from ..services.job_queue import JobQueue, register_job_handler
+from ..services.task_store import store_add, store_delete, list_append, list_pop_all
+from ..services.shared_cache import events_cache, integrations_cache
+
 logger = logging.getLogger(__name__)
 
+_DEDUP_PREFIX = "agent_event_dedup:"
+_BATCH_PREFIX = "agent_event_batch:"
+_JOB_KIND = "agent_event"
+_RETRY_BACKOFF = 10.0  # Seconds, multiplied by the attempt number
+
 router = APIRouter(prefix="/api/v1/agent-events", tags=["agent-events"])
 
 
@@ -38,14 +59,6 @@ class AgentEventResponse(BaseModel):
     message: str = ""
 
 
-def _validate_agent_secret(x_agent_secret: Optional[str]):
-    expected = os.environ.get("AGENT_RUNTIME_SECRET", "")
-    if not expected:
-        return
-    if not x_agent_secret or x_agent_secret != expected:
-        raise HTTPException(status_code=401, detail="Invalid or missing X-Agent-Secret")
-
-
 def format_event_for_agent(event: EventPayload) -> str:
     """Build a human-readable message from an event."""
     msg = f"Event: {event.entityType} was {event.action} (ID: {event.entityId})"
@@ -61,18 +74,139 @@ def format_event_for_agent(event: EventPayload) -> str:
     return msg
 
 
-@router.post("", response_model=AgentEventResponse)
+def format_batch_for_agent(events: list[EventPayload]) -> str:
+    """Build one agent message from a coalesced burst of events."""
+    if len(events) == 1:
+        return format_event_for_agent(events[0])
+    first = events[0]
+    lines = [f"{len(events)} events for {first.entityType} {first.entityId}:"]
+    lines.extend(f"- {format_event_for_agent(event)}" for event in events)
+    return "\n".join(lines)
+
+
+def _dedup_key(request: AgentEventRequest, event_id: Optional[str]) -> str:
+    if not event_id:
+        body = json.dumps(request.model_dump(), sort_keys=True, default=str)
+        event_id = hashlib.sha256(body.encode()).hexdigest()
+    return f"{_DEDUP_PREFIX}{request.organizationId}:{event_id}"
+
+
+def _batch_key(request: AgentEventRequest) -> str:
+    event = request.event
+    return f"{_BATCH_PREFIX}{request.agentId}:{request.organizationId}:{event.entityType}:{event.entityId}"
+
+
+# ── Event run queue ──────────────────────────────────────────────
+
+_event_queue: Optional[JobQueue] = None
+
+
+def get_event_queue() -> JobQueue:
+    """Job queue for event-triggered runs, one tenant per organization."""
+    global _event_queue
+    if _event_queue is None:
+        from ..config import get_settings
+        settings = get_settings()
+        _event_queue = JobQueue(
+            workers=settings.agent_event_workers,
+            tenant_concurrency=settings.agent_event_org_concurrency,
+            visibility_timeout=settings.job_queue_visibility_timeout,
+            max_deliveries=settings.job_queue_max_deliveries,
+            namespace="agent_events",
+        )
+    return _event_queue
+
+
+def _batch_ttl() -> int:
+    from ..config import get_settings
+    settings = get_settings()
+    return settings.job_queue_visibility_timeout * settings.job_queue_max_deliveries
+
+
+async def _enqueue_event_batch(payload: dict, delay: float) -> None:
+    await get_event_queue().enqueue(
+        _JOB_KIND, payload, tenant_id=payload["organization_id"], delay=delay,
+    )
+
+
+async def _retry_event_batch(payload: dict, events: list[EventPayload], error: Exception) -> None:
+    """
+    Put a failed run's events back and queue a new run for them.
+
+    The retry is queued explicitly: events arriving meanwhile see a
+    non-empty batch and do not queue one themselves.
+    """
+    from ..config import get_settings
+    attempt = payload.get("attempt", 1)
+    if attempt >= get_settings().job_queue_max_deliveries:
+        logger.error(
+            f"[agent-event] dropping {len(events)} events for agent={payload['agent_id']} "
+            f"org={payload['organization_id']} after {attempt} attempts: {error}"
+        )
+        return
+    for event in events:
+        await list_append(payload["batch_key"], event.model_dump(), ttl=_batch_ttl())
+    logger.warning(
+        f"[agent-event] run for agent={payload['agent_id']} org={payload['organization_id']} "
+        f"failed (attempt {attempt}), retrying: {error}"
+    )
+    await _enqueue_event_batch({**payload, "attempt": attempt + 1}, delay=_RETRY_BACKOFF * attempt)
+
+
+async def _run_event_batch(payload: dict) -> None:
+    """Job handler: run the agent once over every event coalesced for the entity."""
+    events = [EventPayload(**item) for item in await list_pop_all(payload["batch_key"])]
+    if not events:
+        return  # Already taken by an earlier delivery of this job
+
+    from .core_router import CoreExecuteRequest, execute_core_agent
+    request = CoreExecuteRequest(
+        task=format_batch_for_agent(events),
+        agent_type=payload["agent_id"],
+        org_id=payload["organization_id"],
+        org_tier=events[-1].metadata.get("orgTier", "FREE"),
+        metadata={
+            "trigger": "agent_event",
+            "events": [event.model_dump() for event in events],
+        },
+    )
+    try:
+        response = await execute_core_agent(request, BackgroundTasks())
+    except Exception as e:
+        await _retry_event_batch(payload, events, e)
+        return
+    logger.info(
+        f"[agent-event] ran agent={payload['agent_id']} org={payload['organization_id']} "
+        f"events={len(events)} status={response.status}"
+    )
+
+
+register_job_handler(_JOB_KIND, _run_event_batch)
+
+
+async def _invalidate_org_caches(request: AgentEventRequest) -> None:
+    """A new event makes the org's cached recent events stale (and integrations, if it is one)."""
+    org_id = request.organizationId
+    await events_cache.invalidate(org_id)
+    if "integration" in request.event.entityType.lower():
+        await integrations_cache.invalidate(org_id)
+
+
+@router.post("", response_model=AgentEventResponse, dependencies=[Depends(require_agent_secret)])
 async def handle_agent_event(
     request: AgentEventRequest,
-    x_agent_secret: Optional[str] = Header(default=None, alias="X-Agent-Secret"),
+    x_event_id: Optional[str] = Header(default=None, alias="X-Event-Id"),
 ):
     """
     Receive an event routed by spokestack-core's event processor.
 
     When a subscription has handler: "agent:{agentId}", core posts here.
-    The agent is triggered with the event formatted as a context message.
+    The event is queued and the agent triggered with it formatted as a
+    context message; duplicates and bursts for the same entity collapse
+    into a single run.
     """
-    _validate_agent_secret(x_agent_secret)
+    from ..config import get_settings
+    settings = get_settings()
 
     event_message = format_event_for_agent(request.event)
 
@@ -82,14 +216,39 @@ async def handle_agent_event(
         f"entity={request.event.entityId}"
     )
 
-    # For now, log the event trigger. Full agent session triggering
-    # requires async execution (background task or queue), which will
-    # be wired when the agent session infrastructure supports it.
-    # The event data is captured and available for when we add
-    # trigger_agent_session().
+    dedup_key = _dedup_key(request, x_event_id)
+    if not await store_add(dedup_key, {"agentId": request.agentId}, ttl=settings.agent_event_dedup_ttl):
+        return AgentEventResponse(
+            ok=True,
+            agentId=request.agentId,
+            message=f"Duplicate delivery ignored: {event_message}",
+        )
+
+    await _invalidate_org_caches(request)
+
+    try:
+        batch_key = _batch_key(request)
+        pending = await list_append(batch_key, request.event.model_dump(), ttl=_batch_ttl())
+        if pending == 1:
+            await _enqueue_event_batch(
+                {
+                    "batch_key": batch_key,
+                    "agent_id": request.agentId,
+                    "organization_id": request.organizationId,
+                },
+                delay=settings.agent_event_coalesce_seconds,
+            )
+    except Exception as e:
+        # Let core retry the delivery
+        await store_delete(dedup_key)
+        logger.error(f"[agent-event] failed to queue event: {e}")
+        raise HTTPException(status_code=503, detail="Event could not be queued")
 
     return AgentEventResponse(
         ok=True,
         agentId=request.agentId,
-        message=f"Event received: {event_message}",
+        message=(
+            f"Event queued: {event_message}" if pending == 1
+            else f"Event coalesced into pending run ({pending} events): {event_message}"
+        ),
     )
@@ -5,17 +5,24 @@ Validates requests using API key or ERP callback signature.
 - Public endpoints (health, docs) are excluded.
 - All /api/v1/* endpoints require a valid API key via X-API-Key header
   or a valid ERP webhook signature via X-Webhook-Signature header.
+
+The authenticated caller and its org/instance scope are stored on
+request.state.principal, so handlers read them with get_principal()
+instead of re-reading headers or re-checking secrets.
 """
 
 import hmac
 import hashlib
-import json
 import os
 import logging
-from fastapi import Request, Security
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+from fastapi import Header, HTTPException, Request
 from fastapi.security import APIKeyHeader
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
@@ -32,64 +39,171 @@ PUBLIC_PATHS = {
     "/dashboard",
 }
 
+# Credential kinds and the environment variable each is checked against
+API_KEY = "api_key"
+AGENT_SECRET = "agent_secret"
+WEBHOOK_SIGNATURE = "webhook_signature"
+_CREDENTIAL_ENV = {
+    API_KEY: "ERP_API_KEY",
+    AGENT_SECRET: "AGENT_RUNTIME_SECRET",
+}
 
-class APIKeyAuthMiddleware(BaseHTTPMiddleware):
-    """Middleware that enforces API key authentication on protected routes."""
-
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path.rstrip("/") or "/"
-
-        # Allow public endpoints
-        if path in PUBLIC_PATHS:
-            return await call_next(request)
-
-        # Allow WebSocket upgrades (WS auth handled at connection level)
-        if path.startswith("/v1/ws"):
-            return await call_next(request)
 
-        # Only protect /api/* routes
-        if not path.startswith("/api/"):
-            return await call_next(request)
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated caller and the org/instance scope its request claims."""
+    auth_method: str  # api_key, agent_secret or webhook_signature
+    organization_id: Optional[str] = None
+    instance_id: Optional[str] = None
+    module_subdomain: Optional[str] = None
+
+
+def verify_credential(kind: str, credential: Optional[str]) -> bool:
+    """Check an API key or agent secret against its configured value in constant time."""
+    expected = (os.environ.get(_CREDENTIAL_ENV[kind]) or "").strip()
+    credential = (credential or "").strip()
+    if not credential or not expected:
+        return False
+    return hmac.compare_digest(credential, expected)
+
+
+@lru_cache(maxsize=4)
+def _keyed_mac(secret: str) -> "hmac.HMAC":
+    """HMAC-SHA256 state with the key already absorbed; copy it per request."""
+    return hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+
+def get_principal(request: Request) -> Optional[Principal]:
+    """The principal resolved by APIKeyAuthMiddleware, if any."""
+    return getattr(request.state, "principal", None)
+
+
+def require_agent_secret(
+    request: Request,
+    x_agent_secret: Optional[str] = Header(default=None, alias="X-Agent-Secret"),
+) -> None:
+    """
+    Dependency for endpoints only spokestack-core may call.
+
+    A request the middleware already admitted on its agent secret is not
+    checked again; one admitted another way must still carry the secret.
+    """
+    if not os.environ.get(_CREDENTIAL_ENV[AGENT_SECRET]):
+        logger.warning("AGENT_RUNTIME_SECRET not configured — core endpoints unprotected")
+        return
+    principal = get_principal(request)
+    if principal is not None and principal.auth_method == AGENT_SECRET:
+        return
+    if not verify_credential(AGENT_SECRET, x_agent_secret):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Agent-Secret")
+
+
+def _set_principal(scope: Scope, headers: Headers, auth_method: str) -> None:
+    scope.setdefault("state", {})["principal"] = Principal(
+        auth_method=auth_method,
+        organization_id=headers.get("X-Organization-Id") or None,
+        instance_id=headers.get("X-Instance-Id") or None,
+        module_subdomain=headers.get("X-Module-Subdomain") or None,
+    )
+
+
+async def _read_signed_body(receive: Receive, secret: str) -> tuple[bytes, str] | None:
+    """
+    Read the request body once, computing its HMAC-SHA256 as chunks arrive.
+
+    Returns (body, "sha256=<hex>"), or None if the client disconnected.
+    """
+    mac = _keyed_mac(secret).copy()
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return None
+        chunk = message.get("body", b"")
+        mac.update(chunk)
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks), "sha256=" + mac.hexdigest()
+
+
+def _replay_body(body: bytes, receive: Receive) -> Receive:
+    """Receive callable that yields the already-read body, then defers."""
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+class APIKeyAuthMiddleware:
+    """
+    Pure ASGI middleware that enforces API key authentication on protected
+    routes. Responses pass through untouched, so streaming bodies are not
+    buffered or re-wrapped.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # WebSocket auth is handled at connection level
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"].rstrip("/") or "/"
+
+        # Allow public endpoints, and only protect /api/* routes
+        if path in PUBLIC_PATHS or not path.startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
 
         # Check X-API-Key header (LMTD ERP auth)
-        api_key = (request.headers.get("X-API-Key") or "").strip()
-        expected_key = (os.environ.get("ERP_API_KEY") or "").strip()
-
-        logger.debug(f"Auth check: key_provided={bool(api_key)}, key_configured={bool(expected_key)}, key_len={len(api_key)}/{len(expected_key)}")
-
-        if api_key and expected_key and hmac.compare_digest(api_key, expected_key):
-            return await call_next(request)
+        if verify_credential(API_KEY, headers.get("X-API-Key")):
+            _set_principal(scope, headers, API_KEY)
+            await self.app(scope, receive, send)
+            return
 
         # Check X-Agent-Secret header (spokestack-core auth)
         # Core endpoints validate the secret themselves, but we let them through the middleware
-        agent_secret = (request.headers.get("X-Agent-Secret") or "").strip()
-        expected_agent_secret = (os.environ.get("AGENT_RUNTIME_SECRET") or "").strip()
-        if agent_secret and expected_agent_secret and hmac.compare_digest(agent_secret, expected_agent_secret):
-            return await call_next(request)
+        if verify_credential(AGENT_SECRET, headers.get("X-Agent-Secret")):
+            _set_principal(scope, headers, AGENT_SECRET)
+            await self.app(scope, receive, send)
+            return
 
         # Check ERP webhook HMAC signature
-        signature = request.headers.get("X-Webhook-Signature")
+        signature = headers.get("X-Webhook-Signature")
         callback_secret = os.environ.get("ERP_CALLBACK_SECRET", "")
         if signature and callback_secret:
-            body = await request.body()
-            expected_sig = "sha256=" + hmac.new(
-                callback_secret.encode(), body, hashlib.sha256
-            ).hexdigest()
+            signed = await _read_signed_body(receive, callback_secret)
+            if signed is None:
+                return  # Client went away mid-body
+            body, expected_sig = signed
             if not hmac.compare_digest(signature, expected_sig):
                 logger.warning(f"Invalid HMAC signature for {path}")
-                return JSONResponse(
+                response = JSONResponse(
                     status_code=401,
                     content={"detail": "Invalid webhook signature"},
                 )
-            # Re-attach body so downstream handlers can read it
-            async def receive():
-                return {"type": "http.request", "body": body}
-            request._receive = receive
-            return await call_next(request)
-
-        # No valid auth — return 401 (not raise, to avoid Starlette middleware bug)
-        logger.warning(f"Unauthorized request to {path} from {request.client.host}")
-        return JSONResponse(
+                await response(scope, receive, send)
+                return
+            # Hand the already-read body to downstream handlers
+            _set_principal(scope, headers, WEBHOOK_SIGNATURE)
+            await self.app(scope, _replay_body(body, receive), send)
+            return
+
+        # No valid auth — return 401
+        client = scope.get("client")
+        logger.warning(f"Unauthorized request to {path} from {client[0] if client else 'unknown'}")
+        response = JSONResponse(
             status_code=401,
             content={"detail": "Missing or invalid API key"},
         )
+        await response(scope, receive, send)
@@ -29,6 +29,7 @@ from ..protocols.events import (
     resolve_agent_type,
 )
 from ..protocols.handoffs import HandoffRequest, HandoffResponse
+from ..protocols.sse import batch_frames
 from ..protocols.state import AgentState
 from ..protocols.errors import AgentError, ERROR_CODES
 from ..services.task_store import save_session, get_session, delete_session
@@ -182,7 +183,7 @@ async def send_chat_message(chat_id: str, request: ChatMessageRequest):
             session["state"] = AgentState.ERROR.value
 
     return StreamingResponse(
-        generate(),
+        batch_frames(generate()),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
     )
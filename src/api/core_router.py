@@ -7,23 +7,26 @@ Phase 3 additions:
 - Agent handoff detection (delegate_to_agent tool call → structured response)
 """
 
+import asyncio
 import json
 import logging
-import os
+import re
 import uuid
 from typing import Any, Literal, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Header, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from src.agents.base import AgentContext
 from src.services.openrouter import OpenRouterClient
+from src.protocols.sse import batch_frames
 from src.services.core_config_builder import (
     build_agent_config, get_available_agents, CORE_AGENT_TYPES,
     AGENT_MODEL_MAP, tier_has_access, AGENT_TIER_REQUIREMENTS,
 )
 from src.services.context_injector import inject_context_into_prompt
+from src.services.request_context import CoreRequestContext
 from src.tools.core_tool_definitions import (
     CORE_INTENT_PATTERNS, ENTERPRISE_INTENT_PATTERNS,
     DAM_INTENT_PATTERNS, EVENT_INTENT_PATTERNS,
@@ -31,9 +34,11 @@ from src.tools.core_tool_definitions import (
 from src.tools.core_toolkit import CoreToolkit
 from src.tools.spokestack_handoff import is_handoff_tool_call, build_handoff_response
 from src.modules import registry_store
-from src.modules.module_checker import get_installed_modules
+from src.modules.module_checker import get_org_module_records
+from src.services.shared_cache import integrations_cache, events_cache
 from src.modules.upsell_messages import get_upsell_message
 from src.config import get_settings
+from src.api.auth import require_agent_secret
 
 logger = logging.getLogger(__name__)
 
@@ -212,64 +217,179 @@ def _load_agent_class(agent_type: str):
 
 
 # ══════════════════════════════════════════════════════════════
-# Cached Integrations Fetcher (5-minute TTL)
+# Cached Integrations/Events Fetchers (shared two-tier cache)
 # ══════════════════════════════════════════════════════════════
 
-import time as _time
-
-_integrations_cache: dict[str, tuple[list[dict], float]] = {}
-_INTEGRATIONS_TTL = 300  # 5 minutes
-
-_events_cache: dict[str, tuple[list[dict], float]] = {}
-_EVENTS_TTL = 120  # 2 minutes
-
 
 async def _get_cached_integrations(org_id: str, toolkit) -> list[dict]:
-    """Fetch integrations with 5-minute TTL cache."""
-    now = _time.monotonic()
-    cached = _integrations_cache.get(org_id)
-    if cached and now < cached[1]:
-        return cached[0]
-
-    try:
+    """Fetch integrations through the shared cache (5-minute TTL)."""
+    async def load() -> list[dict]:
         result = await toolkit.list_integrations()
         connections = result.get("connections", result.get("data", []))
-        if isinstance(connections, list):
-            _integrations_cache[org_id] = (connections, now + _INTEGRATIONS_TTL)
-            return connections
+        if not isinstance(connections, list):
+            raise ValueError(f"unexpected integrations payload: {type(connections).__name__}")
+        return connections
+
+    try:
+        return await integrations_cache.get(org_id, load)
     except Exception as e:
         logger.debug(f"Failed to fetch integrations for {org_id}: {e}")
-        if cached:
-            return cached[0]
-    return []
+        return []
 
 
 async def _get_cached_events(org_id: str, toolkit) -> list[dict]:
-    """Fetch recent events (last 15 min) with 2-minute TTL cache."""
-    now = _time.monotonic()
-    cached = _events_cache.get(org_id)
-    if cached and now < cached[1]:
-        return cached[0]
-
-    try:
+    """Fetch recent events (last 15 min) through the shared cache (2-minute TTL)."""
+    async def load() -> list[dict]:
         from datetime import datetime, timedelta, timezone as tz
         since = (datetime.now(tz.utc) - timedelta(minutes=15)).isoformat()
         result = await toolkit.list_recent_events(limit=10, since=since)
         events = result.get("data", result) if isinstance(result, dict) else result
-        if isinstance(events, list):
-            _events_cache[org_id] = (events, now + _EVENTS_TTL)
-            return events
+        if not isinstance(events, list):
+            raise ValueError(f"unexpected events payload: {type(events).__name__}")
+        return events
+
+    try:
+        return await events_cache.get(org_id, load)
     except Exception as e:
         logger.debug(f"Failed to fetch events for {org_id}: {e}")
-        if cached:
-            return cached[0]
-    return []
+        return []
+
+
+async def prefetch_core_context(
+    request: "CoreExecuteRequest",
+    org_id: str,
+    toolkit,
+) -> CoreRequestContext:
+    """
+    Fetch everything a core run needs about the org concurrently: module
+    registrations, integrations and recent events. Request-provided
+    integrations/events are used as-is, and [SYNTHESIS] runs skip them.
+    Never raises; a failed lookup leaves its field empty.
+    """
+    async def none() -> list[dict]:
+        return []
+
+    async def modules() -> list[dict]:
+        try:
+            return await get_org_module_records(org_id)
+        except Exception as e:
+            logger.error(f"Failed to fetch modules for org {org_id}: {e}")
+            return []
+
+    wants_org_context = not request.task.startswith("[SYNTHESIS]")
+    module_records, integrations, events = await asyncio.gather(
+        modules(),
+        _get_cached_integrations(org_id, toolkit)
+        if wants_org_context and not request.integrations else none(),
+        _get_cached_events(org_id, toolkit)
+        if wants_org_context and not request.recent_events else none(),
+    )
+    return CoreRequestContext(
+        org_id=org_id,
+        module_records=module_records,
+        integrations=request.integrations or integrations,
+        events=request.recent_events or events,
+        context_entries=request.context_entries,
+        context_version=request.metadata.get("context_version"),
+    )
+
+
+async def _resolve_agent_type(request: "CoreExecuteRequest") -> str:
+    from src.services.agent_registry import resolve_agent_type as translate_mc_type
+    if request.agent_type:
+        return translate_mc_type(request.agent_type)
+    return await classify_intent(request.task, request.org_tier, request.context_entries)
 
 
 # ══════════════════════════════════════════════════════════════
 # Context-Aware Intent Classification
 # ══════════════════════════════════════════════════════════════
 
+# Pseudo-intents resolved after scoring
+_EVENTS_INTENT = "_events"
+_ONBOARDING_INTENT = "_onboarding"
+
+ONBOARDING_CUES = ["get started", "set up", "new here", "onboard", "first time", "hello", "hi"]
+
+# Keywords at least this long also match inflections ("order" → "ordering");
+# shorter ones only take a plural, so "hi" does not match "history"
+STEM_MIN_LENGTH = 4
+# Inflectional endings only: an open \w* would let "bill" match "billion"
+INFLECTIONS = ("s", "es", "ed", "ing", "er", "ers")
+
+
+class IntentMatcher:
+    """
+    Every intent keyword compiled into one alternation regex.
+
+    Keywords match whole words plus an inflectional ending from INFLECTIONS
+    ("review" matches "reviewed", "delegate" matches "delegating", but
+    "brief" does not match "briefly"); keywords shorter than
+    STEM_MIN_LENGTH only take a plural "s"/"es". Matching is longest first,
+    in a single left-to-right pass over the message. Each
+    hit adds the keyword's weight to every intent that lists it; phrases
+    weigh more than single words because they are more specific.
+    """
+
+    def __init__(self, groups: dict[str, list[str]]):
+        targets: dict[str, dict[str, float]] = {}  # keyword -> {intent: weight}
+        for intent, keywords in groups.items():
+            for keyword in keywords:
+                keyword = keyword.lower().strip()
+                targets.setdefault(keyword, {})[intent] = self.weight(keyword)
+
+        keywords = sorted(targets, key=len, reverse=True)
+        self._targets = [targets[k] for k in keywords]
+        self._order = {intent: i for i, intent in enumerate(groups)}
+        alternation = "|".join(
+            f"(?P<k{i}>{self._pattern(k)})" for i, k in enumerate(keywords)
+        )
+        self._regex = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)")
+
+    @staticmethod
+    def _pattern(keyword: str) -> str:
+        if len(keyword) < STEM_MIN_LENGTH:
+            return re.escape(keyword) + r"(?:e?s)?"
+        if keyword.endswith("e"):
+            # INFLECTIONS with the silent "e" merged in: "delegated", "delegating"
+            return re.escape(keyword[:-1]) + r"(?:e(?:s|d|r|rs)?|ing)"
+        return re.escape(keyword) + f"(?:{'|'.join(INFLECTIONS)})?"
+
+    @staticmethod
+    def weight(keyword: str) -> float:
+        return 1.0 + 0.5 * keyword.count(" ")
+
+    def scores(self, text: str) -> dict[str, float]:
+        """Summed keyword weights per intent, in group declaration order."""
+        raw: dict[str, float] = {}
+        for match in self._regex.finditer(text.lower()):
+            for intent, weight in self._targets[int(match.lastgroup[1:])].items():
+                raw[intent] = raw.get(intent, 0.0) + weight
+        return {intent: raw[intent] for intent in sorted(raw, key=self._order.__getitem__)}
+
+    def rank(self, text: str) -> list[tuple[str, float]]:
+        """Intents by descending score; ties keep declaration order."""
+        return sorted(self.scores(text).items(), key=lambda item: -item[1])
+
+
+def _build_intent_matcher() -> IntentMatcher:
+    groups: dict[str, list[str]] = {k: list(v) for k, v in CORE_INTENT_PATTERNS.items()}
+    for module_type, patterns in ENTERPRISE_INTENT_PATTERNS.items():
+        groups.setdefault(module_type.lower(), []).extend(patterns)
+    # DAM queries → route to content_studio module
+    groups.setdefault("content_studio", []).extend(DAM_INTENT_PATTERNS)
+    groups[_EVENTS_INTENT] = list(EVENT_INTENT_PATTERNS)
+    groups[_ONBOARDING_INTENT] = list(ONBOARDING_CUES)
+    return IntentMatcher(groups)
+
+
+INTENT_MATCHER = _build_intent_matcher()
+
+
+def rank_intents(task: str) -> list[tuple[str, float]]:
+    """Keyword-ranked agent intents for a message (pseudo-intents excluded)."""
+    return [(intent, score) for intent, score in INTENT_MATCHER.rank(task) if not intent.startswith("_")]
+
 
 def score_intent_from_context(
     message: str,
@@ -329,35 +449,17 @@ async def classify_intent(
 ) -> str:
     """
     Classify user message intent to route to the appropriate core agent.
-    Uses keyword match + context-aware scoring.
+    Uses weighted keyword match (one compiled pass) + context-aware scoring.
     """
-    task_lower = task.lower()
-
-    # Keyword scoring — core agents
-    scores: dict[str, float] = {}
-    for agent_type, patterns in CORE_INTENT_PATTERNS.items():
-        score = sum(1 for p in patterns if p in task_lower)
-        if score > 0:
-            scores[agent_type] = float(score)
-
-    # Enterprise module keyword scoring
-    for module_type, patterns in ENTERPRISE_INTENT_PATTERNS.items():
-        score = sum(1 for p in patterns if p in task_lower)
-        if score > 0:
-            agent_name = module_type.lower()
-            scores[agent_name] = float(score)
-
-    # DAM queries → route to content_studio module
-    dam_score = sum(1 for p in DAM_INTENT_PATTERNS if p in task_lower)
-    if dam_score > 0:
-        scores["content_studio"] = scores.get("content_studio", 0.0) + float(dam_score)
+    scores = INTENT_MATCHER.scores(task)
+    onboarding_score = scores.pop(_ONBOARDING_INTENT, 0.0)
 
     # Event/activity queries — don't reroute, just let the current agent use
     # list_recent_events tool. But if it's purely an activity query with no
     # other match, route to core_tasks (the universal catch-all with event tools).
-    event_score = sum(1 for p in EVENT_INTENT_PATTERNS if p in task_lower)
+    event_score = scores.pop(_EVENTS_INTENT, 0.0)
     if event_score > 0 and not scores:
-        scores["core_tasks"] = float(event_score)
+        scores["core_tasks"] = event_score
 
     # Context-aware adjustment
     if context_entries:
@@ -370,8 +472,7 @@ async def classify_intent(
         return best  # still return — config builder handles upgrade message
 
     # Onboarding cues
-    onboarding_cues = ["get started", "set up", "new here", "onboard", "first time", "hello", "hi"]
-    if any(cue in task_lower for cue in onboarding_cues):
+    if onboarding_score > 0:
         return "core_onboarding"
 
     return "core_tasks"
@@ -417,31 +518,15 @@ def extract_handoff_from_result(result, agent=None) -> Optional[dict]:
     return None
 
 
-# ══════════════════════════════════════════════════════════════
-# Shared Secret Auth Helper
-# ══════════════════════════════════════════════════════════════
-
-
-def _validate_agent_secret(x_agent_secret: Optional[str]):
-    """Validate the X-Agent-Secret header from spokestack-core."""
-    expected = os.environ.get("AGENT_RUNTIME_SECRET", "")
-    if not expected:
-        logger.warning("AGENT_RUNTIME_SECRET not configured — core endpoints unprotected")
-        return
-    if not x_agent_secret or x_agent_secret != expected:
-        raise HTTPException(status_code=401, detail="Invalid or missing X-Agent-Secret")
-
-
 # ══════════════════════════════════════════════════════════════
 # Endpoints
 # ══════════════════════════════════════════════════════════════
 
 
-@router.post("/execute", response_model=CoreExecuteResponse)
+@router.post("/execute", response_model=CoreExecuteResponse, dependencies=[Depends(require_agent_secret)])
 async def execute_core_agent(
     request: CoreExecuteRequest,
     background_tasks: BackgroundTasks,
-    x_agent_secret: Optional[str] = Header(default=None, alias="X-Agent-Secret"),
 ):
     """
     Execute a spokestack-core agent.
@@ -452,28 +537,25 @@ async def execute_core_agent(
     - Handoff detection: delegate_to_agent → status="handoff" response
     - [SYNTHESIS] prefix → minimal JSON-focused system prompt
     """
-    _validate_agent_secret(x_agent_secret)
-
     org_id = request.resolved_org_id
 
-    # ── MC Type Translation ──
-    from src.services.agent_registry import resolve_agent_type as translate_mc_type
-    agent_type = request.agent_type
-    if agent_type:
-        agent_type = translate_mc_type(agent_type)
-    else:
-        agent_type = await classify_intent(
-            request.task, request.org_tier, request.context_entries,
+    # ── Prefetch org context alongside intent classification ──
+    toolkit = CoreToolkit(org_id=org_id, user_id=request.user_id)
+    client = None
+    agent = None
+    streaming = False  # Once streaming, event_stream() owns the cleanup
+    try:
+        request_context, agent_type = await asyncio.gather(
+            prefetch_core_context(request, org_id, toolkit),
+            _resolve_agent_type(request),
         )
 
-    execution_id = str(uuid.uuid4())
+        execution_id = str(uuid.uuid4())
 
-    # ── Module Guard ──
-    if agent_type not in CORE_AGENT_BYPASS:
-        module_type = MODULE_AGENT_TYPES.get(agent_type)
-        if module_type:
-            installed = await get_installed_modules(org_id)
-            if module_type not in installed:
+        # ── Module Guard ──
+        if agent_type not in CORE_AGENT_BYPASS:
+            module_type = MODULE_AGENT_TYPES.get(agent_type)
+            if module_type and module_type not in request_context.installed_modules:
                 return CoreExecuteResponse(
                     execution_id=execution_id,
                     status="module_required",
@@ -482,171 +564,158 @@ async def execute_core_agent(
                     upsell=True,
                 )
 
-    # ── Build tier-scoped config ──
-    org_registrations = await registry_store.get_org_modules(org_id)
-    module_tools = []
-    for reg in org_registrations:
-        if reg.agent_definition and isinstance(reg.agent_definition, dict):
-            tools = reg.agent_definition.get("tools", [])
-            module_tools.extend(tools)
-
-    config = await build_agent_config(
-        org_id=org_id,
-        org_name=request.org_name,
-        org_tier=request.org_tier,
-        agent_type=agent_type,
-        user_id=request.user_id,
-        module_tools=module_tools if module_tools else None,
-    )
-
-    # Check if agent is tier-gated
-    if not config["available"]:
-        return CoreExecuteResponse(
-            execution_id=execution_id,
-            status="gated",
+        # ── Build tier-scoped config ──
+        config = await build_agent_config(
+            org_id=org_id,
+            org_name=request.org_name,
+            org_tier=request.org_tier,
             agent_type=agent_type,
-            upgrade_message=config["upgrade_message"],
-        )
-
-    # Instantiate agent
-    settings = get_settings()
-    client = OpenRouterClient(api_key=settings.openrouter_api_key)
-    agent_cls = _load_agent_class(agent_type)
-    agent = agent_cls(client=client, model=config["model"])
-
-    # Inject CoreToolkit
-    toolkit_config = config["core_toolkit_config"]
-    agent.core_toolkit = CoreToolkit(
-        org_id=toolkit_config["org_id"],
-        user_id=toolkit_config["user_id"],
-    )
-
-    # Inject tier-scoped tools
-    agent.tools.extend(config["tools"])
-
-    # ── Phase 10B: Inject CRUD tools based on agent type ──
-    from src.tools.agent_tool_assignment import get_openai_tools_for_agent
-    crud_tools = get_openai_tools_for_agent(agent_type)
-    if crud_tools:
-        agent.tools.extend(crud_tools)
-
-    # ── Context + Integration + Event Injection ──
-    if request.task.startswith("[SYNTHESIS]"):
-        agent._synthesis_prompt = (
-            "You are a data analyst. When asked, return ONLY a valid JSON array. "
-            "Do not include markdown fences, preamble, or explanation — just the raw JSON array."
-        )
-    else:
-        # Prefer request-provided data; fall back to HTTP fetch if empty
-        integrations = request.integrations or await _get_cached_integrations(org_id, agent.core_toolkit)
-        events = request.recent_events or await _get_cached_events(org_id, agent.core_toolkit)
-
-        original_prompt = agent.system_prompt
-        injected_prompt = inject_context_into_prompt(
-            original_prompt,
-            request.context_entries,
-            integrations=integrations,
-            events=events,
+            user_id=request.user_id,
+            request_context=request_context,
         )
-        agent._injected_system_prompt = injected_prompt
 
-        if request.context_entries:
-            logger.info(
-                f"[context-injection] org={org_id} "
-                f"entries={len(request.context_entries)} "
-                f"injected={len([e for e in request.context_entries if e.get('entryType') in ('PREFERENCE', 'INSIGHT', 'ENTITY')])}"
+        # Check if agent is tier-gated
+        if not config["available"]:
+            return CoreExecuteResponse(
+                execution_id=execution_id,
+                status="gated",
+                agent_type=agent_type,
+                upgrade_message=config["upgrade_message"],
             )
 
-    # Build context
-    context = AgentContext(
-        tenant_id=org_id,
-        user_id=request.user_id,
-        task=request.task,
-        session_id=request.session_id or str(uuid.uuid4()),
-        metadata={
-            "org_tier": request.org_tier,
-            "agent_type": agent_type,
-            "product": "spokestack-core",
-            **request.metadata,
-        },
-    )
+        # Instantiate agent
+        settings = get_settings()
+        client = OpenRouterClient(api_key=settings.openrouter_api_key)
+        agent_cls = _load_agent_class(agent_type)
+        agent = agent_cls(client=client, model=config["model"])
+
+        # Inject CoreToolkit (the one the prefetch used, so its connection is reused)
+        agent.core_toolkit = toolkit
+
+        # Inject tier-scoped tools
+        agent.tools.extend(config["tools"])
+
+        # ── Phase 10B: Inject CRUD tools based on agent type ──
+        from src.tools.agent_tool_assignment import get_openai_tools_for_agent
+        crud_tools = get_openai_tools_for_agent(agent_type)
+        if crud_tools:
+            agent.tools.extend(crud_tools)
+
+        # ── Context + Integration + Event Injection ──
+        if request.task.startswith("[SYNTHESIS]"):
+            agent._synthesis_prompt = (
+                "You are a data analyst. When asked, return ONLY a valid JSON array. "
+                "Do not include markdown fences, preamble, or explanation — just the raw JSON array."
+            )
+        else:
+            original_prompt = agent.system_prompt
+            injected_prompt = inject_context_into_prompt(
+                original_prompt, request_context=request_context,
+            )
+            agent._injected_system_prompt = injected_prompt
 
-    if request.stream:
-        async def event_stream():
-            try:
-                async for event in agent.stream(context):
-                    yield f"data: {event}\n\n"
-                # Check for handoff in the agent's tool call records
-                if hasattr(agent, '_tool_call_records'):
-                    for record in reversed(agent._tool_call_records):
-                        if is_handoff_tool_call(record.get("name", "")):
-                            handoff_data = build_handoff_response(record.get("input", {}))
-                            yield f"data: {json.dumps(handoff_data)}\n\n"
-                            break
-                yield "data: [DONE]\n\n"
-            except Exception as e:
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
-            finally:
-                await agent.close()
-                await client.http.aclose()
+            if request.context_entries:
+                logger.info(
+                    f"[context-injection] org={org_id} "
+                    f"entries={len(request.context_entries)} "
+                    f"injected={len([e for e in request.context_entries if e.get('entryType') in ('PREFERENCE', 'INSIGHT', 'ENTITY')])}"
+                )
 
-        return StreamingResponse(
-            event_stream(),
-            media_type="text/event-stream",
-            headers={
-                "X-Chat-Id": context.chat_id,
-                "X-Agent-Type": agent_type,
-                "X-Execution-Id": execution_id,
+        # Build context
+        context = AgentContext(
+            tenant_id=org_id,
+            user_id=request.user_id,
+            task=request.task,
+            session_id=request.session_id or str(uuid.uuid4()),
+            metadata={
+                "org_tier": request.org_tier,
+                "agent_type": agent_type,
+                "product": "spokestack-core",
+                **request.metadata,
             },
         )
 
-    # Non-streaming: run and return
-    try:
-        result = await agent.run(context)
-
-        # ── Phase 3: Handoff Detection ──
-        handoff_data = extract_handoff_from_result(result, agent=agent)
-        if handoff_data:
-            target = handoff_data.get("target_agent", "")
-            reason = handoff_data.get("reason", "")
-            target_label = target.replace("core_", "").title() if target else "another"
+        if request.stream:
+            async def event_stream():
+                try:
+                    async for event in agent.stream(context):
+                        yield f"data: {event}\n\n"
+                    # Check for handoff in the agent's tool call records
+                    if hasattr(agent, '_tool_call_records'):
+                        for record in reversed(agent._tool_call_records):
+                            if is_handoff_tool_call(record.get("name", "")):
+                                handoff_data = build_handoff_response(record.get("input", {}))
+                                yield f"data: {json.dumps(handoff_data)}\n\n"
+                                break
+                    yield "data: [DONE]\n\n"
+                except Exception as e:
+                    yield f"data: {json.dumps({'error': str(e)})}\n\n"
+                finally:
+                    await agent.close()
+                    await toolkit.close()
+                    await client.http.aclose()
+
+            response = StreamingResponse(
+                batch_frames(event_stream()),
+                media_type="text/event-stream",
+                headers={
+                    "X-Chat-Id": context.chat_id,
+                    "X-Agent-Type": agent_type,
+                    "X-Execution-Id": execution_id,
+                },
+            )
+            streaming = True
+            return response
+
+        # Non-streaming: run and return
+        try:
+            result = await agent.run(context)
+
+            # ── Phase 3: Handoff Detection ──
+            handoff_data = extract_handoff_from_result(result, agent=agent)
+            if handoff_data:
+                target = handoff_data.get("target_agent", "")
+                reason = handoff_data.get("reason", "")
+                target_label = target.replace("core_", "").title() if target else "another"
+                return CoreExecuteResponse(
+                    execution_id=execution_id,
+                    status="handoff",
+                    output=f"I'm suggesting you switch to the {target_label} agent — {reason}",
+                    agent_type=agent_type,
+                    handoff=HandoffMetadata(**handoff_data),
+                    token_usage={
+                        "input_tokens": result.metadata.get("input_tokens", 0),
+                        "output_tokens": result.metadata.get("output_tokens", 0),
+                    },
+                )
+
             return CoreExecuteResponse(
                 execution_id=execution_id,
-                status="handoff",
-                output=f"I'm suggesting you switch to the {target_label} agent — {reason}",
+                status="completed",
+                output=result.output,
                 agent_type=agent_type,
-                handoff=HandoffMetadata(**handoff_data),
                 token_usage={
                     "input_tokens": result.metadata.get("input_tokens", 0),
                     "output_tokens": result.metadata.get("output_tokens", 0),
                 },
             )
-
-        return CoreExecuteResponse(
-            execution_id=execution_id,
-            status="completed",
-            output=result.output,
-            agent_type=agent_type,
-            token_usage={
-                "input_tokens": result.metadata.get("input_tokens", 0),
-                "output_tokens": result.metadata.get("output_tokens", 0),
-            },
-        )
-    except Exception as e:
-        logger.error(f"Core agent execution failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Agent execution failed: {str(e)}")
+        except Exception as e:
+            logger.error(f"Core agent execution failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Agent execution failed: {str(e)}")
     finally:
-        await agent.close()
-        await client.http.aclose()
+        if not streaming:
+            if agent is not None:
+                await agent.close()
+            await toolkit.close()
+            if client is not None:
+                await client.http.aclose()
 
 
-@router.get("/agents")
+@router.get("/agents", dependencies=[Depends(require_agent_secret)])
 async def list_core_agents(
     org_tier: str = "FREE",
-    x_agent_secret: Optional[str] = Header(default=None, alias="X-Agent-Secret"),
 ):
     """List available core agents for a given tier."""
-    _validate_agent_secret(x_agent_secret)
     available = get_available_agents(org_tier)
     return {
         "agents": [
@@ -662,17 +731,14 @@ async def list_core_agents(
     }
 
 
-@router.post("/agents/register")
+@router.post("/agents/register", dependencies=[Depends(require_agent_secret)])
 async def register_module_agent(
     request: RegisterAgentRequest,
-    x_agent_secret: Optional[str] = Header(default=None, alias="X-Agent-Secret"),
 ):
     """
     Legacy endpoint: Register a marketplace module agent for an organization.
     Persists to module_registrations table via registry_store.
     """
-    _validate_agent_secret(x_agent_secret)
-
     agent_def = request.agent
     registration = await registry_store.register_module(
         org_id=request.resolved_org_id,
@@ -681,7 +747,7 @@ async def register_module_agent(
     )
 
     from src.modules.module_checker import invalidate_cache
-    invalidate_cache(request.resolved_org_id)
+    await invalidate_cache(request.resolved_org_id)
 
     logger.info(f"Registered module agent '{agent_def.slug}' for org {request.resolved_org_id}")
 
@@ -693,18 +759,15 @@ async def register_module_agent(
     }
 
 
-@router.delete("/agents/register/{slug}")
+@router.delete("/agents/register/{slug}", dependencies=[Depends(require_agent_secret)])
 async def unregister_module_agent(
     slug: str,
     org_id: str,
-    x_agent_secret: Optional[str] = Header(default=None, alias="X-Agent-Secret"),
 ):
     """Legacy endpoint: Unregister a marketplace module agent."""
-    _validate_agent_secret(x_agent_secret)
-
     await registry_store.deregister_module(org_id, slug.upper())
 
     from src.modules.module_checker import invalidate_cache
-    invalidate_cache(org_id)
+    await invalidate_cache(org_id)
 
     return {"status": "unregistered", "slug": slug, "org_id": org_id}
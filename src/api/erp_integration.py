@@ -34,8 +34,10 @@ from ..services.module_registry import (
     MODULE_REGISTRY, get_module_config, get_available_agents,
     resolve_agent_for_module, is_agent_allowed_for_module,
 )
-from ..services.task_store import save_task, get_task, update_task
+from ..services.task_store import save_task, get_task, compare_and_set_task
 from ..agents.base import AgentContext
+from ..protocols.sse import batch_frames
+from .auth import get_principal
 from .routes import get_agent, AgentType
 
 logger = logging.getLogger(__name__)
@@ -408,7 +410,8 @@ async def execute_agent_with_callback(
 ):
     """Background task to execute agent and send callback."""
     start_time = time.time()
-    await update_task(execution_id, {"status": "running"})
+    if not await compare_and_set_task(execution_id, {"status": "running"}, {"status": "pending"}):
+        return
 
     try:
         # Map string agent type to enum
@@ -464,7 +467,7 @@ async def execute_agent_with_callback(
         )
 
         # Update task storage (Redis-backed)
-        await update_task(execution_id, {
+        await compare_and_set_task(execution_id, {
             "status": "completed",
             "result": {
                 "success": result.success,
@@ -474,7 +477,7 @@ async def execute_agent_with_callback(
             },
             "token_usage": token_usage.model_dump(),
             "duration_ms": duration_ms,
-        })
+        }, expected={"status": "running"})
 
         # Send callback if URL provided
         if request.callback_url and request.invocation_id:
@@ -489,11 +492,11 @@ async def execute_agent_with_callback(
 
     except Exception as e:
         duration_ms = int((time.time() - start_time) * 1000)
-        await update_task(execution_id, {
+        await compare_and_set_task(execution_id, {
             "status": "failed",
             "error": str(e),
             "duration_ms": duration_ms,
-        })
+        }, expected={"status": "running"})
 
         # Send error callback
         if request.callback_url and request.invocation_id:
@@ -527,9 +530,8 @@ def _resolve_module_subdomain(
 async def execute_agent(
     request: AgentExecuteRequest,
     background_tasks: BackgroundTasks,
-    x_organization_id: Optional[str] = Header(default=None, alias="X-Organization-Id"),
+    http_request: Request,
     x_request_id: Optional[str] = Header(default=None, alias="X-Request-Id"),
-    x_module_subdomain: Optional[str] = Header(default=None, alias="X-Module-Subdomain"),
 ):
     """
     Execute an agent task (module-aware).
@@ -558,8 +560,13 @@ async def execute_agent(
     - stream=false: Returns execution_id. Poll /agent/status/{execution_id} for results.
     - stream=true: Returns SSE event stream (text/event-stream).
     """
+    # Org and module scope were read from the headers by the auth middleware
+    principal = get_principal(http_request)
+
     # Resolve module subdomain from header or context
-    module_subdomain = _resolve_module_subdomain(request, x_module_subdomain)
+    module_subdomain = _resolve_module_subdomain(
+        request, principal.module_subdomain if principal else None,
+    )
 
     # Translate MC-style agent types to canonical types
     from src.services.agent_registry import resolve_agent_type as translate_agent_type
@@ -581,7 +588,7 @@ async def execute_agent(
         )
 
     # Use header org ID if provided, otherwise fall back to body
-    org_id = x_organization_id or request.tenant_id
+    org_id = (principal.organization_id if principal else None) or request.tenant_id
 
     # Generate execution ID
     execution_id = x_request_id or str(uuid.uuid4())
@@ -631,7 +638,7 @@ async def execute_agent(
                 await agent.close()
 
         return StreamingResponse(
-            generate_sse(),
+            batch_frames(generate_sse()),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
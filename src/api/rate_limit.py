@@ -1,8 +1,11 @@
 """
 Rate Limiting Middleware
 
-Simple sliding-window rate limiter using in-memory counters.
-Uses Redis when available for distributed rate limiting.
+GCRA (generic cell rate algorithm) limiter shared across replicas via an
+atomic Redis script, falling back to a per-process limiter when Redis is
+unavailable. Each key stores a single "theoretical arrival time", so
+memory is O(1) per key and one script call yields both the decision and
+the X-RateLimit-* header values.
 
 Limits:
 - /api/v1/agent/execute: 30 req/min per tenant
@@ -10,12 +13,16 @@ Limits:
 - All other /api/*:     120 req/min per IP
 """
 
+import math
 import time
 import logging
-import os
-from collections import defaultdict
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from collections import OrderedDict
+from dataclasses import dataclass
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..services.task_store import _get_redis
 
 logger = logging.getLogger(__name__)
 
@@ -27,45 +34,136 @@ RATE_LIMITS = {
 DEFAULT_RATE_LIMIT = 120
 WINDOW_SECONDS = 60
 
+# Keys tracked by the in-process fallback before least recently used are dropped
+LOCAL_MAX_KEYS = 100_000
+
+# GCRA with a burst of `limit` requests per `period`.
+#   KEYS[1] = rate key
+#   ARGV[1] = limit, ARGV[2] = period (seconds)
+# Returns {allowed, remaining, retry_after_ms, reset_after_ms}. Uses the
+# Redis clock so replicas agree on "now".
+_GCRA_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local interval = period / limit
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+
+if now < allow_at then
+    return {0, 0, math.ceil((allow_at - now) * 1000), math.ceil((tat - now) * 1000)}
+end
+
+local reset_after = new_tat - now
+redis.call('SET', KEYS[1], string.format('%.6f', new_tat), 'PX', math.ceil(reset_after * 1000))
+local remaining = math.floor((period - reset_after) / interval + 0.000001)
+return {1, remaining, 0, math.ceil(reset_after * 1000)}
+"""
+
 
-class _SlidingWindow:
-    """Simple sliding window counter."""
+@dataclass
+class RateLimitResult:
+    """Outcome of a single limiter check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # Seconds until the next request would be allowed
+    reset_after: float  # Seconds until the bucket is fully replenished
 
-    def __init__(self):
-        self._hits: dict[str, list[float]] = defaultdict(list)
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+            "X-RateLimit-Window": f"{WINDOW_SECONDS}s",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class _LocalGCRA:
+    """In-process GCRA used when Redis is unavailable."""
+
+    def __init__(self, max_keys: int = LOCAL_MAX_KEYS):
+        self.max_keys = max_keys
+        self._tat: OrderedDict[str, float] = OrderedDict()
 
-    def is_allowed(self, key: str, limit: int) -> bool:
-        now = time.time()
-        window_start = now - WINDOW_SECONDS
+    def hit(self, key: str, limit: int, period: float) -> RateLimitResult:
+        now = time.monotonic()
+        interval = period / limit
+        tat = max(self._tat.get(key, now), now)
+        new_tat = tat + interval
+        allow_at = new_tat - period
+
+        if now < allow_at:
+            return RateLimitResult(False, limit, 0, allow_at - now, tat - now)
+
+        self._tat[key] = new_tat
+        self._tat.move_to_end(key)
+        if len(self._tat) > self.max_keys:
+            self._tat.popitem(last=False)
+
+        reset_after = new_tat - now
+        remaining = int((period - reset_after) / interval + 1e-6)
+        return RateLimitResult(True, limit, remaining, 0.0, reset_after)
+
+
+class RateLimiter:
+    """GCRA limiter: Redis script when connected, local fallback otherwise."""
+
+    def __init__(self):
+        self._local = _LocalGCRA()
+        self._script = None
 
-        # Clean old entries
-        self._hits[key] = [t for t in self._hits[key] if t > window_start]
+    async def hit(self, key: str, limit: int, period: float = WINDOW_SECONDS) -> RateLimitResult:
+        r = await _get_redis()
+        if r:
+            try:
+                if self._script is None:
+                    self._script = r.register_script(_GCRA_SCRIPT)
+                allowed, remaining, retry_ms, reset_ms = await self._script(
+                    keys=[key], args=[limit, period],
+                )
+                return RateLimitResult(
+                    bool(allowed), limit, int(remaining), retry_ms / 1000, reset_ms / 1000,
+                )
+            except Exception as e:
+                logger.warning(f"Redis rate limiter unavailable ({e}), using local fallback")
+        return self._local.hit(key, limit, period)
 
-        if len(self._hits[key]) >= limit:
-            return False
 
-        self._hits[key].append(now)
-        return True
+_limiter = RateLimiter()
 
-    def remaining(self, key: str, limit: int) -> int:
-        now = time.time()
-        window_start = now - WINDOW_SECONDS
-        recent = [t for t in self._hits[key] if t > window_start]
-        return max(0, limit - len(recent))
 
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware that enforces per-tenant/IP rate limits.
 
-_window = _SlidingWindow()
+    Rate limit headers are added to the response start message only, so
+    streaming bodies flow through unwrapped.
+    """
 
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware that enforces per-tenant/IP rate limits."""
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path.rstrip("/") or "/"
+        path = scope["path"].rstrip("/") or "/"
 
         # Only rate-limit API routes
         if not path.startswith("/api/"):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
         # Determine rate limit for this path
         limit = DEFAULT_RATE_LIMIT
@@ -75,24 +173,29 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 break
 
         # Key by tenant (from header or body is too expensive, use IP + org header)
-        org_id = request.headers.get("X-Organization-Id", "")
-        client_ip = request.client.host if request.client else "unknown"
+        org_id = Headers(scope=scope).get("X-Organization-Id", "")
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
         rate_key = f"rate:{org_id or client_ip}:{path.split('/')[3] if len(path.split('/')) > 3 else 'api'}"
 
-        if not _window.is_allowed(rate_key, limit):
+        result = await _limiter.hit(rate_key, limit)
+        if not result.allowed:
             logger.warning(f"Rate limit exceeded: {rate_key}")
-            raise HTTPException(
+            response = JSONResponse(
                 status_code=429,
-                detail="Rate limit exceeded. Please slow down.",
-                headers={"Retry-After": str(WINDOW_SECONDS)},
+                content={"detail": "Rate limit exceeded. Please slow down."},
+                headers=result.headers(),
             )
+            await response(scope, receive, send)
+            return
 
-        response = await call_next(request)
+        rate_headers = result.headers()
 
-        # Add rate limit headers
-        remaining = _window.remaining(rate_key, limit)
-        response.headers["X-RateLimit-Limit"] = str(limit)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Window"] = f"{WINDOW_SECONDS}s"
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in rate_headers.items():
+                    headers[name] = value
+            await send(message)
 
-        return response
+        await self.app(scope, receive, send_with_headers)
@@ -1,15 +1,22 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Header
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Header, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional
 from enum import Enum
 import uuid
 import asyncio
-import time
 
 from ..config import get_settings, ClaudeModelTier, CLAUDE_MODELS
 from ..services.openrouter import OpenRouterClient
-from ..services.task_store import save_task, get_task, update_task, task_exists, save_session, get_session, delete_session
+from ..services.task_store import (
+    save_task, get_task, compare_and_set_task, task_exists,
+    save_session, get_session, delete_session, subscribe_task_events,
+    append_session_messages, get_session_messages, claim_session_migration,
+    ACTIVE_TASK_STATUSES, TERMINAL_TASK_STATUSES, TASK_VERSION_FIELD,
+)
+from ..services.job_queue import get_job_queue, register_job_handler
+from ..services.chat_history import compact_history, MAX_HISTORY_MESSAGES
+from ..services.stream_replay import start_replay_stream, resume_replay_stream
 from ..services.model_registry import (
     get_model_for_agent,
     get_agent_tier,
@@ -72,8 +79,11 @@ from ..providers.creative.openai_creative_provider import OpenAICreativeProvider
 from ..providers.creative.elevenlabs_provider import ElevenLabsProvider
 from ..providers.creative.beautiful_provider import BeautifulAIProvider
 from ..protocols.handoffs import HandoffRequest, HandoffResponse
+from ..protocols.sse import batch_frames
 from ..orchestration import AgentOrchestrator, Workflow, WorkflowStep, WorkflowTrigger, WorkflowTemplates, StepType, TriggerType
 from ..orchestration.workflow import WorkflowExecution, WorkflowStatus
+from ..orchestration.orchestrator import ExecutionConflictError, RECOVER_STALE_AFTER
+from ..orchestration.store import get_execution_store
 from ..services.module_registry import is_agent_allowed_for_module
 from ..services.model_registry import get_model_for_agent as _get_model_for_agent
 
@@ -189,6 +199,17 @@ class TaskStatus(BaseModel):
     error: Optional[str] = None
 
 
+class TaskStatusChange(BaseModel):
+    """Long-poll response: the fields changed since the caller's version."""
+    task_id: str
+    version: int
+    status: Optional[str] = None
+    changes: dict = Field(default_factory=dict)
+    snapshot: bool = False  # changes holds the full task, not a delta
+    timed_out: bool = False
+    is_complete: bool = False
+
+
 def _get_creative_registry() -> CreativeRegistry | None:
     """Build CreativeRegistry from env vars. Graceful no-op if no keys configured."""
     import os
@@ -335,14 +356,21 @@ def get_agent(agent_type: AgentType, language: str = "en", client_id: str = None
         return agent_class(**fallback_kwargs, **extra_kwargs)
 
 
+# Track background task handles for cancellation
+_running_tasks: dict[str, asyncio.Task] = {}
+
+
 async def run_agent_task(task_id: str, agent_type: AgentType, context: AgentContext, **kwargs):
     """Background task to run agent."""
-    await update_task(task_id, {"status": "running"})
+    # A task cancelled while still queued must not be picked back up. A
+    # redelivered job may find its task still "running" from a dead worker.
+    if not await compare_and_set_task(task_id, {"status": "running"}, {"status": ACTIVE_TASK_STATUSES}):
+        return
 
     try:
         agent = get_agent(agent_type, **kwargs)
         result = await agent.run(context)
-        await update_task(task_id, {
+        await compare_and_set_task(task_id, {
             "status": "completed",
             "result": {
                 "success": result.success,
@@ -351,7 +379,7 @@ async def run_agent_task(task_id: str, agent_type: AgentType, context: AgentCont
                 "metadata": result.metadata,
             },
             "token_usage": getattr(result, "_token_usage", None),
-        })
+        }, expected={"status": "running"})
 
         # Report billing usage
         try:
@@ -370,10 +398,51 @@ async def run_agent_task(task_id: str, agent_type: AgentType, context: AgentCont
 
         await agent.close()
     except asyncio.CancelledError:
-        await update_task(task_id, {"status": "cancelled"})
+        # cancel_task marks the task cancelled before cancelling us; any other
+        # cancellation is a worker shutdown, so hand the task back to the queue
+        await compare_and_set_task(task_id, {"status": "pending"}, {"status": "running"})
         raise
     except Exception as e:
-        await update_task(task_id, {"status": "failed", "error": str(e)})
+        await compare_and_set_task(
+            task_id, {"status": "failed", "error": str(e)}, {"status": "running"}
+        )
+
+
+_CONTEXT_JOB_FIELDS = (
+    "tenant_id", "user_id", "task", "metadata", "chat_id", "organization_id",
+    "client_id", "project_id", "session_id", "module_subdomain",
+    "module_display_name", "attachments", "artifact_format",
+)
+
+
+async def _run_agent_task_job(payload: dict) -> None:
+    """Job queue handler for queued /agent/execute tasks."""
+    task_id = payload["task_id"]
+    kwargs = dict(payload["kwargs"])
+    if kwargs.get("model_override"):
+        kwargs["model_override"] = ClaudeModelTier(kwargs["model_override"])
+
+    _running_tasks[task_id] = asyncio.current_task()
+    try:
+        await run_agent_task(
+            task_id,
+            AgentType(payload["agent_type"]),
+            AgentContext(**payload["context"]),
+            **kwargs,
+        )
+    finally:
+        _running_tasks.pop(task_id, None)
+
+
+async def _agent_task_dead_letter(payload: dict, error: str) -> None:
+    await compare_and_set_task(
+        payload["task_id"],
+        {"status": "failed", "error": f"Task could not be run: {error}"},
+        {"status": ACTIVE_TASK_STATUSES},
+    )
+
+
+register_job_handler("agent_task", _run_agent_task_job, on_dead_letter=_agent_task_dead_letter)
 
 
 @router.get("/agents/registry")
@@ -390,7 +459,7 @@ async def get_agents_registry():
 
 
 @router.post("/agent/execute", response_model=ExecuteResponse)
-async def execute_agent(request: ExecuteRequest, background_tasks: BackgroundTasks):
+async def execute_agent(request: ExecuteRequest):
     """
     Execute an agent task.
 
@@ -454,19 +523,35 @@ async def execute_agent(request: ExecuteRequest, background_tasks: BackgroundTas
             finally:
                 await agent.close()
 
+        # The run outlives this response; a dropped client resumes from
+        # /agent/stream/{task_id} with Last-Event-ID instead of re-running
+        stream = start_replay_stream(task_id, generate())
         return StreamingResponse(
-            generate(),
+            batch_frames(stream.follow()),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
                 "X-Chat-Id": context.chat_id,
+                "X-Task-Id": task_id,
             },
         )
 
-    # Non-streaming: queue background task (Redis-backed)
+    # Non-streaming: queue on the durable job queue (Redis streams)
     await save_task(task_id, {"status": "pending", "result": None, "error": None})
-    background_tasks.add_task(run_agent_task, task_id, agent_type_enum, context, **agent_kwargs)
+    await get_job_queue().enqueue(
+        "agent_task",
+        {
+            "task_id": task_id,
+            "agent_type": agent_type_enum.value,
+            "context": {name: getattr(context, name) for name in _CONTEXT_JOB_FIELDS},
+            "kwargs": {
+                **agent_kwargs,
+                "model_override": model_override.value if model_override else None,
+            },
+        },
+        tenant_id=request.tenant_id,
+    )
 
     return ExecuteResponse(
         task_id=task_id,
@@ -475,10 +560,39 @@ async def execute_agent(request: ExecuteRequest, background_tasks: BackgroundTas
     )
 
 
+@router.get("/agent/stream/{task_id}")
+async def resume_agent_stream(
+    task_id: str,
+    last_event_id: Optional[str] = Header(None),
+    after: Optional[int] = Query(None, description="Resume after this event id (if Last-Event-ID can't be sent)"),
+):
+    """
+    Resume a streamed /agent/execute run.
+
+    Replays buffered events after Last-Event-ID, then follows the live
+    stream until the run finishes. The agent is not executed again.
+    """
+    if after is None:
+        try:
+            after = int(last_event_id) if last_event_id else 0
+        except ValueError:
+            after = 0
+
+    frames = await resume_replay_stream(task_id, after)
+    if frames is None:
+        raise HTTPException(status_code=404, detail="Stream not found or expired")
+
+    return StreamingResponse(
+        batch_frames(frames),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Task-Id": task_id},
+    )
+
+
 @router.get("/agent/status/{task_id}", response_model=TaskStatus)
 async def get_task_status(task_id: str):
     """Get status of a running or completed task."""
-    task = await get_task(task_id)
+    task = await get_task(task_id, fields=["status", "result", "error"])
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
@@ -490,23 +604,81 @@ async def get_task_status(task_id: str):
     )
 
 
-# Track background task handles for cancellation
-_running_tasks: dict[str, asyncio.Task] = {}
+@router.get("/agent/status/{task_id}/wait", response_model=TaskStatusChange)
+async def wait_for_task_status(
+    task_id: str,
+    version: int = Query(0, ge=0, description="Last task version the client has seen"),
+    timeout: float = Query(25.0, ge=0, le=60, description="Seconds to wait for a change"),
+):
+    """
+    Long-poll for the next change to a task.
+
+    Returns immediately with a full snapshot if the task is already past
+    ``version``; otherwise waits for the next transition and returns only
+    the changed fields. Resume with the returned ``version``.
+    """
+    async with subscribe_task_events(task_id) as events:
+        current = await get_task(task_id, fields=["status", TASK_VERSION_FIELD])
+        if not current:
+            raise HTTPException(status_code=404, detail="Task not found")
+        current_version = current[TASK_VERSION_FIELD] or 0
+        status = current["status"]
+
+        if current_version <= version:
+            if status in TERMINAL_TASK_STATUSES:
+                return TaskStatusChange(
+                    task_id=task_id, version=current_version, status=status, is_complete=True,
+                )
+            try:
+                event = await asyncio.wait_for(events.get(), timeout)
+            except asyncio.TimeoutError:
+                return TaskStatusChange(
+                    task_id=task_id, version=current_version, status=status, timed_out=True,
+                )
+            if event["version"] == version + 1:
+                status = event["updates"].get("status", status)
+                return TaskStatusChange(
+                    task_id=task_id,
+                    version=event["version"],
+                    status=status,
+                    changes=event["updates"],
+                    is_complete=status in TERMINAL_TASK_STATUSES,
+                )
+
+    # Caller is behind by more than one transition: send the whole task.
+    # Read the version first so the snapshot is never older than it.
+    latest = await get_task(task_id, fields=[TASK_VERSION_FIELD])
+    snapshot = await get_task(task_id)
+    if not latest or not snapshot:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return TaskStatusChange(
+        task_id=task_id,
+        version=latest[TASK_VERSION_FIELD] or 0,
+        status=snapshot.get("status"),
+        changes=snapshot,
+        snapshot=True,
+        is_complete=snapshot.get("status") in TERMINAL_TASK_STATUSES,
+    )
 
 
 @router.delete("/agent/task/{task_id}")
 async def cancel_task(task_id: str):
     """Cancel a pending or running task."""
-    task = await get_task(task_id)
+    task = await get_task(task_id, fields=["status"])
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
+    # Only active tasks move to cancelled; a finished result is kept
+    if not await compare_and_set_task(
+        task_id, {"status": "cancelled"}, {"status": ACTIVE_TASK_STATUSES}
+    ):
+        return {"message": f"Task already {task['status']}", "task_id": task_id}
+
     # Cancel the asyncio task if still running
     bg_task = _running_tasks.pop(task_id, None)
     if bg_task and not bg_task.done():
         bg_task.cancel()
 
-    await update_task(task_id, {"status": "cancelled"})
     return {"message": "Task cancelled", "task_id": task_id}
 
 
@@ -639,18 +811,27 @@ async def chat_with_agent(request: ChatRequest):
             "agent_type": request.agent_type.value,
             "tenant_id": request.tenant_id,
             "user_id": request.user_id,
-            "messages": [],
             "state": {},
             "metadata": request.metadata,
         }
-
-    session["messages"].append({"role": "user", "content": request.message})
+    elif "messages" in session:
+        # Sessions saved before history moved to its own append-only list.
+        # Concurrent first requests all see the inline messages; only the
+        # one that claims the migration copies them.
+        legacy = session.pop("messages")
+        if legacy and await claim_session_migration(session["id"]):
+            await append_session_messages(session["id"], legacy)
+
+    # Only the recent tail of the history is read, then compacted for the prompt
+    recent = await get_session_messages(session["id"], last=MAX_HISTORY_MESSAGES)
+    user_message = {"role": "user", "content": request.message}
 
     context = AgentContext(
         tenant_id=session["tenant_id"],
         user_id=session["user_id"],
-        task=f"Continue this onboarding conversation. History: {session['messages']}. Respond to: {request.message}",
+        task=request.message,
         metadata={"session_id": session["id"]},
+        history=compact_history(recent),
     )
 
     try:
@@ -659,7 +840,9 @@ async def chat_with_agent(request: ChatRequest):
         await agent.close()
 
         response_text = result.output
-        session["messages"].append({"role": "assistant", "content": response_text})
+        await append_session_messages(
+            session["id"], [user_message, {"role": "assistant", "content": response_text}],
+        )
         await save_session(session["id"], session)
 
         return ChatResponse(
@@ -669,6 +852,8 @@ async def chat_with_agent(request: ChatRequest):
             is_complete=False,
         )
     except Exception as e:
+        # The unanswered message is not recorded, so the history keeps
+        # alternating user and assistant turns when the user retries
         await save_session(session["id"], session)
         return ChatResponse(
             session_id=session["id"],
@@ -684,7 +869,8 @@ async def get_chat_session_route(session_id: str):
     session = await get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return {"session_id": session_id, "messages": session["messages"], "state": session["state"]}
+    messages = session.get("messages") or await get_session_messages(session_id)
+    return {"session_id": session_id, "messages": messages, "state": session["state"]}
 
 
 @router.delete("/agent/chat/{session_id}")
@@ -1009,19 +1195,6 @@ async def verify_service_key(x_service_key: str = Header(...)):
         raise HTTPException(status_code=401, detail="Invalid service key")
 
 
-# WARNING: In-memory storage — paused workflows are lost on container restart.
-# TODO: Persist WorkflowExecution state to Redis or ERP database for production resilience.
-_orchestrators: dict[str, tuple[AgentOrchestrator, float]] = {}  # (orchestrator, created_timestamp)
-
-
-def _cleanup_stale_orchestrators():
-    """Remove orchestrators older than 24 hours to prevent memory leak."""
-    cutoff = time.time() - 86400
-    stale = [k for k, (_, ts) in _orchestrators.items() if ts < cutoff]
-    for k in stale:
-        del _orchestrators[k]
-
-
 @router.post("/handoff", dependencies=[Depends(verify_service_key)])
 async def handoff_agent(request: HandoffRequest, background_tasks: BackgroundTasks):
     """
@@ -1085,7 +1258,7 @@ async def handoff_agent(request: HandoffRequest, background_tasks: BackgroundTas
                 await agent.close()
 
         return StreamingResponse(
-            generate(),
+            batch_frames(generate()),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
@@ -1110,8 +1283,6 @@ async def orchestrate_workflow(request: OrchestrateRequest, background_tasks: Ba
     Execute a multi-agent workflow. Bridges the ERP Canvas to AgentOrchestrator.
     Accepts either a template workflow_id or an inline workflow definition.
     """
-    _cleanup_stale_orchestrators()
-
     # 1. Resolve workflow
     workflow = None
     if request.workflow:
@@ -1128,6 +1299,8 @@ async def orchestrate_workflow(request: OrchestrateRequest, background_tasks: Ba
                 next_steps=step_data.get("next_steps", []),
                 step_type=StepType(step_data.get("step_type", "sequential")),
                 description=step_data.get("description", ""),
+                memoize=step_data.get("memoize", False),
+                memo_version=str(step_data.get("memo_version", "1")),
             )
             steps.append(step)
 
@@ -1160,6 +1333,7 @@ async def orchestrate_workflow(request: OrchestrateRequest, background_tasks: Ba
     orchestrator = AgentOrchestrator(
         agent_factory=_resolve_agent,
         notification_callback=notification_callback,
+        execution_store=get_execution_store(),
     )
 
     if request.stream:
@@ -1177,9 +1351,6 @@ async def orchestrate_workflow(request: OrchestrateRequest, background_tasks: Ba
                     organization_id=request.organization_id,
                 )
 
-                # Store orchestrator for resume
-                _orchestrators[execution.id] = (orchestrator, time.time())
-
                 # Emit any queued notifications as SSE
                 for event in sse_events:
                     yield f"event: {event.get('type', 'notification')}\ndata: {_json.dumps(event)}\n\n"
@@ -1204,7 +1375,6 @@ async def orchestrate_workflow(request: OrchestrateRequest, background_tasks: Ba
         initiated_by=request.user_id,
         organization_id=request.organization_id,
     )
-    _orchestrators[execution.id] = (orchestrator, time.time())
 
     return {
         "execution_id": execution.id,
@@ -1221,21 +1391,18 @@ async def orchestrate_workflow(request: OrchestrateRequest, background_tasks: Ba
 async def resume_workflow(execution_id: str, request: ResumeRequest):
     """
     Resume a paused workflow after human review.
-    Finds the paused execution and continues from the review step.
+    Loads the checkpointed execution (from any replica) and continues
+    from the review step.
     """
-    _cleanup_stale_orchestrators()
-
-    # Find the orchestrator that owns this execution
-    orchestrator = None
-    for orch, _ in _orchestrators.values():
-        if orch.get_execution(execution_id):
-            orchestrator = orch
-            break
+    orchestrator = AgentOrchestrator(
+        agent_factory=_resolve_agent,
+        execution_store=get_execution_store(),
+    )
 
-    if not orchestrator:
+    execution = await orchestrator.load_execution(execution_id)
+    if not execution:
         raise HTTPException(status_code=404, detail=f"Execution not found: {execution_id}")
 
-    execution = orchestrator.get_execution(execution_id)
     if execution.status != WorkflowStatus.PAUSED:
         raise HTTPException(status_code=409, detail=f"Execution is not paused (status: {execution.status.value})")
 
@@ -1245,6 +1412,8 @@ async def resume_workflow(execution_id: str, request: ResumeRequest):
             approval=request.approval,
             review_notes=request.review_notes,
         )
+    except ExecutionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -1258,6 +1427,55 @@ async def resume_workflow(execution_id: str, request: ResumeRequest):
     }
 
 
+@router.post("/orchestrate/{execution_id}/recover", dependencies=[Depends(verify_service_key)])
+async def recover_workflow(execution_id: str, force: bool = False):
+    """
+    Continue a RUNNING workflow whose replica died mid-run.
+    Loads the last step checkpoint (from any replica) and runs the steps
+    that hadn't completed. Executions that checkpointed recently may still
+    be running elsewhere and are refused unless force=true.
+    """
+    orchestrator = AgentOrchestrator(
+        agent_factory=_resolve_agent,
+        execution_store=get_execution_store(),
+    )
+
+    execution = await orchestrator.load_execution(execution_id)
+    if not execution:
+        raise HTTPException(status_code=404, detail=f"Execution not found: {execution_id}")
+
+    if execution.status != WorkflowStatus.RUNNING:
+        raise HTTPException(status_code=409, detail=f"Execution is not running (status: {execution.status.value})")
+
+    idle = orchestrator.seconds_since_checkpoint(execution)
+    if not force and idle is not None and idle < RECOVER_STALE_AFTER:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Execution checkpointed {idle:.0f}s ago and may still be running; pass force=true to recover anyway",
+        )
+
+    try:
+        execution = await orchestrator.recover_workflow(execution_id, stale_after=None)
+    except ExecutionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "execution_id": execution.id,
+        "workflow_id": execution.workflow_id,
+        "status": execution.status.value,
+        "completed_steps": execution.completed_steps,
+        "failed_steps": list(execution.failed_steps),
+    }
+
+
+@router.get("/queue/stats")
+async def queue_stats():
+    """Job queue depth and worker counters (autoscaling signal)."""
+    return await get_job_queue().stats()
+
+
 @router.get("/health")
 async def health_check():
     """Service health check."""
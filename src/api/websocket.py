@@ -17,10 +17,11 @@ Events:
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 from typing import Optional
+from collections import deque
 from datetime import datetime, timezone
+from enum import Enum
 import asyncio
 import hmac
-import json
 import logging
 import os
 import uuid
@@ -33,61 +34,248 @@ from ..protocols.events import (
     resolve_agent_type,
 )
 from ..protocols.handoffs import HandoffRequest, HandoffResponse
+from ..protocols.sse import dumps
 from ..protocols.state import AgentState
-from ..services.task_store import save_session, get_session
+from ..services.chat_history import compact_history
+from ..services.session_cache import CachedSession, SessionCache
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["websocket"])
 
 
+class OverflowPolicy(str, Enum):
+    """What to do when a connection's outbound queue is full."""
+    DROP_OLDEST = "drop_oldest"  # Discard the oldest queued message
+    COALESCE = "coalesce"  # Replace a queued state update, else close the connection
+    DISCONNECT = "disconnect"  # Close the slow connection
+
+
+# Event types where only the latest queued message matters
+COALESCABLE_EVENTS = {"state:update", "ping"}
+
+
+class ConnectionOutbox:
+    """
+    Bounded outbound queue with a dedicated writer task for one socket.
+
+    Senders enqueue pre-serialised text and return immediately, so a slow
+    client only delays its own messages.
+    """
+
+    def __init__(
+        self,
+        chat_id: str,
+        websocket: WebSocket,
+        max_size: int = 256,
+        policy: OverflowPolicy = OverflowPolicy.COALESCE,
+    ):
+        self.chat_id = chat_id
+        self.websocket = websocket
+        self.max_size = max_size
+        self.policy = policy
+        self.dropped = 0
+        self._queue: deque[tuple[str, str]] = deque()  # (event_type, text)
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._shed_task: Optional[asyncio.Task] = None
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def put(self, event_type: str, text: str) -> bool:
+        """Queue a message. Returns False if the connection is closed or shed."""
+        if self._closed:
+            return False
+        if len(self._queue) >= self.max_size and not self._make_room(event_type, text):
+            return False
+        self._queue.append((event_type, text))
+        self._ready.set()
+        return True
+
+    def _make_room(self, event_type: str, text: str) -> bool:
+        if self.policy == OverflowPolicy.DROP_OLDEST:
+            self.dropped += 1
+            self._queue.popleft()
+            return True
+
+        if self.policy == OverflowPolicy.COALESCE:
+            index = self._coalescable_index(event_type)
+            if index is not None:
+                self.dropped += 1
+                del self._queue[index]
+                return True
+            # Only stream/complete frames are left, and dropping one would
+            # leave the client with a corrupted message
+            logger.warning(f"Outbound queue full of undroppable events for {self.chat_id}, disconnecting")
+        else:
+            logger.warning(f"Outbound queue full for {self.chat_id}, disconnecting")
+        if self._shed_task is None:
+            self._shed_task = asyncio.create_task(self._shed())
+        return False
+
+    def _coalescable_index(self, event_type: str) -> Optional[int]:
+        """Position of the queued message to give up: same type first, else any coalescable one."""
+        fallback = None
+        for i, (queued_type, _) in enumerate(self._queue):
+            if queued_type in COALESCABLE_EVENTS:
+                if queued_type == event_type:
+                    return i
+                if fallback is None:
+                    fallback = i
+        return fallback
+
+    async def _write_loop(self):
+        try:
+            while True:
+                while not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                _, text = self._queue.popleft()
+                await self.websocket.send_text(text)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to send event to {self.chat_id}: {e}")
+            self._closed = True
+
+    async def _shed(self):
+        self.close()
+        try:
+            await self.websocket.close(code=1013, reason="Client too slow")
+        except Exception:
+            pass
+
+    def close(self):
+        self._closed = True
+        self._queue.clear()
+        self._writer.cancel()
+
+
 class ConnectionManager:
     """Manages active WebSocket connections."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        send_queue_size: Optional[int] = None,
+        overflow_policy: Optional[OverflowPolicy] = None,
+        max_concurrent_runs: Optional[int] = None,
+        sessions: Optional[SessionCache] = None,
+    ):
         self.active_connections: dict[str, WebSocket] = {}  # chat_id -> ws
-        self.chat_agents: dict[str, dict] = {}  # chat_id -> agent state
+        self.outboxes: dict[str, ConnectionOutbox] = {}  # chat_id -> outbound queue
+        self._sessions = sessions  # chat_id -> chat state + cached agent
+        self.runs: dict[str, set[asyncio.Task]] = {}  # chat_id -> in-flight agent runs
+        self._send_queue_size = send_queue_size
+        self._overflow_policy = overflow_policy
+        self._max_concurrent_runs = max_concurrent_runs
+
+    def _outbox_settings(self) -> tuple[int, OverflowPolicy]:
+        if self._send_queue_size is None or self._overflow_policy is None:
+            from ..config import get_settings
+            settings = get_settings()
+            if self._send_queue_size is None:
+                self._send_queue_size = settings.ws_send_queue_size
+            if self._overflow_policy is None:
+                self._overflow_policy = OverflowPolicy(settings.ws_overflow_policy)
+        return self._send_queue_size, self._overflow_policy
+
+    @property
+    def sessions(self) -> SessionCache:
+        if self._sessions is None:
+            from ..config import get_settings
+            settings = get_settings()
+            self._sessions = SessionCache(
+                max_entries=settings.ws_session_max_entries,
+                max_bytes=settings.ws_session_max_bytes,
+                idle_ttl=settings.ws_session_idle_ttl,
+                spill=settings.ws_session_spill,
+            )
+        return self._sessions
+
+    def _run_limit(self) -> int:
+        if self._max_concurrent_runs is None:
+            from ..config import get_settings
+            self._max_concurrent_runs = get_settings().ws_max_concurrent_runs
+        return self._max_concurrent_runs
+
+    def start_run(self, chat_id: str, coro) -> Optional[asyncio.Task]:
+        """
+        Start an agent run tracked against its connection.
+
+        Returns None (and discards the coroutine) when the connection is
+        already at its concurrent run limit.
+        """
+        runs = self.runs.setdefault(chat_id, set())
+        if len(runs) >= self._run_limit():
+            coro.close()
+            return None
+        task = asyncio.create_task(coro)
+        runs.add(task)
+        task.add_done_callback(lambda t: self._forget_run(chat_id, t))
+        return task
+
+    def _forget_run(self, chat_id: str, task: asyncio.Task):
+        runs = self.runs.get(chat_id)
+        if runs is not None:
+            runs.discard(task)
+            if not runs:
+                self.runs.pop(chat_id, None)
+
+    async def cancel_runs(self, chat_id: str, timeout: float = 5.0) -> int:
+        """Cancel every in-flight run for a connection and wait for cleanup."""
+        tasks = list(self.runs.pop(chat_id, ()))
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+            logger.info(f"Cancelled {len(tasks)} agent run(s) for {chat_id}")
+        return len(tasks)
 
     async def connect(self, chat_id: str, websocket: WebSocket):
         await websocket.accept()
+        previous = self.outboxes.pop(chat_id, None)
+        if previous:
+            previous.close()
+        max_size, policy = self._outbox_settings()
         self.active_connections[chat_id] = websocket
+        self.outboxes[chat_id] = ConnectionOutbox(chat_id, websocket, max_size, policy)
         logger.info(f"WebSocket connected: {chat_id}")
 
     def disconnect(self, chat_id: str):
         self.active_connections.pop(chat_id, None)
-        # Don't delete chat_agents — preserve for session recovery
+        outbox = self.outboxes.pop(chat_id, None)
+        if outbox:
+            outbox.close()
+        # Keep the session cached — preserve for session recovery
         logger.info(f"WebSocket disconnected: {chat_id}")
 
+    def send_message(self, chat_id: str, message: dict) -> bool:
+        """Queue a raw message for a specific chat connection."""
+        outbox = self.outboxes.get(chat_id)
+        if not outbox:
+            return False
+        return outbox.put(message.get("type", ""), dumps(message))
+
     async def send_event(self, chat_id: str, event_type: str, payload: dict):
         """Send an event to a specific chat connection."""
-        ws = self.active_connections.get(chat_id)
-        if ws:
-            try:
-                await ws.send_json({"type": event_type, "payload": payload})
-            except Exception as e:
-                logger.error(f"Failed to send event to {chat_id}: {e}")
+        self.send_message(chat_id, {"type": event_type, "payload": payload})
 
     async def broadcast(self, event_type: str, payload: dict):
-        """Broadcast an event to all connections."""
-        for chat_id, ws in self.active_connections.items():
-            try:
-                await ws.send_json({"type": event_type, "payload": payload})
-            except Exception:
-                pass
+        """Broadcast an event to all connections, serialising it once."""
+        text = dumps({"type": event_type, "payload": payload})
+        for outbox in list(self.outboxes.values()):
+            outbox.put(event_type, text)
 
     async def persist_chat_state(self, chat_id: str):
         """Save chat state to Redis for session recovery."""
-        state = self.chat_agents.get(chat_id)
-        if state:
-            await save_session(f"ws:{chat_id}", state)
+        await self.sessions.persist(chat_id)
 
     async def recover_chat_state(self, chat_id: str) -> Optional[dict]:
-        """Recover chat state from Redis after reconnection."""
-        state = await get_session(f"ws:{chat_id}")
-        if state:
-            self.chat_agents[chat_id] = state
+        """Recover chat state from memory or Redis after reconnection."""
+        session = await self.sessions.get(chat_id)
+        if session:
             logger.info(f"Recovered session state for {chat_id}")
-        return state
+            return session.state
+        return None
 
 
 manager = ConnectionManager()
@@ -132,17 +320,14 @@ async def websocket_endpoint(
     await manager.connect(chat_id, websocket)
 
     # Notify client of their chat_id (useful for session recovery later)
-    await websocket.send_json({
-        "type": "connection:ready",
-        "payload": {
-            "chatId": chat_id,
-            "orgId": organization_id,
-            "recovered": recovered is not None,
-        },
+    await manager.send_event(chat_id, "connection:ready", {
+        "chatId": chat_id,
+        "orgId": organization_id,
+        "recovered": recovered is not None,
     })
 
     # Start heartbeat
-    heartbeat_task = asyncio.create_task(_heartbeat(websocket, chat_id))
+    heartbeat_task = asyncio.create_task(_heartbeat(chat_id))
 
     try:
         while True:
@@ -154,7 +339,7 @@ async def websocket_endpoint(
                 continue
 
             if event_type == "ping":
-                await websocket.send_json({"type": "pong"})
+                manager.send_message(chat_id, {"type": "pong"})
 
             elif event_type == "chat:start":
                 await _handle_chat_start(chat_id, payload, organization_id)
@@ -185,20 +370,22 @@ async def websocket_endpoint(
         await manager.persist_chat_state(chat_id)
         manager.disconnect(chat_id)
         heartbeat_task.cancel()
+        await manager.cancel_runs(chat_id)
     except Exception as e:
         logger.error(f"WebSocket error for {chat_id}: {e}")
         await manager.persist_chat_state(chat_id)
         manager.disconnect(chat_id)
         heartbeat_task.cancel()
+        await manager.cancel_runs(chat_id)
 
 
-async def _heartbeat(websocket: WebSocket, chat_id: str):
+async def _heartbeat(chat_id: str):
     """Send heartbeat every 30 seconds."""
     try:
         while True:
             await asyncio.sleep(30)
             if chat_id in manager.active_connections:
-                await websocket.send_json({"type": "ping"})
+                manager.send_message(chat_id, {"type": "ping"})
     except asyncio.CancelledError:
         pass
     except Exception as e:
@@ -212,8 +399,8 @@ async def _handle_chat_start(chat_id: str, payload: dict, org_id: str):
     # Resolve agent type from Mission Control naming
     agent_type = resolve_agent_type(request.agent_type)
 
-    # Store chat state
-    manager.chat_agents[chat_id] = {
+    # Store chat state (replacing any previous session and its agent)
+    await manager.sessions.put(chat_id, {
         "agent_type": agent_type,
         "model": request.model.get("id", "claude-sonnet-4-20250514"),
         "organization_id": request.organization_id or org_id,
@@ -221,7 +408,7 @@ async def _handle_chat_start(chat_id: str, payload: dict, org_id: str):
         "skills": request.skills.model_dump(),
         "context": request.context.model_dump(),
         "messages": [],
-    }
+    })
 
     # Persist for session recovery
     await manager.persist_chat_state(chat_id)
@@ -236,10 +423,11 @@ async def _handle_chat_start(chat_id: str, payload: dict, org_id: str):
 
 async def _handle_message(chat_id: str, payload: dict, org_id: str):
     """Handle message:send event."""
-    chat_state = manager.chat_agents.get(chat_id)
-    if not chat_state:
+    session = await manager.sessions.get(chat_id)
+    if not session:
         await manager.send_event(chat_id, "error", {"code": "CHAT_NOT_FOUND", "message": "Chat not initialized"})
         return
+    chat_state = session.state
 
     # Parse message with optional attachments
     msg = MessageWithAttachments(**payload) if "attachments" in payload else MessageWithAttachments(content=payload.get("content", payload.get("text", "")))
@@ -257,27 +445,40 @@ async def _handle_message(chat_id: str, payload: dict, org_id: str):
         chat_id=chat_id,
         organization_id=chat_state["organization_id"],
         attachments=[a.model_dump() for a in msg.attachments] if msg.attachments else [],
+        history=compact_history(chat_state.get("messages", [])),
         _sse_callback=ws_sse_callback,
     )
 
-    # Execute agent in background
-    asyncio.create_task(_run_agent_for_ws(chat_id, chat_state, context))
+    # Execute agent in background, tracked so cancel/disconnect can stop it
+    if manager.start_run(chat_id, _run_agent_for_ws(chat_id, session, context)) is None:
+        await manager.send_event(chat_id, "error", {
+            "code": "TOO_MANY_RUNS",
+            "message": "Too many agent runs in progress for this chat",
+            "recoverable": True,
+        })
 
 
-async def _run_agent_for_ws(chat_id: str, chat_state: dict, context: AgentContext):
-    """Run agent and send results via WebSocket."""
+async def _run_agent_for_ws(chat_id: str, session: CachedSession, context: AgentContext):
+    """Run the session's agent and send results via WebSocket."""
     from .routes import get_agent, AgentType
 
+    chat_state = session.state
+    agent = session.checkout_agent()
+    pooled = agent is not None
+    keep = True
     try:
-        agent_type = AgentType(chat_state["agent_type"])
-        agent = get_agent(agent_type)
+        if agent is None:
+            agent = get_agent(AgentType(chat_state["agent_type"]))
+            pooled = session.adopt_agent(agent)
+        else:
+            agent.reset_run_state()
 
         # Override model
         if chat_state.get("model"):
             agent.model = chat_state["model"]
 
         result = await agent.run(context)
-        await agent.close()
+        await manager.sessions.record_turn(chat_id, context.task, result.output)
 
         await manager.send_event(chat_id, "message:complete", {
             "chatId": chat_id,
@@ -290,6 +491,10 @@ async def _run_agent_for_ws(chat_id: str, chat_state: dict, context: AgentContex
             "createdEntities": result.created_entities,
         })
 
+    except asyncio.CancelledError:
+        # A cancelled run has closed its clients; don't hand it to the next turn
+        keep = False
+        raise
     except Exception as e:
         logger.error(f"Agent execution failed for {chat_id}: {e}")
         await manager.send_event(chat_id, "error", {
@@ -297,6 +502,12 @@ async def _run_agent_for_ws(chat_id: str, chat_state: dict, context: AgentContex
             "message": str(e),
             "recoverable": True,
         })
+    finally:
+        if agent is not None and not (pooled and session.release_agent(agent, keep=keep)):
+            try:
+                await agent.close()
+            except Exception:
+                pass
 
 
 async def _handle_action(chat_id: str, payload: dict):
@@ -313,10 +524,11 @@ async def _handle_action(chat_id: str, payload: dict):
 async def _handle_model_switch(chat_id: str, payload: dict):
     """Handle model:switch event."""
     request = SwitchModelRequest(**payload)
-    chat_state = manager.chat_agents.get(chat_id)
-    if chat_state:
-        previous_model = chat_state.get("model")
-        chat_state["model"] = request.new_model_id
+    session = await manager.sessions.get(chat_id)
+    if session:
+        previous_model = session.state.get("model")
+        session.state["model"] = request.new_model_id
+        manager.sessions.touch(chat_id)
         await manager.send_event(chat_id, "model:switch:ack", {
             "chatId": chat_id,
             "previousModel": previous_model,
@@ -349,5 +561,6 @@ async def _handle_handoff_approve(chat_id: str, payload: dict):
 
 async def _handle_cancel(chat_id: str):
     """Handle chat:cancel event."""
-    await manager.send_event(chat_id, "chat:cancelled", {"chatId": chat_id})
-    manager.chat_agents.pop(chat_id, None)
+    cancelled = await manager.cancel_runs(chat_id)
+    await manager.send_event(chat_id, "chat:cancelled", {"chatId": chat_id, "cancelledRuns": cancelled})
+    await manager.sessions.pop(chat_id)
@@ -96,6 +96,31 @@ class Settings(BaseSettings):
     # Redis (for production task queue)
     redis_url: str = "redis://localhost:6379/0"
 
+    # Workflow execution store ("memory", "redis" or "postgres")
+    execution_store_backend: str = "redis"
+    execution_cache_size: int = 256  # LRU front, executions per process
+
+    # Background job queue (Redis streams, in-memory without Redis)
+    job_queue_workers: int = 4  # Concurrent jobs per process
+    job_queue_visibility_timeout: int = 300  # Seconds before an unacked job is redelivered
+    job_queue_max_deliveries: int = 3
+
+    # Event-triggered agent runs (agent_events webhook)
+    agent_event_workers: int = 4  # Concurrent event runs per process
+    agent_event_org_concurrency: int = 2  # Per org, per process
+    agent_event_coalesce_seconds: float = 5.0  # Burst window per entity
+    agent_event_dedup_ttl: int = 3600  # Seconds a delivery is remembered
+
+    # WebSocket delivery
+    ws_send_queue_size: int = 256  # Outbound messages buffered per connection
+    ws_overflow_policy: str = "coalesce"  # "drop_oldest", "coalesce" or "disconnect"
+    ws_max_concurrent_runs: int = 2  # In-flight agent runs per connection
+    ws_per_message_deflate: bool = True  # Negotiate permessage-deflate with clients that offer it
+    ws_session_idle_ttl: int = 1800  # Seconds before an idle chat session is evicted
+    ws_session_max_entries: int = 1000  # Cached chat sessions (and agents) per process
+    ws_session_max_bytes: int = 32 * 1024 * 1024  # Cap on cached chat state
+    ws_session_spill: bool = True  # Write evicted sessions to the Redis session store
+
     # Service
     service_port: int = 8000
 
@@ -103,8 +103,9 @@ async def init_db():
     Called on application startup.
     """
     from .models import Base
-    # Import ModuleRegistration so its table is included in Base.metadata
+    # Import models defined outside models.py so their tables are included in Base.metadata
     from src.modules.registry_store import ModuleRegistration  # noqa: F401
+    from src.orchestration.store import WorkflowExecutionRecord, WorkflowStepMemoRecord  # noqa: F401
 
     eng = get_engine()
     async with eng.begin() as conn:
@@ -1,61 +1,58 @@
 """
-Module Checker — Fast lookup for installed modules with TTL cache.
+Module Checker — Fast lookup for installed modules with a shared TTL cache.
 
-Called by CoreToolkit on every agent invocation. Uses a 60-second TTL cache
-to avoid hitting the DB on every request.
+Called by CoreToolkit and the core router on every agent invocation.
+Registrations are cached for 60 seconds in the shared two-tier cache
+(process LRU + Redis), so replicas share one copy and register/deregister
+invalidations reach all of them.
 """
 
-import asyncio
 import logging
-import time
-from typing import Optional
+
+from src.services.shared_cache import org_modules_cache
 
 logger = logging.getLogger(__name__)
 
-# Simple TTL cache: {org_id: (modules_list, expiry_timestamp)}
-_cache: dict[str, tuple[list[str], float]] = {}
-_CACHE_TTL_SECONDS = 60
+
+async def _load_org_modules(org_id: str) -> list[dict]:
+    from src.modules.registry_store import get_org_modules
+
+    registrations = await get_org_modules(org_id)
+    return [
+        {"module_type": r.module_type, "agent_definition": r.agent_definition}
+        for r in registrations
+    ]
+
+
+async def get_org_module_records(org_id: str) -> list[dict]:
+    """
+    Active module registrations for an org as plain dicts
+    ({"module_type", "agent_definition"}), served from the cache.
+    """
+    return await org_modules_cache.get(org_id, lambda: _load_org_modules(org_id))
 
 
 async def get_installed_modules(org_id: str) -> list[str]:
     """
     Get the list of active module_type strings for an org.
-    Uses a 60-second TTL cache to avoid DB queries on every request.
+    Uses a 60-second shared cache to avoid DB queries on every request.
 
     Returns e.g. ["CRM", "SOCIAL_PUBLISHING", "ANALYTICS"]
     """
-    now = time.monotonic()
-
-    # Check cache
-    cached = _cache.get(org_id)
-    if cached is not None:
-        modules, expiry = cached
-        if now < expiry:
-            return modules
-
-    # Cache miss or expired — query the DB
-    from src.modules.registry_store import get_org_modules
-
     try:
-        registrations = await get_org_modules(org_id)
-        modules = [r.module_type for r in registrations]
+        records = await get_org_module_records(org_id)
     except Exception as e:
+        # Stale data is returned by the cache when it has any
         logger.error(f"Failed to fetch modules for org {org_id}: {e}")
-        # On error, return cached data if available (stale is better than nothing)
-        if cached is not None:
-            return cached[0]
         return []
-
-    # Update cache
-    _cache[org_id] = (modules, now + _CACHE_TTL_SECONDS)
-    return modules
+    return [r["module_type"] for r in records]
 
 
-def invalidate_cache(org_id: str) -> None:
-    """Invalidate the cache for a specific org. Called after register/deregister."""
-    _cache.pop(org_id, None)
+async def invalidate_cache(org_id: str) -> None:
+    """Invalidate the cache for a specific org on every replica. Called after register/deregister."""
+    await org_modules_cache.invalidate(org_id)
 
 
 def invalidate_all() -> None:
-    """Clear all cached data."""
-    _cache.clear()
+    """Clear this process's cached data (shared entries expire by TTL)."""
+    org_modules_cache.drop_local()
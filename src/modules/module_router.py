@@ -93,7 +93,7 @@ async def register_module(
     )
 
     # Invalidate the TTL cache for this org so next request sees the change
-    invalidate_cache(request.org_id)
+    await invalidate_cache(request.org_id)
 
     return ModuleRegisterResponse(
         success=True,
@@ -118,7 +118,7 @@ async def deregister_module(
     await registry_store.deregister_module(org_id, module_type)
 
     # Invalidate cache
-    invalidate_cache(org_id)
+    await invalidate_cache(org_id)
 
     return ModuleDeregisterResponse(
         success=True,
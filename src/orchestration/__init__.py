@@ -15,6 +15,7 @@ from .workflow import (
     TriggerType,
 )
 from .registry import AgentRegistry, AgentCapability
+from .store import ExecutionStore, InMemoryExecutionStore, get_execution_store
 from .templates import WorkflowTemplates
 
 __all__ = [
@@ -27,5 +28,8 @@ __all__ = [
     "TriggerType",
     "AgentRegistry",
     "AgentCapability",
+    "ExecutionStore",
+    "InMemoryExecutionStore",
+    "get_execution_store",
     "WorkflowTemplates",
 ]
@@ -0,0 +1,197 @@
+"""
+Workflow Condition Compiler
+
+Compiles condition expressions (e.g. "context.client_tier == 'premium'")
+into closures over a restricted AST, so a condition is parsed and validated
+once per workflow definition instead of being eval()'d on every step.
+
+Only a small expression language is accepted:
+- Names: context, results, previous_step (plus True/False/None)
+- Attribute access on dicts (context.foo -> context.get("foo"))
+- Subscripts, comparisons, boolean logic, arithmetic, list/tuple/set literals
+- Calls to a fixed set of helpers (len, str, int, float, bool, min, max, abs)
+"""
+
+import ast
+import operator
+from functools import lru_cache
+from typing import Any, Callable
+
+
+class ConditionError(ValueError):
+    """Raised when a condition expression is not valid for the evaluator."""
+
+
+# Scope names a condition may reference
+CONDITION_NAMES = ("context", "results", "previous_step")
+
+_SAFE_FUNCTIONS: dict[str, Callable] = {
+    "len": len,
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": bool,
+    "min": min,
+    "max": max,
+    "abs": abs,
+}
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+}
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+_UNARY_OPS = {
+    ast.Not: operator.not_,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+Evaluator = Callable[[dict], Any]
+
+
+def _get_attr(value: Any, name: str) -> Any:
+    """Attribute access resolves against dicts only; anything else is None."""
+    if isinstance(value, dict):
+        return value.get(name)
+    return None
+
+
+def _compile_node(node: ast.AST) -> Evaluator:
+    """Translate a single AST node into a closure taking the scope dict."""
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda scope: value
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name not in CONDITION_NAMES:
+            raise ConditionError(f"Unknown name '{name}'")
+        return lambda scope: scope.get(name)
+
+    if isinstance(node, ast.Attribute):
+        if node.attr.startswith("_"):
+            raise ConditionError(f"Private attribute '{node.attr}' is not allowed")
+        target = _compile_node(node.value)
+        attr = node.attr
+        return lambda scope: _get_attr(target(scope), attr)
+
+    if isinstance(node, ast.Subscript):
+        if isinstance(node.slice, ast.Slice):
+            raise ConditionError("Slices are not supported")
+        target = _compile_node(node.value)
+        index = _compile_node(node.slice)
+        return lambda scope: target(scope)[index(scope)]
+
+    if isinstance(node, ast.BoolOp):
+        values = [_compile_node(v) for v in node.values]
+        if isinstance(node.op, ast.And):
+            def _and(scope):
+                result = True
+                for v in values:
+                    result = v(scope)
+                    if not result:
+                        return result
+                return result
+            return _and
+
+        def _or(scope):
+            result = False
+            for v in values:
+                result = v(scope)
+                if result:
+                    return result
+            return result
+        return _or
+
+    if isinstance(node, ast.UnaryOp):
+        op = _UNARY_OPS.get(type(node.op))
+        if op is None:
+            raise ConditionError(f"Unsupported operator: {type(node.op).__name__}")
+        operand = _compile_node(node.operand)
+        return lambda scope: op(operand(scope))
+
+    if isinstance(node, ast.BinOp):
+        op = _BIN_OPS.get(type(node.op))
+        if op is None:
+            raise ConditionError(f"Unsupported operator: {type(node.op).__name__}")
+        left = _compile_node(node.left)
+        right = _compile_node(node.right)
+        return lambda scope: op(left(scope), right(scope))
+
+    if isinstance(node, ast.Compare):
+        left = _compile_node(node.left)
+        ops = []
+        for op_node, comparator in zip(node.ops, node.comparators):
+            op = _COMPARE_OPS.get(type(op_node))
+            if op is None:
+                raise ConditionError(f"Unsupported comparison: {type(op_node).__name__}")
+            ops.append((op, _compile_node(comparator)))
+
+        def _compare(scope):
+            current = left(scope)
+            for op, comparator in ops:
+                other = comparator(scope)
+                if not op(current, other):
+                    return False
+                current = other
+            return True
+        return _compare
+
+    if isinstance(node, ast.IfExp):
+        test = _compile_node(node.test)
+        body = _compile_node(node.body)
+        orelse = _compile_node(node.orelse)
+        return lambda scope: body(scope) if test(scope) else orelse(scope)
+
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        items = [_compile_node(e) for e in node.elts]
+        container = {ast.List: list, ast.Tuple: tuple, ast.Set: set}[type(node)]
+        return lambda scope: container(item(scope) for item in items)
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in _SAFE_FUNCTIONS:
+            raise ConditionError("Only len/str/int/float/bool/min/max/abs may be called")
+        if node.keywords:
+            raise ConditionError("Keyword arguments are not supported")
+        func = _SAFE_FUNCTIONS[node.func.id]
+        args = [_compile_node(a) for a in node.args]
+        return lambda scope: func(*(a(scope) for a in args))
+
+    raise ConditionError(f"Unsupported expression: {type(node).__name__}")
+
+
+@lru_cache(maxsize=512)
+def compile_condition(expression: str) -> Evaluator:
+    """
+    Parse and validate a condition expression once, returning a closure.
+
+    Compiled evaluators are cached by expression string, so templates that
+    are rebuilt per request reuse the same closure.
+
+    Raises:
+        ConditionError: If the expression has a syntax error or uses
+            anything outside the restricted expression language.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ConditionError(f"Invalid condition syntax: {e.msg}") from e
+    return _compile_node(tree.body)
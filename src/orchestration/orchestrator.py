@@ -10,6 +10,8 @@ The core engine that executes multi-agent workflows, managing:
 """
 
 import asyncio
+import hashlib
+import json
 import uuid
 from datetime import datetime
 from typing import Any, Callable, Optional
@@ -21,8 +23,21 @@ from .workflow import (
     WorkflowExecution,
     WorkflowStatus,
     StepType,
+    RetryPolicy,
 )
 from .registry import AgentRegistry, get_registry
+from .store import ExecutionStore, InMemoryExecutionStore
+
+# Fallback when an execution's slots weren't set up from its workflow
+DEFAULT_MAX_PARALLEL_STEPS = 5
+
+# A RUNNING execution checkpointed more recently than this may still be
+# progressing on the replica that owns it, so it isn't recovered by default
+RECOVER_STALE_AFTER = 900
+
+
+class ExecutionConflictError(ValueError):
+    """Another replica resumed or recovered the execution first."""
 
 
 @dataclass
@@ -35,6 +50,7 @@ class StepExecutionResult:
     duration_seconds: float = 0
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    memoized: bool = False
 
 
 class AgentOrchestrator:
@@ -60,6 +76,7 @@ class AgentOrchestrator:
         registry: Optional[AgentRegistry] = None,
         notification_callback: Optional[Callable] = None,
         storage_callback: Optional[Callable] = None,
+        execution_store: Optional[ExecutionStore] = None,
     ):
         """
         Initialize the orchestrator.
@@ -69,21 +86,71 @@ class AgentOrchestrator:
             registry: Agent registry for capability discovery
             notification_callback: Async function to send notifications
             storage_callback: Async function to persist execution state
+            execution_store: Where executions and workflow definitions are
+                checkpointed (defaults to a bounded in-memory store)
         """
         self.agent_factory = agent_factory
         self.registry = registry or get_registry()
         self.notification_callback = notification_callback
         self.storage_callback = storage_callback
 
-        # Active executions
-        self._executions: dict[str, WorkflowExecution] = {}
+        # Executions and workflow definitions (for resume support)
+        self.store = execution_store or InMemoryExecutionStore()
 
-        # Store workflow definitions for resume support
-        self._workflows: dict[str, Workflow] = {}
-
-        # Execution locks for thread safety
+        # Execution locks for in-flight executions only
         self._locks: dict[str, asyncio.Lock] = {}
 
+        # Per-execution concurrency slots (max_parallel_steps) and deadlines
+        self._slots: dict[str, asyncio.Semaphore] = {}
+        self._deadlines: dict[str, float] = {}
+
+    def _lock_for(self, execution_id: str) -> asyncio.Lock:
+        """Get the lock for an execution, creating it on first use."""
+        lock = self._locks.get(execution_id)
+        if lock is None:
+            lock = self._locks[execution_id] = asyncio.Lock()
+        return lock
+
+    def _start_clock(self, execution: WorkflowExecution, workflow: Workflow):
+        """Set up the concurrency slots and deadline for an execution run."""
+        self._slots[execution.id] = asyncio.Semaphore(workflow.max_parallel_steps)
+        self._deadlines[execution.id] = (
+            asyncio.get_running_loop().time() + workflow.timeout_seconds
+        )
+
+    def _time_left(self, execution_id: str) -> float:
+        """Seconds until the workflow deadline (inf if none is set)."""
+        deadline = self._deadlines.get(execution_id)
+        if deadline is None:
+            return float("inf")
+        return deadline - asyncio.get_running_loop().time()
+
+    def _slot_for(self, execution_id: str) -> asyncio.Semaphore:
+        slot = self._slots.get(execution_id)
+        if slot is None:
+            slot = self._slots[execution_id] = asyncio.Semaphore(DEFAULT_MAX_PARALLEL_STEPS)
+        return slot
+
+    async def _checkpoint(self, execution: WorkflowExecution, final: bool = False):
+        """Persist execution state so any replica can continue it."""
+        execution.checkpointed_at = datetime.now()
+        await self.store.save_execution(execution)
+        if final:
+            self._locks.pop(execution.id, None)
+            self._slots.pop(execution.id, None)
+            self._deadlines.pop(execution.id, None)
+
+    async def _claim(self, execution: WorkflowExecution, loaded_checkpoint: Optional[datetime]):
+        """
+        Checkpoint a loaded execution only if no replica has saved it since
+        it was loaded, so two replicas can't resume or recover the same run.
+        """
+        execution.checkpointed_at = datetime.now()
+        if not await self.store.compare_and_set_execution(execution, loaded_checkpoint):
+            raise ExecutionConflictError(
+                f"Execution {execution.id} was taken over by another replica"
+            )
+
     async def run_workflow(
         self,
         workflow: Workflow,
@@ -125,9 +192,9 @@ class AgentOrchestrator:
         )
 
         # Store and track execution
-        self._executions[execution.id] = execution
-        self._workflows[workflow.id] = workflow
-        self._locks[execution.id] = asyncio.Lock()
+        await self.store.save_execution(execution)
+        await self.store.save_workflow(execution.id, workflow)
+        self._start_clock(execution, workflow)
 
         # Emit workflow_start notification
         if self.notification_callback:
@@ -180,6 +247,7 @@ class AgentOrchestrator:
 
         finally:
             # Persist final state
+            await self._checkpoint(execution, final=True)
             if self.storage_callback:
                 await self.storage_callback(execution)
 
@@ -197,11 +265,12 @@ class AgentOrchestrator:
         parallel_steps = [s for s in steps if s.step_type == StepType.PARALLEL]
         sequential_steps = [s for s in steps if s.step_type != StepType.PARALLEL]
 
-        # Execute parallel steps concurrently
+        # Execute parallel steps concurrently; max_parallel_steps is enforced
+        # by the execution's slots, which are only held while an agent runs
         if parallel_steps:
             parallel_tasks = [
                 self._execute_single_step(workflow, execution, step)
-                for step in parallel_steps[:workflow.max_parallel_steps]
+                for step in parallel_steps
             ]
             await asyncio.gather(*parallel_tasks, return_exceptions=True)
 
@@ -221,6 +290,15 @@ class AgentOrchestrator:
     ) -> StepExecutionResult:
         """Execute a single workflow step."""
 
+        # Already checkpointed (recovered execution): only continue downstream
+        if step.id in execution.completed_steps:
+            await self._execute_next_steps(workflow, execution, step)
+            return StepExecutionResult(
+                step_id=step.id,
+                success=True,
+                result=execution.step_results.get(step.id, {}),
+            )
+
         result = StepExecutionResult(
             step_id=step.id,
             success=False,
@@ -256,12 +334,13 @@ class AgentOrchestrator:
                         "completed_steps": len(execution.completed_steps),
                         "total_steps": len(workflow.steps),
                     })
+                await self._checkpoint(execution)
                 result.success = True
                 result.result = {"awaiting_review": True}
                 return result
 
             # Mark step as current
-            async with self._locks[execution.id]:
+            async with self._lock_for(execution.id):
                 execution.current_steps.append(step.id)
 
             # Emit step_progress (running)
@@ -283,36 +362,66 @@ class AgentOrchestrator:
             # Build tool input from mapping
             tool_input = self._build_tool_input(step.input_mapping, execution.context)
 
+            # Reuse a memoized result for identical input
+            memo_key = None
+            if step.memoize:
+                memo_key = self._memo_key(step, tool_input, execution.organization_id)
+                cached = await self.store.load_step_result(memo_key)
+                if cached is not None:
+                    result.success = True
+                    result.result = cached
+                    result.memoized = True
+                    return result
+
             # Execute with retry logic
+            policy = step.retry_policy or RetryPolicy()
             last_error = None
             for attempt in range(step.retry_count):
+                # Attempts never run past the workflow deadline
+                timeout = min(step.timeout_seconds, self._time_left(execution.id))
+                if timeout <= 0:
+                    last_error = last_error or "Workflow deadline exceeded"
+                    break
+
+                error_kind = None
                 try:
-                    # Execute the agent tool
-                    tool_result = await asyncio.wait_for(
-                        agent._execute_tool(step.tool, tool_input),
-                        timeout=step.timeout_seconds,
-                    )
+                    # Execute the agent tool, holding a concurrency slot
+                    async with self._slot_for(execution.id):
+                        tool_result = await asyncio.wait_for(
+                            agent._execute_tool(step.tool, tool_input),
+                            timeout=timeout,
+                        )
 
                     # Check for error in result
                     if isinstance(tool_result, dict) and "error" in tool_result:
-                        raise Exception(tool_result["error"])
-
-                    # Success!
-                    result.success = True
-                    result.result = tool_result
-                    break
+                        error_kind = "error_result"
+                        last_error = str(tool_result["error"])
+                    else:
+                        # Success!
+                        result.success = True
+                        result.result = tool_result
+                        break
 
                 except asyncio.TimeoutError:
-                    last_error = f"Step timed out after {step.timeout_seconds}s"
+                    error_kind = "timeout"
+                    last_error = f"Step timed out after {timeout:g}s"
                 except Exception as e:
+                    error_kind = "exception"
                     last_error = str(e)
 
-                # Wait before retry
-                if attempt < step.retry_count - 1:
-                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                if attempt >= step.retry_count - 1 or not policy.should_retry(error_kind, last_error):
+                    break
+
+                # Back off outside the slot so sibling steps can use it
+                delay = policy.backoff(attempt)
+                if delay >= self._time_left(execution.id):
+                    break
+                await asyncio.sleep(delay)
 
             if not result.success:
                 result.error = last_error
+            elif memo_key:
+                await self.store.save_step_result(memo_key, result.result)
 
         except Exception as e:
             result.error = str(e)
@@ -324,7 +433,7 @@ class AgentOrchestrator:
             ).total_seconds() if result.started_at else 0
 
             # Update execution state
-            async with self._locks[execution.id]:
+            async with self._lock_for(execution.id):
                 if result.success:
                     execution.set_step_result(step.id, result.result)
                     # Store result in context under output_key
@@ -340,6 +449,7 @@ class AgentOrchestrator:
                             "agent": step.agent,
                             "status": "completed",
                             "duration_seconds": result.duration_seconds,
+                            "memoized": result.memoized,
                         })
                 else:
                     execution.mark_step_failed(step.id, result.error or "Unknown error")
@@ -365,17 +475,48 @@ class AgentOrchestrator:
                         if skip_step:
                             await self._execute_single_step(workflow, execution, skip_step)
 
+            # Step-level checkpoint
+            await self._checkpoint(execution)
+
             # Execute next steps if successful
-            if result.success and step.next_steps and execution.status == WorkflowStatus.RUNNING:
-                next_step_objs = [
-                    workflow.get_step(sid) for sid in step.next_steps
-                ]
-                next_step_objs = [s for s in next_step_objs if s is not None]
-                if next_step_objs:
-                    await self._execute_steps(workflow, execution, next_step_objs)
+            if result.success:
+                await self._execute_next_steps(workflow, execution, step)
 
         return result
 
+    async def _execute_next_steps(
+        self,
+        workflow: Workflow,
+        execution: WorkflowExecution,
+        step: WorkflowStep,
+    ):
+        """Execute the steps that follow a completed step."""
+        if not step.next_steps or execution.status != WorkflowStatus.RUNNING:
+            return
+        next_step_objs = [workflow.get_step(sid) for sid in step.next_steps]
+        next_step_objs = [s for s in next_step_objs if s is not None]
+        if next_step_objs:
+            await self._execute_steps(workflow, execution, next_step_objs)
+
+    @staticmethod
+    def _memo_key(step: WorkflowStep, tool_input: dict, organization_id: str) -> str:
+        """
+        Key a step result by (org, agent, tool, resolved input, memo_version).
+        Scoped per org so tenants never share results.
+        """
+        payload = json.dumps(
+            {
+                "org": organization_id,
+                "agent": step.agent,
+                "tool": step.tool,
+                "input": tool_input,
+                "version": step.memo_version,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
     def _build_tool_input(self, mapping: dict, context: dict) -> dict:
         """
         Build tool input from mapping and context.
@@ -421,22 +562,26 @@ class AgentOrchestrator:
         Returns:
             Updated WorkflowExecution
         """
-        execution = self._executions.get(execution_id)
+        execution = await self.store.load_execution(execution_id)
         if not execution:
             raise ValueError(f"Execution not found: {execution_id}")
 
         if execution.status != WorkflowStatus.PAUSED:
             raise ValueError(f"Execution is not paused: {execution.status}")
 
+        loaded_checkpoint = execution.checkpointed_at
         execution.review_notes = review_notes
 
         if approval:
             execution.status = WorkflowStatus.RUNNING
             execution.set_step_result(execution.pending_review, {"approved": True, "notes": review_notes})
+            await self._claim(execution, loaded_checkpoint)
 
             # Retrieve workflow and find remaining steps after the review step
-            workflow = self._workflows.get(execution.workflow_id)
+            workflow = await self.store.load_workflow(execution_id)
             if workflow:
+                # Time spent waiting on the reviewer doesn't count
+                self._start_clock(execution, workflow)
                 review_step = workflow.get_step(execution.pending_review)
                 if review_step and review_step.next_steps:
                     remaining = [workflow.get_step(sid) for sid in review_step.next_steps]
@@ -453,17 +598,85 @@ class AgentOrchestrator:
         else:
             execution.status = WorkflowStatus.CANCELLED
             execution.completed_at = datetime.now()
+            await self._claim(execution, loaded_checkpoint)
+
+        await self._checkpoint(execution, final=True)
+        return execution
+
+    async def recover_workflow(
+        self,
+        execution_id: str,
+        stale_after: Optional[float] = RECOVER_STALE_AFTER,
+    ) -> WorkflowExecution:
+        """
+        Continue a RUNNING execution from its last step checkpoint, e.g. after
+        the replica that started it was scaled down. Completed steps are not
+        re-executed; their results are already in the checkpointed context.
+
+        Args:
+            execution_id: ID of the interrupted execution
+            stale_after: Refuse executions checkpointed fewer than this many
+                seconds ago (None to recover regardless)
+
+        Returns:
+            Updated WorkflowExecution
+        """
+        execution = await self.store.load_execution(execution_id)
+        if not execution:
+            raise ValueError(f"Execution not found: {execution_id}")
+
+        if execution.status != WorkflowStatus.RUNNING:
+            raise ValueError(f"Execution is not running: {execution.status}")
+
+        loaded_checkpoint = execution.checkpointed_at
+        idle = self.seconds_since_checkpoint(execution)
+        if stale_after is not None and idle is not None and idle < stale_after:
+            raise ValueError(
+                f"Execution was checkpointed {idle:.0f}s ago and may still be running"
+            )
+
+        workflow = await self.store.load_workflow(execution_id)
+        if not workflow:
+            raise ValueError(f"Workflow definition not found for execution: {execution_id}")
+
+        # Steps in flight on the dead replica have to run again
+        execution.current_steps = []
+        await self._claim(execution, loaded_checkpoint)
+        self._start_clock(execution, workflow)
+
+        try:
+            await self._execute_steps(workflow, execution, workflow.get_entry_steps())
+            if execution.status == WorkflowStatus.RUNNING:
+                execution.status = WorkflowStatus.COMPLETED
+                execution.completed_at = datetime.now()
+        except Exception:
+            execution.status = WorkflowStatus.FAILED
+            execution.completed_at = datetime.now()
+            raise
+        finally:
+            await self._checkpoint(execution, final=True)
 
         return execution
 
+    @staticmethod
+    def seconds_since_checkpoint(execution: WorkflowExecution) -> Optional[float]:
+        """Seconds since the execution last saved progress (None if never)."""
+        if execution.checkpointed_at is None:
+            return None
+        return (datetime.now() - execution.checkpointed_at).total_seconds()
+
     def get_execution(self, execution_id: str) -> Optional[WorkflowExecution]:
-        """Get an execution by ID."""
-        return self._executions.get(execution_id)
+        """Get an execution by ID from the local cache."""
+        return self.store.peek(execution_id)
+
+    async def load_execution(self, execution_id: str) -> Optional[WorkflowExecution]:
+        """Get an execution by ID, falling back to the persistent store."""
+        return await self.store.load_execution(execution_id)
 
     def get_active_executions(self, organization_id: str = None) -> list[WorkflowExecution]:
-        """Get all active (running or paused) executions."""
+        """Get all active (running or paused) executions held by this process."""
         active = [
-            e for e in self._executions.values()
+            e for e in self.store.cached_executions()
             if e.status in [WorkflowStatus.RUNNING, WorkflowStatus.PAUSED]
         ]
         if organization_id:
@@ -532,6 +745,7 @@ class WorkflowBuilder:
         step_type: StepType = StepType.SEQUENTIAL,
         condition: str = None,
         description: str = "",
+        memoize: bool = False,
     ) -> "WorkflowBuilder":
         """Add a step to the workflow."""
         step = WorkflowStep(
@@ -542,6 +756,7 @@ class WorkflowBuilder:
             input_mapping=input_mapping or {},
             step_type=step_type,
             description=description,
+            memoize=memoize,
         )
         if condition:
             from .workflow import WorkflowCondition
@@ -6,11 +6,31 @@ Agents register their capabilities, allowing workflows to dynamically
 select the right agent for each task.
 """
 
+import bisect
+import re
 from dataclasses import dataclass, field
 from typing import Any, Optional
 from enum import Enum
 
 
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Weight of a term by the field it appears in (tool names are the strongest signal)
+_FIELD_WEIGHTS = {
+    "tool_name": 3.0,
+    "use_cases": 2.0,
+    "description": 1.0,
+    "example_prompts": 0.5,
+}
+# Score multiplier for a query token that only prefix-matches a term
+_PREFIX_WEIGHT = 0.5
+
+
+def _tokenize(text: str) -> list[str]:
+    """Lowercase word tokens; snake_case tool names split into words."""
+    return _TOKEN_RE.findall(text.lower())
+
+
 class CapabilityCategory(Enum):
     """Categories of agent capabilities."""
     RESEARCH = "research"
@@ -105,6 +125,10 @@ class AgentRegistry:
     def __init__(self):
         self._agents: dict[str, AgentInfo] = {}
         self._capability_index: dict[str, list[str]] = {}  # capability -> agent_ids
+        # term -> {(agent_id, tool_name): weight}, for search_capabilities
+        self._term_index: dict[str, dict[tuple[str, str], float]] = {}
+        self._sorted_terms: Optional[list[str]] = None  # for prefix lookups
+        self._dict_cache: Optional[dict] = None  # serialized to_dict() view
         self._initialize_agents()
 
     def _initialize_agents(self):
@@ -394,6 +418,8 @@ class AgentRegistry:
 
     def register_agent(self, agent: AgentInfo):
         """Register an agent and index its capabilities."""
+        if agent.agent_id in self._agents:
+            self._unindex_agent(self._agents[agent.agent_id])
         self._agents[agent.agent_id] = agent
 
         # Index capabilities for fast lookup
@@ -402,6 +428,32 @@ class AgentRegistry:
                 self._capability_index[capability.tool_name] = []
             self._capability_index[capability.tool_name].append(agent.agent_id)
 
+            key = (agent.agent_id, capability.tool_name)
+            for field_name, weight in _FIELD_WEIGHTS.items():
+                value = getattr(capability, field_name)
+                texts = value if isinstance(value, list) else [value]
+                for text in texts:
+                    for term in _tokenize(text):
+                        postings = self._term_index.setdefault(term, {})
+                        postings[key] = max(postings.get(key, 0.0), weight)
+
+        self._sorted_terms = None
+        self._dict_cache = None
+
+    def _unindex_agent(self, agent: AgentInfo):
+        """Drop an agent's entries from the capability and term indexes."""
+        for capability in agent.capabilities:
+            agent_ids = self._capability_index.get(capability.tool_name, [])
+            if agent.agent_id in agent_ids:
+                agent_ids.remove(agent.agent_id)
+
+        for term in list(self._term_index):
+            postings = self._term_index[term]
+            for key in [k for k in postings if k[0] == agent.agent_id]:
+                del postings[key]
+            if not postings:
+                del self._term_index[term]
+
     def get_agent(self, agent_id: str) -> Optional[AgentInfo]:
         """Get agent info by ID."""
         return self._agents.get(agent_id)
@@ -440,20 +492,69 @@ class AgentRegistry:
                 return cap.input_schema
         return None
 
-    def search_capabilities(self, query: str) -> list[tuple[AgentInfo, AgentCapability]]:
-        """Search capabilities by keyword."""
-        query_lower = query.lower()
+    def _match_term(self, token: str) -> dict[tuple[str, str], float]:
+        """Score capabilities for one query token (exact or prefix match)."""
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._term_index)
+
+        scores: dict[tuple[str, str], float] = {}
+        start = bisect.bisect_left(self._sorted_terms, token)
+        for term in self._sorted_terms[start:]:
+            if not term.startswith(token):
+                break
+            factor = 1.0 if term == token else _PREFIX_WEIGHT
+            for key, weight in self._term_index[term].items():
+                scores[key] = max(scores.get(key, 0.0), weight * factor)
+        return scores
+
+    def search_capabilities(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+    ) -> list[tuple[AgentInfo, AgentCapability]]:
+        """
+        Search capabilities by keyword, best matches first.
+
+        Every query word must match a term in the capability's tool name,
+        description, use cases or example prompts, either exactly or as a
+        prefix ("perf" matches "performance").
+        """
+        tokens = _tokenize(query)
+        if not tokens:
+            return []
+
+        scores: Optional[dict[tuple[str, str], float]] = None
+        for token in tokens:
+            token_scores = self._match_term(token)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {k: v + token_scores[k] for k, v in scores.items() if k in token_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+
         results = []
-        for agent in self._agents.values():
-            for cap in agent.capabilities:
-                if (query_lower in cap.tool_name.lower() or
-                    query_lower in cap.description.lower() or
-                    any(query_lower in uc.lower() for uc in cap.use_cases)):
-                    results.append((agent, cap))
+        for (agent_id, tool_name), _ in ranked:
+            agent = self._agents[agent_id]
+            results.append((agent, agent.get_capability(tool_name)))
         return results
 
     def to_dict(self) -> dict:
-        """Export registry as dictionary for API/UI consumption."""
+        """
+        Export registry as dictionary for API/UI consumption.
+
+        The result is cached until the next register_agent() call; treat it
+        as read-only.
+        """
+        if self._dict_cache is None:
+            self._dict_cache = self._build_dict()
+        return self._dict_cache
+
+    def _build_dict(self) -> dict:
         return {
             "agents": [
                 {
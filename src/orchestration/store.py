@@ -0,0 +1,545 @@
+"""
+Workflow Execution Store
+
+Pluggable persistence for orchestrator state so executions are bounded in
+memory and survive pod restarts (e.g. HPA scale-down):
+
+- InMemoryExecutionStore: LRU-bounded, TTL-evicting local store. Used on
+  its own in tests/dev, and as the front cache for the durable backends.
+- RedisExecutionStore: JSON checkpoints via task_store (native key TTLs).
+- PostgresExecutionStore: rows in workflow_executions with expires_at.
+- TieredExecutionStore: in-memory LRU front over a durable backend.
+
+Stores also hold memoized step results (WorkflowStep.memoize), so retries
+and near-duplicate runs reuse completed agent work.
+
+The orchestrator checkpoints after every step, so any replica can load an
+execution and continue it (see AgentOrchestrator.resume_workflow and
+AgentOrchestrator.recover_workflow).
+"""
+
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import Column, String, DateTime, JSON, delete
+
+from ..db.models import Base
+from ..db.session import get_session_factory
+from .workflow import Workflow, WorkflowExecution
+
+logger = logging.getLogger(__name__)
+
+# Finished executions are kept long enough for status polling/debugging
+FINISHED_TTL = 86400  # 24 hours
+# Running/paused executions may wait days on a human review
+ACTIVE_TTL = 7 * 86400  # 7 days
+# Memoized step results (see WorkflowStep.memoize)
+MEMO_TTL = 86400  # 24 hours
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_MEMO_SIZE = 1024
+
+
+def _ttl_for(execution: WorkflowExecution) -> int:
+    return FINISHED_TTL if execution.is_finished() else ACTIVE_TTL
+
+
+class ExecutionStore(ABC):
+    """Interface for persisting workflow executions and their definitions."""
+
+    @abstractmethod
+    async def save_execution(self, execution: WorkflowExecution) -> None:
+        """Checkpoint an execution."""
+
+    @abstractmethod
+    async def load_execution(self, execution_id: str) -> Optional[WorkflowExecution]:
+        """Load an execution checkpoint, or None if unknown/expired."""
+
+    @abstractmethod
+    async def compare_and_set_execution(
+        self, execution: WorkflowExecution, expected_checkpoint: Optional[datetime],
+    ) -> bool:
+        """
+        Checkpoint an execution only if the stored copy is still the one
+        checkpointed at expected_checkpoint. Returns False if another
+        replica saved it in the meantime.
+        """
+
+    @abstractmethod
+    async def delete_execution(self, execution_id: str) -> None:
+        """Remove an execution and its workflow definition."""
+
+    @abstractmethod
+    async def save_workflow(self, execution_id: str, workflow: Workflow) -> None:
+        """Persist the workflow definition an execution is running."""
+
+    @abstractmethod
+    async def load_workflow(self, execution_id: str) -> Optional[Workflow]:
+        """Load the workflow definition for an execution."""
+
+    @abstractmethod
+    async def save_step_result(self, memo_key: str, result: dict, ttl: int = MEMO_TTL) -> None:
+        """Store a memoized step result."""
+
+    @abstractmethod
+    async def load_step_result(self, memo_key: str) -> Optional[dict]:
+        """Load a memoized step result, or None on a miss."""
+
+    def peek(self, execution_id: str) -> Optional[WorkflowExecution]:
+        """Return a locally cached execution without I/O, if any."""
+        return None
+
+    def cached_executions(self) -> list[WorkflowExecution]:
+        """Executions currently held in local memory."""
+        return []
+
+
+# ── In-memory (LRU + TTL) ────────────────────────────────────────
+
+class InMemoryExecutionStore(ExecutionStore):
+    """
+    Bounded local store. Entries are evicted least-recently-used once
+    max_entries is reached, and finished executions expire after
+    finished_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_CACHE_SIZE,
+        finished_ttl: int = FINISHED_TTL,
+        max_memo_entries: int = DEFAULT_MEMO_SIZE,
+    ):
+        self.max_entries = max_entries
+        self.finished_ttl = finished_ttl
+        self.max_memo_entries = max_memo_entries
+        # execution_id -> (execution, workflow, expires_at or None,
+        #                  checkpointed_at as of the last put)
+        self._entries: OrderedDict[str, list] = OrderedDict()
+        # memo_key -> (result, expires_at)
+        self._memo: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+
+    def _expired(self, entry: list, now: float) -> bool:
+        return entry[2] is not None and entry[2] <= now
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _entry(self, execution_id: str) -> Optional[list]:
+        entry = self._entries.get(execution_id)
+        if entry is None:
+            return None
+        if self._expired(entry, time.monotonic()):
+            del self._entries[execution_id]
+            return None
+        self._entries.move_to_end(execution_id)
+        return entry
+
+    async def save_execution(self, execution: WorkflowExecution) -> None:
+        self.put(execution)
+
+    def put(self, execution: WorkflowExecution, workflow: Optional[Workflow] = None) -> None:
+        """Synchronously cache an execution (and optionally its workflow)."""
+        entry = self._entries.get(execution.id)
+        expires_at = (
+            time.monotonic() + self.finished_ttl if execution.is_finished() else None
+        )
+        if entry is None:
+            self._entries[execution.id] = [
+                execution, workflow, expires_at, execution.checkpointed_at,
+            ]
+        else:
+            entry[0] = execution
+            entry[2] = expires_at
+            entry[3] = execution.checkpointed_at
+            if workflow is not None:
+                entry[1] = workflow
+        self._entries.move_to_end(execution.id)
+        self._evict()
+
+    async def load_execution(self, execution_id: str) -> Optional[WorkflowExecution]:
+        return self.peek(execution_id)
+
+    async def compare_and_set_execution(
+        self, execution: WorkflowExecution, expected_checkpoint: Optional[datetime],
+    ) -> bool:
+        # Callers mutate the cached object itself, so compare against the
+        # checkpoint recorded at put time rather than entry[0]
+        entry = self._entry(execution.id)
+        if entry is None or entry[3] != expected_checkpoint:
+            return False
+        self.put(execution)
+        return True
+
+    async def delete_execution(self, execution_id: str) -> None:
+        self._entries.pop(execution_id, None)
+
+    async def save_workflow(self, execution_id: str, workflow: Workflow) -> None:
+        entry = self._entry(execution_id)
+        if entry is not None:
+            entry[1] = workflow
+
+    async def load_workflow(self, execution_id: str) -> Optional[Workflow]:
+        entry = self._entry(execution_id)
+        return entry[1] if entry else None
+
+    async def save_step_result(self, memo_key: str, result: dict, ttl: int = MEMO_TTL) -> None:
+        self._memo[memo_key] = (result, time.monotonic() + ttl)
+        self._memo.move_to_end(memo_key)
+        while len(self._memo) > self.max_memo_entries:
+            self._memo.popitem(last=False)
+
+    async def load_step_result(self, memo_key: str) -> Optional[dict]:
+        entry = self._memo.get(memo_key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._memo[memo_key]
+            return None
+        self._memo.move_to_end(memo_key)
+        return entry[0]
+
+    def peek(self, execution_id: str) -> Optional[WorkflowExecution]:
+        entry = self._entry(execution_id)
+        return entry[0] if entry else None
+
+    def cached_executions(self) -> list[WorkflowExecution]:
+        self._evict()
+        return [e[0] for e in self._entries.values()]
+
+
+# ── Redis ────────────────────────────────────────────────────────
+
+class RedisExecutionStore(ExecutionStore):
+    """
+    Durable store on top of task_store's Redis client. Key TTLs handle
+    eviction: finished executions expire after FINISHED_TTL.
+    """
+
+    @staticmethod
+    def _execution_key(execution_id: str) -> str:
+        return f"workflow_execution:{execution_id}"
+
+    @staticmethod
+    def _workflow_key(execution_id: str) -> str:
+        return f"workflow_definition:{execution_id}"
+
+    @staticmethod
+    def _memo_key(memo_key: str) -> str:
+        return f"workflow_step_memo:{memo_key}"
+
+    async def _expire_finished(self, execution: WorkflowExecution) -> None:
+        # The definition was saved with ACTIVE_TTL; let it go with the execution
+        if execution.is_finished():
+            from ..services.task_store import store_expire
+            await store_expire(self._workflow_key(execution.id), FINISHED_TTL)
+
+    async def save_execution(self, execution: WorkflowExecution) -> None:
+        from ..services.task_store import store_set
+        # Round-trip through JSON so agent results with odd types still persist
+        data = json.loads(json.dumps(execution.to_dict(), default=str))
+        await store_set(self._execution_key(execution.id), data, ttl=_ttl_for(execution))
+        await self._expire_finished(execution)
+
+    async def load_execution(self, execution_id: str) -> Optional[WorkflowExecution]:
+        from ..services.task_store import store_get
+        data = await store_get(self._execution_key(execution_id))
+        return WorkflowExecution.from_dict(data) if data else None
+
+    async def compare_and_set_execution(
+        self, execution: WorkflowExecution, expected_checkpoint: Optional[datetime],
+    ) -> bool:
+        from ..services.task_store import store_compare_and_set
+        data = json.loads(json.dumps(execution.to_dict(), default=str))
+        applied = await store_compare_and_set(
+            self._execution_key(execution.id),
+            data,
+            "checkpointed_at",
+            expected_checkpoint.isoformat() if expected_checkpoint else None,
+            ttl=_ttl_for(execution),
+        )
+        if applied:
+            await self._expire_finished(execution)
+        return applied
+
+    async def delete_execution(self, execution_id: str) -> None:
+        from ..services.task_store import store_delete
+        await store_delete(self._execution_key(execution_id))
+        await store_delete(self._workflow_key(execution_id))
+
+    async def save_workflow(self, execution_id: str, workflow: Workflow) -> None:
+        from ..services.task_store import store_set
+        await store_set(self._workflow_key(execution_id), workflow.to_dict(), ttl=ACTIVE_TTL)
+
+    async def load_workflow(self, execution_id: str) -> Optional[Workflow]:
+        from ..services.task_store import store_get
+        data = await store_get(self._workflow_key(execution_id))
+        return Workflow.from_dict(data) if data else None
+
+    async def save_step_result(self, memo_key: str, result: dict, ttl: int = MEMO_TTL) -> None:
+        from ..services.task_store import store_set
+        data = json.loads(json.dumps({"result": result}, default=str))
+        await store_set(self._memo_key(memo_key), data, ttl=ttl)
+
+    async def load_step_result(self, memo_key: str) -> Optional[dict]:
+        from ..services.task_store import store_get
+        data = await store_get(self._memo_key(memo_key))
+        return data["result"] if data else None
+
+
+# ── Postgres ─────────────────────────────────────────────────────
+
+class WorkflowExecutionRecord(Base):
+    """Checkpointed orchestrator execution plus its workflow definition."""
+    __tablename__ = "workflow_executions"
+
+    id = Column(String, primary_key=True)
+    workflow_id = Column(String, nullable=False)
+    organization_id = Column(String, nullable=False, default="", index=True)
+    status = Column(String, nullable=False)
+    data = Column(JSON, nullable=False)
+    workflow = Column(JSON, nullable=True)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class WorkflowStepMemoRecord(Base):
+    """Memoized result of a workflow step, keyed by its resolved input."""
+    __tablename__ = "workflow_step_memos"
+
+    key = Column(String, primary_key=True)
+    result = Column(JSON, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class PostgresExecutionStore(ExecutionStore):
+    """
+    Durable store in the workflow_executions and workflow_step_memos
+    tables. Rows past expires_at are purged opportunistically on write (at most once per purge_interval).
+    """
+
+    def __init__(self, purge_interval: int = 300):
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+
+    async def _purge_expired(self, session) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        cutoff = datetime.now(timezone.utc)
+        await session.execute(
+            delete(WorkflowExecutionRecord).where(WorkflowExecutionRecord.expires_at < cutoff)
+        )
+        await session.execute(
+            delete(WorkflowStepMemoRecord).where(WorkflowStepMemoRecord.expires_at < cutoff)
+        )
+
+    @staticmethod
+    def _fill_record(record: WorkflowExecutionRecord, execution: WorkflowExecution) -> None:
+        now = datetime.now(timezone.utc)
+        record.workflow_id = execution.workflow_id
+        record.organization_id = execution.organization_id or ""
+        record.status = execution.status.value
+        record.data = json.loads(json.dumps(execution.to_dict(), default=str))
+        record.updated_at = now
+        record.expires_at = now + timedelta(seconds=_ttl_for(execution))
+
+    async def save_execution(self, execution: WorkflowExecution) -> None:
+        async with get_session_factory()() as session:
+            record = await session.get(WorkflowExecutionRecord, execution.id)
+            if record is None:
+                record = WorkflowExecutionRecord(id=execution.id)
+                session.add(record)
+            self._fill_record(record, execution)
+            await self._purge_expired(session)
+            await session.commit()
+
+    async def load_execution(self, execution_id: str) -> Optional[WorkflowExecution]:
+        async with get_session_factory()() as session:
+            record = await session.get(WorkflowExecutionRecord, execution_id)
+            if record is None or record.expires_at < datetime.now(timezone.utc):
+                return None
+            return WorkflowExecution.from_dict(record.data)
+
+    async def compare_and_set_execution(
+        self, execution: WorkflowExecution, expected_checkpoint: Optional[datetime],
+    ) -> bool:
+        expected = expected_checkpoint.isoformat() if expected_checkpoint else None
+        async with get_session_factory()() as session:
+            record = await session.get(
+                WorkflowExecutionRecord, execution.id, with_for_update=True,
+            )
+            if record is None or record.data.get("checkpointed_at") != expected:
+                return False
+            self._fill_record(record, execution)
+            await session.commit()
+            return True
+
+    async def delete_execution(self, execution_id: str) -> None:
+        async with get_session_factory()() as session:
+            await session.execute(
+                delete(WorkflowExecutionRecord).where(WorkflowExecutionRecord.id == execution_id)
+            )
+            await session.commit()
+
+    async def save_workflow(self, execution_id: str, workflow: Workflow) -> None:
+        async with get_session_factory()() as session:
+            record = await session.get(WorkflowExecutionRecord, execution_id)
+            if record is None:
+                logger.warning(f"save_workflow before save_execution for {execution_id}")
+                return
+            record.workflow = workflow.to_dict()
+            await session.commit()
+
+    async def load_workflow(self, execution_id: str) -> Optional[Workflow]:
+        async with get_session_factory()() as session:
+            record = await session.get(WorkflowExecutionRecord, execution_id)
+            if record is None or not record.workflow:
+                return None
+            return Workflow.from_dict(record.workflow)
+
+    async def save_step_result(self, memo_key: str, result: dict, ttl: int = MEMO_TTL) -> None:
+        data = json.loads(json.dumps(result, default=str))
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        async with get_session_factory()() as session:
+            record = await session.get(WorkflowStepMemoRecord, memo_key)
+            if record is None:
+                record = WorkflowStepMemoRecord(key=memo_key)
+                session.add(record)
+            record.result = data
+            record.expires_at = expires_at
+            await session.commit()
+
+    async def load_step_result(self, memo_key: str) -> Optional[dict]:
+        async with get_session_factory()() as session:
+            record = await session.get(WorkflowStepMemoRecord, memo_key)
+            if record is None or record.expires_at < datetime.now(timezone.utc):
+                return None
+            return record.result
+
+
+# ── Tiered (LRU front + durable backend) ─────────────────────────
+
+class TieredExecutionStore(ExecutionStore):
+    """
+    In-memory LRU in front of a durable backend. Writes go through to the
+    backend. Only finished executions are served from the front; anything
+    still running or paused may have been advanced by another replica, so
+    it is re-read from the backend.
+    """
+
+    def __init__(self, backend: ExecutionStore, front: Optional[InMemoryExecutionStore] = None):
+        self.backend = backend
+        self.front = front or InMemoryExecutionStore()
+
+    async def save_execution(self, execution: WorkflowExecution) -> None:
+        self.front.put(execution)
+        try:
+            await self.backend.save_execution(execution)
+        except Exception as e:
+            logger.warning(f"Execution checkpoint failed for {execution.id}: {e}")
+
+    async def load_execution(self, execution_id: str) -> Optional[WorkflowExecution]:
+        cached = self.front.peek(execution_id)
+        if cached is not None and cached.is_finished():
+            return cached
+        try:
+            execution = await self.backend.load_execution(execution_id)
+        except Exception as e:
+            logger.warning(f"Execution load failed for {execution_id}: {e}")
+            return cached
+        if execution is None:
+            return cached
+        if cached is not None and cached.checkpointed_at == execution.checkpointed_at:
+            # Keep handing out the object a local run may still be updating
+            return cached
+        self.front.put(execution)
+        return execution
+
+    async def compare_and_set_execution(
+        self, execution: WorkflowExecution, expected_checkpoint: Optional[datetime],
+    ) -> bool:
+        try:
+            applied = await self.backend.compare_and_set_execution(execution, expected_checkpoint)
+        except Exception as e:
+            logger.warning(f"Execution claim fell back to the local cache for {execution.id}: {e}")
+            return await self.front.compare_and_set_execution(execution, expected_checkpoint)
+        if applied:
+            self.front.put(execution)
+        return applied
+
+    async def delete_execution(self, execution_id: str) -> None:
+        await self.front.delete_execution(execution_id)
+        await self.backend.delete_execution(execution_id)
+
+    async def save_workflow(self, execution_id: str, workflow: Workflow) -> None:
+        await self.front.save_workflow(execution_id, workflow)
+        try:
+            await self.backend.save_workflow(execution_id, workflow)
+        except Exception as e:
+            logger.warning(f"Workflow definition save failed for {execution_id}: {e}")
+
+    async def load_workflow(self, execution_id: str) -> Optional[Workflow]:
+        workflow = await self.front.load_workflow(execution_id)
+        if workflow is not None:
+            return workflow
+        workflow = await self.backend.load_workflow(execution_id)
+        if workflow is not None:
+            await self.front.save_workflow(execution_id, workflow)
+        return workflow
+
+    async def save_step_result(self, memo_key: str, result: dict, ttl: int = MEMO_TTL) -> None:
+        await self.front.save_step_result(memo_key, result, ttl)
+        try:
+            await self.backend.save_step_result(memo_key, result, ttl)
+        except Exception as e:
+            logger.warning(f"Step memo save failed: {e}")
+
+    async def load_step_result(self, memo_key: str) -> Optional[dict]:
+        result = await self.front.load_step_result(memo_key)
+        if result is not None:
+            return result
+        result = await self.backend.load_step_result(memo_key)
+        if result is not None:
+            await self.front.save_step_result(memo_key, result)
+        return result
+
+    def peek(self, execution_id: str) -> Optional[WorkflowExecution]:
+        return self.front.peek(execution_id)
+
+    def cached_executions(self) -> list[WorkflowExecution]:
+        return self.front.cached_executions()
+
+
+# Singleton instance
+_execution_store: Optional[ExecutionStore] = None
+
+
+def get_execution_store() -> ExecutionStore:
+    """
+    Get the process-wide execution store, configured via settings:
+    execution_store_backend ("memory", "redis" or "postgres") and
+    execution_cache_size for the LRU front.
+    """
+    global _execution_store
+    if _execution_store is None:
+        from ..config import get_settings
+        settings = get_settings()
+        backend_name = settings.execution_store_backend.lower()
+        front = InMemoryExecutionStore(max_entries=settings.execution_cache_size)
+
+        if backend_name == "postgres":
+            _execution_store = TieredExecutionStore(PostgresExecutionStore(), front)
+        elif backend_name == "redis":
+            _execution_store = TieredExecutionStore(RedisExecutionStore(), front)
+        else:
+            _execution_store = front
+    return _execution_store
@@ -5,11 +5,14 @@ Defines the structure of multi-agent workflows including steps,
 triggers, conditions, and execution patterns.
 """
 
-from dataclasses import dataclass, field
+import random
+from dataclasses import asdict, dataclass, field
 from enum import Enum
 from typing import Any, Callable, Optional
 from datetime import datetime
 
+from .conditions import compile_condition, ConditionError
+
 
 class StepType(Enum):
     """Type of workflow step execution."""
@@ -52,23 +55,60 @@ class WorkflowCondition:
     expression: str
     description: str = ""
 
+    # Compiled once at definition time; see conditions.compile_condition
+    _evaluator: Optional[Callable[[dict], Any]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    error: Optional[str] = field(default=None, init=False, compare=False)
+
+    def __post_init__(self):
+        try:
+            self._evaluator = compile_condition(self.expression)
+        except ConditionError as e:
+            self.error = str(e)
+
     def evaluate(self, context: dict) -> bool:
         """Evaluate condition against workflow context."""
+        if self._evaluator is None:
+            return False
+        scope = {
+            "context": context.get("context", {}),
+            "results": context.get("results", {}),
+            "previous_step": context.get("previous_step", {}),
+        }
         try:
-            # Safe evaluation with limited scope
-            safe_dict = {
-                "context": context.get("context", {}),
-                "results": context.get("results", {}),
-                "previous_step": context.get("previous_step", {}),
-                "True": True,
-                "False": False,
-                "None": None,
-            }
-            return eval(self.expression, {"__builtins__": {}}, safe_dict)
+            return bool(self._evaluator(scope))
         except Exception:
             return False
 
 
+@dataclass
+class RetryPolicy:
+    """
+    How a failing step is retried.
+
+    Backoff uses full jitter (uniform between 0 and the capped exponential
+    delay) so retries of a flaky downstream service don't synchronize.
+    Error kinds are "timeout", "error_result" (tool returned {"error": ...})
+    and "exception".
+    """
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    retry_on: list[str] = field(default_factory=lambda: ["timeout", "error_result", "exception"])
+    # Error message substrings that are never worth retrying
+    non_retryable: list[str] = field(default_factory=list)
+
+    def should_retry(self, error_kind: str, error: str) -> bool:
+        """Whether an error of this kind/message may be retried."""
+        if error_kind not in self.retry_on:
+            return False
+        return not any(marker in error for marker in self.non_retryable)
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before the next attempt (attempt is 0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
 @dataclass
 class WorkflowTrigger:
     """Defines what initiates a workflow."""
@@ -104,6 +144,9 @@ class WorkflowStep:
         retry_count: Number of retries on failure
         on_failure: What to do on failure ("continue", "stop", "skip_to")
         next_steps: IDs of steps that follow this one
+        memoize: Reuse a stored result for identical (agent, tool, input)
+        memo_version: Bump to invalidate memoized results for this step
+        retry_policy: Backoff and retryable errors (defaults to RetryPolicy())
     """
     id: str
     name: str
@@ -119,11 +162,54 @@ class WorkflowStep:
     skip_to_step: Optional[str] = None
     next_steps: list[str] = field(default_factory=list)
     description: str = ""
+    memoize: bool = False
+    memo_version: str = "1"
+    retry_policy: Optional[RetryPolicy] = None
 
     def __post_init__(self):
         if not self.output_key:
             self.output_key = f"{self.agent}_{self.tool}_result"
 
+    def to_dict(self) -> dict:
+        """Serialize step definition for persistence."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "agent": self.agent,
+            "tool": self.tool,
+            "input_mapping": self.input_mapping,
+            "output_key": self.output_key,
+            "step_type": self.step_type.value,
+            "condition": (
+                {"expression": self.condition.expression, "description": self.condition.description}
+                if self.condition else None
+            ),
+            "timeout_seconds": self.timeout_seconds,
+            "retry_count": self.retry_count,
+            "on_failure": self.on_failure,
+            "skip_to_step": self.skip_to_step,
+            "next_steps": self.next_steps,
+            "description": self.description,
+            "memoize": self.memoize,
+            "memo_version": self.memo_version,
+            "retry_policy": asdict(self.retry_policy) if self.retry_policy else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WorkflowStep":
+        """Rebuild a step from to_dict() output."""
+        data = dict(data)
+        data["step_type"] = StepType(data.get("step_type", "sequential"))
+        condition = data.pop("condition", None)
+        if data.get("retry_policy"):
+            data["retry_policy"] = RetryPolicy(**data["retry_policy"])
+        step = cls(**data)
+        if isinstance(condition, str):  # Checkpoints written before descriptions were kept
+            condition = {"expression": condition}
+        if condition:
+            step.condition = WorkflowCondition(**condition)
+        return step
+
 
 @dataclass
 class Workflow:
@@ -185,6 +271,36 @@ class Workflow:
         # If no clear entry point, use first step
         return entry_steps if entry_steps else [self.steps[0]] if self.steps else []
 
+    def to_dict(self) -> dict:
+        """Serialize workflow definition so it can be resumed on another replica."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "steps": [s.to_dict() for s in self.steps],
+            "trigger": {**asdict(self.trigger), "type": self.trigger.type.value},
+            "version": self.version,
+            "category": self.category,
+            "tags": self.tags,
+            "timeout_seconds": self.timeout_seconds,
+            "max_parallel_steps": self.max_parallel_steps,
+            "default_context": self.default_context,
+            "required_inputs": self.required_inputs,
+            "allowed_roles": self.allowed_roles,
+            "notify_on_complete": self.notify_on_complete,
+            "notify_on_failure": self.notify_on_failure,
+            "notification_channels": self.notification_channels,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Workflow":
+        """Rebuild a workflow from to_dict() output."""
+        data = dict(data)
+        steps = [WorkflowStep.from_dict(s) for s in data.pop("steps", [])]
+        trigger_data = dict(data.pop("trigger", None) or {"type": data.pop("trigger_type", "manual")})
+        trigger_data["type"] = TriggerType(trigger_data.get("type", "manual"))
+        return cls(steps=steps, trigger=WorkflowTrigger(**trigger_data), **data)
+
     def validate(self) -> tuple[bool, list[str]]:
         """Validate workflow configuration."""
         errors = []
@@ -204,6 +320,10 @@ class Workflow:
             if step.skip_to_step and step.skip_to_step not in step_ids:
                 errors.append(f"Step '{step.id}' skip_to_step references unknown step")
 
+            # Check condition compiled cleanly
+            if step.condition and step.condition.error:
+                errors.append(f"Step '{step.id}' has invalid condition: {step.condition.error}")
+
         # Check for cycles (simple check)
         # A more thorough check would use topological sort
 
@@ -237,6 +357,7 @@ class WorkflowExecution:
     # Timestamps
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    checkpointed_at: Optional[datetime] = None  # Last time any replica saved progress
 
     # Human review state
     pending_review: Optional[str] = None  # Step ID awaiting review
@@ -246,6 +367,44 @@ class WorkflowExecution:
     initiated_by: str = ""
     organization_id: str = ""
 
+    def is_finished(self) -> bool:
+        """Whether the execution has reached a terminal state."""
+        return self.status in (
+            WorkflowStatus.COMPLETED,
+            WorkflowStatus.FAILED,
+            WorkflowStatus.CANCELLED,
+        )
+
+    def to_dict(self) -> dict:
+        """Serialize execution state for checkpointing."""
+        return {
+            "id": self.id,
+            "workflow_id": self.workflow_id,
+            "status": self.status.value,
+            "context": self.context,
+            "step_results": self.step_results,
+            "current_steps": self.current_steps,
+            "completed_steps": self.completed_steps,
+            "failed_steps": self.failed_steps,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "pending_review": self.pending_review,
+            "review_notes": self.review_notes,
+            "initiated_by": self.initiated_by,
+            "organization_id": self.organization_id,
+            "checkpointed_at": self.checkpointed_at.isoformat() if self.checkpointed_at else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WorkflowExecution":
+        """Rebuild an execution from a checkpoint."""
+        data = dict(data)
+        data["status"] = WorkflowStatus(data.get("status", "pending"))
+        for key in ("started_at", "completed_at", "checkpointed_at"):
+            if data.get(key):
+                data[key] = datetime.fromisoformat(data[key])
+        return cls(**data)
+
     def get_step_result(self, step_id: str) -> Optional[dict]:
         """Get the result of a specific step."""
         return self.step_results.get(step_id)
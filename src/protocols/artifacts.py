@@ -75,11 +75,9 @@ class ArtifactEvent(BaseModel):
 
     def to_sse(self) -> str:
         """Serialize as SSE event."""
-        import json
-        data = self.model_dump(exclude_none=True)
         # Use the event type as the SSE event name
         event_name = self.event.value.replace(":", "_")
-        return f"event: {event_name}\ndata: {json.dumps(data)}\n\n"
+        return f"event: {event_name}\ndata: {self.model_dump_json(exclude_none=True)}\n\n"
 
 
 # Artifact data schemas - expected JSON structure for each artifact type's data field
@@ -53,6 +53,4 @@ class AgentError(BaseModel):
 
     def to_sse(self) -> str:
         """Serialize as SSE event."""
-        import json
-        data = self.model_dump(exclude_none=True)
-        return f"event: error\ndata: {json.dumps(data)}\n\n"
+        return f"event: error\ndata: {self.model_dump_json(exclude_none=True)}\n\n"
@@ -0,0 +1,146 @@
+"""
+SSE Framing
+
+Shared serialisation and framing for agent event streams:
+- dumps(): compact JSON, using orjson when it is installed
+- sse_frame(): one "event:/id:/data:" frame
+- DeltaCoalescer: merges bursts of message:stream text deltas into one frame
+- batch_frames(): groups frames produced within a short window into a
+  single write, so verbose runs cost one send per window, not per event
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+FLUSH_INTERVAL = 0.025  # Seconds a batch may wait for more frames
+MAX_BATCH_BYTES = 64 * 1024
+DELTA_WINDOW = 0.05  # Seconds of text deltas merged into one frame
+MAX_DELTA_CHARS = 2048
+
+
+def dumps(data: Any) -> str:
+    """Serialise to compact JSON text."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, default=str, separators=(",", ":"))
+
+
+def sse_frame(data: Any, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """Format one SSE frame. Non-string data is JSON-encoded."""
+    payload = data if isinstance(data, str) else dumps(data)
+    head = ""
+    if event_id is not None:
+        head += f"id: {event_id}\n"
+    if event:
+        head += f"event: {event}\n"
+    return f"{head}data: {payload}\n\n"
+
+
+class DeltaCoalescer:
+    """
+    Buffers streamed text deltas and releases them as one message:stream
+    frame per window (or once the buffer is large enough).
+    """
+
+    def __init__(self, window: float = DELTA_WINDOW, max_chars: int = MAX_DELTA_CHARS):
+        self.window = window
+        self.max_chars = max_chars
+        self._parts: list[str] = []
+        self._chars = 0
+        self._started = 0.0
+
+    def add(self, text: str) -> Optional[str]:
+        """Buffer a delta. Returns a frame when the window or size is reached."""
+        now = asyncio.get_running_loop().time()
+        if not self._parts:
+            self._started = now
+        self._parts.append(text)
+        self._chars += len(text)
+        if self._chars >= self.max_chars or now - self._started >= self.window:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[str]:
+        """Release any buffered text as a frame."""
+        if not self._parts:
+            return None
+        text = "".join(self._parts)
+        self._parts.clear()
+        self._chars = 0
+        return sse_frame({"type": "message:stream", "text": text})
+
+
+_END = object()
+
+
+async def batch_frames(
+    frames: AsyncIterator[str],
+    flush_interval: float = FLUSH_INTERVAL,
+    max_bytes: int = MAX_BATCH_BYTES,
+) -> AsyncIterator[str]:
+    """
+    Re-chunk an SSE frame stream so frames arriving within flush_interval
+    of each other are written together. The first frame of a batch is
+    never held longer than flush_interval.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=256)
+
+    async def pump():
+        try:
+            async for frame in frames:
+                await queue.put(frame)
+            await queue.put(_END)
+        except Exception as e:
+            await queue.put(e)
+
+    loop = asyncio.get_running_loop()
+    producer = asyncio.create_task(pump())
+    try:
+        done = False
+        while not done:
+            item = await queue.get()
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            batch = [item]
+            size = len(item)
+            deadline = loop.time() + flush_interval
+            error = None
+            while size < max_bytes:
+                if queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = queue.get_nowait()
+                if item is _END:
+                    done = True
+                    break
+                if isinstance(item, Exception):
+                    error = item
+                    break
+                batch.append(item)
+                size += len(item)
+            yield "".join(batch)
+            if error is not None:
+                raise error
+    finally:
+        producer.cancel()
+        try:
+            await producer
+        except (asyncio.CancelledError, Exception):
+            pass
+        aclose = getattr(frames, "aclose", None)
+        if aclose is not None:
+            await aclose()
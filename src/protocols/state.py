@@ -109,6 +109,4 @@ class AgentStateUpdate(BaseModel):
 
     def to_sse(self) -> str:
         """Serialize as SSE event."""
-        import json
-        data = self.model_dump(exclude_none=True)
-        return f"event: state_update\ndata: {json.dumps(data)}\n\n"
+        return f"event: state_update\ndata: {self.model_dump_json(exclude_none=True)}\n\n"
@@ -116,8 +116,7 @@ class WorkStartEvent(BaseModel):
     pending_fields: list[str] = Field(default_factory=list)
 
     def to_sse(self) -> str:
-        import json
-        return f"event: work_start\ndata: {json.dumps(self.model_dump())}\n\n"
+        return f"event: work_start\ndata: {self.model_dump_json()}\n\n"
 
 
 class WorkActionEvent(BaseModel):
@@ -126,8 +125,7 @@ class WorkActionEvent(BaseModel):
     action: AgentAction
 
     def to_sse(self) -> str:
-        import json
-        return f"event: action\ndata: {json.dumps(self.model_dump())}\n\n"
+        return f"event: action\ndata: {self.model_dump_json()}\n\n"
 
 
 class EntityCreatedEvent(BaseModel):
@@ -136,8 +134,7 @@ class EntityCreatedEvent(BaseModel):
     entity: CreatedEntity
 
     def to_sse(self) -> str:
-        import json
-        return f"event: entity_created\ndata: {json.dumps(self.model_dump())}\n\n"
+        return f"event: entity_created\ndata: {self.model_dump_json()}\n\n"
 
 
 class WorkCompleteEvent(BaseModel):
@@ -146,8 +143,7 @@ class WorkCompleteEvent(BaseModel):
     state: dict  # AgentWorkState snapshot
 
     def to_sse(self) -> str:
-        import json
-        return f"event: work_complete\ndata: {json.dumps(self.model_dump())}\n\n"
+        return f"event: work_complete\ndata: {self.model_dump_json()}\n\n"
 
 
 class WorkErrorEvent(BaseModel):
@@ -156,5 +152,4 @@ class WorkErrorEvent(BaseModel):
     error: str
 
     def to_sse(self) -> str:
-        import json
-        return f"event: work_error\ndata: {json.dumps(self.model_dump())}\n\n"
+        return f"event: work_error\ndata: {self.model_dump_json()}\n\n"
@@ -11,13 +11,14 @@ Provides:
 
 from typing import Optional, Any
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from uuid import UUID, uuid4
 from enum import Enum
 import asyncio
-from collections import defaultdict
+from collections import defaultdict, deque
 
 from .agent_factory import AgentFactory, AGENT_REGISTRY
+from .agent_search import AgentSearchIndex, build_agent_documents
 from .model_registry import (
     AGENT_MODEL_RECOMMENDATIONS,
     get_model_for_agent,
@@ -33,6 +34,36 @@ from .external_llm_registry import (
 )
 
 
+# Recommendations scoring below this only matched incidental docstring words
+MIN_RELEVANCE_SCORE = 3.0
+
+# Curated routing keywords, boosted above docstrings in recommendations
+AGENT_KEYWORDS: dict[str, list[str]] = {
+    "rfp": ["rfp", "proposal", "bid", "tender"],
+    "brief": ["brief", "requirement", "intake"],
+    "content": ["content", "blog", "article", "editorial"],
+    "commercial": ["pricing", "margin", "commercial", "quote"],
+    "presentation": ["presentation", "deck", "slides", "powerpoint"],
+    "copy": ["copy", "headline", "ad", "tagline"],
+    "image": ["image", "photo", "visual", "graphic", "picture"],
+    "video_script": ["script", "dialogue", "screenplay"],
+    "video_storyboard": ["storyboard", "shot", "scene"],
+    "video_production": ["video", "film", "motion"],
+    "social_listening": ["social", "monitor", "listen", "sentiment"],
+    "competitor": ["competitor", "competition", "market"],
+    "campaign_analytics": ["campaign", "performance", "analytics", "metrics"],
+    "forecast": ["forecast", "predict", "revenue", "projection"],
+    "legal": ["legal", "contract", "compliance", "terms"],
+    "invoice": ["invoice", "bill", "payment"],
+    "qa": ["qa", "quality", "review", "check"],
+    "report": ["report", "summary", "dashboard"],
+    "pr": ["pr", "press", "media", "news"],
+    "influencer": ["influencer", "creator", "ambassador"],
+    "events": ["event", "conference", "webinar"],
+    "localization": ["localize", "translate", "language"],
+}
+
+
 class ExecutionStatus(str, Enum):
     """Agent execution status."""
     PENDING = "pending"
@@ -62,6 +93,17 @@ EXTERNAL_TO_INTERNAL_TIER = {
     AgentTier.PREMIUM: ClaudeModelTier.OPUS,
 }
 
+# Token pricing keys in pricing_config.json (provider_costs.ai_tokens)
+TIER_PRICING_KEYS = {
+    ClaudeModelTier.OPUS: "claude-opus-4-5",
+    ClaudeModelTier.SONNET: "claude-sonnet-4",
+    ClaudeModelTier.HAIKU: "claude-haiku-3-5",
+}
+
+# Retention defaults for execution history and usage rollups
+DEFAULT_HISTORY_SIZE = 1000
+DEFAULT_ROLLUP_RETENTION_DAYS = 90
+
 
 @dataclass
 class AgentExecution:
@@ -81,6 +123,39 @@ class AgentExecution:
     cost_estimate: float = 0.0
 
 
+@dataclass
+class UsageRollup:
+    """Incrementally maintained usage totals for one (instance, agent, day)."""
+    count: int = 0
+    success: int = 0
+    failed: int = 0
+    duration_seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+
+    def add(self, execution: AgentExecution) -> None:
+        self.count += 1
+        if execution.status == ExecutionStatus.COMPLETED:
+            self.success += 1
+        elif execution.status == ExecutionStatus.FAILED:
+            self.failed += 1
+        if execution.completed_at:
+            self.duration_seconds += (execution.completed_at - execution.started_at).total_seconds()
+        self.input_tokens += execution.input_tokens
+        self.output_tokens += execution.output_tokens
+        self.cost += execution.cost_estimate
+
+    def merge(self, other: "UsageRollup") -> None:
+        self.count += other.count
+        self.success += other.success
+        self.failed += other.failed
+        self.duration_seconds += other.duration_seconds
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cost += other.cost
+
+
 @dataclass
 class WorkflowStep:
     """A step in a multi-agent workflow."""
@@ -113,13 +188,25 @@ class AgentManager:
     - Performance monitoring
     """
 
-    def __init__(self, factory: AgentFactory):
+    def __init__(
+        self,
+        factory: AgentFactory,
+        history_size: int = DEFAULT_HISTORY_SIZE,
+        rollup_retention_days: int = DEFAULT_ROLLUP_RETENTION_DAYS,
+    ):
         self.factory = factory
         self._executions: dict[UUID, AgentExecution] = {}
         self._workflows: dict[UUID, AgentWorkflow] = {}
-        self._execution_history: list[AgentExecution] = []
+        # Ring buffer of recent executions; older ones live on in _rollups
+        self._execution_history: deque[AgentExecution] = deque(maxlen=history_size)
+        self.rollup_retention_days = rollup_retention_days
+        # day -> (instance_id, agent_type) -> totals
+        self._rollups: dict[date, dict[tuple[UUID, str], UsageRollup]] = {}
         self._cost_by_agent: dict[str, float] = defaultdict(float)
         self._cost_by_provider: dict[str, float] = defaultdict(float)
+        self._recommendation_index: Optional[AgentSearchIndex] = None
+        self._recommendation_signature: tuple = ()
+        self.refresh_recommendation_index()
 
     # =========================================================================
     # AGENT DISCOVERY
@@ -217,48 +304,45 @@ class AgentManager:
             "model_id": get_model_for_agent(agent_name),
         }
 
-    def recommend_agents(self, task_description: str, max_results: int = 5) -> list[dict]:
-        """Recommend agents based on task description."""
-        task_lower = task_description.lower()
-        scored_agents = []
-
-        # Keywords for different agent types
-        agent_keywords = {
-            "rfp": ["rfp", "proposal", "bid", "tender"],
-            "brief": ["brief", "requirement", "intake"],
-            "content": ["content", "blog", "article", "editorial"],
-            "commercial": ["pricing", "margin", "commercial", "quote"],
-            "presentation": ["presentation", "deck", "slides", "powerpoint"],
-            "copy": ["copy", "headline", "ad", "tagline"],
-            "image": ["image", "photo", "visual", "graphic", "picture"],
-            "video_script": ["script", "dialogue", "screenplay"],
-            "video_storyboard": ["storyboard", "shot", "scene"],
-            "video_production": ["video", "film", "motion"],
-            "social_listening": ["social", "monitor", "listen", "sentiment"],
-            "competitor": ["competitor", "competition", "market"],
-            "campaign_analytics": ["campaign", "performance", "analytics", "metrics"],
-            "forecast": ["forecast", "predict", "revenue", "projection"],
-            "legal": ["legal", "contract", "compliance", "terms"],
-            "invoice": ["invoice", "bill", "payment"],
-            "qa": ["qa", "quality", "review", "check"],
-            "report": ["report", "summary", "dashboard"],
-            "pr": ["pr", "press", "media", "news"],
-            "influencer": ["influencer", "creator", "ambassador"],
-            "events": ["event", "conference", "webinar"],
-            "localization": ["localize", "translate", "language"],
-        }
-
-        for agent_key, keywords in agent_keywords.items():
-            score = sum(3 if kw in task_lower else 0 for kw in keywords)
-            if score > 0:
-                info = self.get_agent_info(agent_key)
-                scored_agents.append({
-                    **info,
-                    "relevance_score": score,
-                })
+    def recommend_agents(
+        self,
+        task_description: str,
+        max_results: int = 5,
+        min_score: float = MIN_RELEVANCE_SCORE,
+    ) -> list[dict]:
+        """Recommend agents based on task description (BM25-ranked, weak matches dropped)."""
+        if self._recommendation_signature != tuple(AGENT_REGISTRY):
+            self.refresh_recommendation_index()
+
+        ranked = self._recommendation_index.search(task_description, max_results, min_score)
+        return [
+            {**self.get_agent_info(agent_key), "relevance_score": round(score, 3)}
+            for agent_key, score in ranked
+        ]
 
-        scored_agents.sort(key=lambda x: x["relevance_score"], reverse=True)
-        return scored_agents[:max_results]
+    def refresh_recommendation_index(self) -> None:
+        """(Re)build the recommendation index from the current agent registry."""
+        from ..knowledge.marketing.skills import get_all_skills
+
+        agent_keys = list(AGENT_REGISTRY)
+        skills: dict[str, list[str]] = defaultdict(list)
+        for skill in get_all_skills().values():
+            if skill.agent_mapping:
+                agent_key = skill.agent_mapping.removesuffix("_agent")
+                skills[agent_key].extend([skill.name, skill.description, *skill.use_cases])
+
+        documents = build_agent_documents(
+            agent_keys,
+            keywords=AGENT_KEYWORDS,
+            docstrings={k: AGENT_REGISTRY[k].__doc__ or "" for k in agent_keys},
+            llm_capabilities={
+                k: [cap for llm in get_external_llms_for_agent(k) for cap in llm.capabilities]
+                for k in agent_keys
+            },
+            skills=skills,
+        )
+        self._recommendation_index = AgentSearchIndex(documents)
+        self._recommendation_signature = tuple(agent_keys)
 
     # =========================================================================
     # EXECUTION MANAGEMENT
@@ -307,7 +391,12 @@ class AgentManager:
             execution.result = result
             execution.completed_at = datetime.utcnow()
 
-            # Track costs (simplified - real implementation would track actual usage)
+            # Track token usage and cost
+            execution.input_tokens = getattr(agent, "_input_tokens", 0)
+            execution.output_tokens = getattr(agent, "_output_tokens", 0)
+            execution.cost_estimate = self._estimate_cost(
+                agent_type, execution.input_tokens, execution.output_tokens, model_override,
+            )
             self._cost_by_agent[agent_type] += execution.cost_estimate
 
         except Exception as e:
@@ -315,9 +404,46 @@ class AgentManager:
             execution.error = str(e)
             execution.completed_at = datetime.utcnow()
 
-        self._execution_history.append(execution)
+        self._record_execution(execution)
         return execution
 
+    def _record_execution(self, execution: AgentExecution) -> None:
+        """Add a finished execution to the ring buffer and usage rollups."""
+        history = self._execution_history
+        if history.maxlen and len(history) == history.maxlen:
+            self._executions.pop(history[0].id, None)
+        history.append(execution)
+
+        day = (execution.completed_at or execution.started_at).date()
+        if day not in self._rollups:
+            self._rollups[day] = {}
+            cutoff = day - timedelta(days=self.rollup_retention_days)
+            for old_day in [d for d in self._rollups if d < cutoff]:
+                del self._rollups[old_day]
+        key = (execution.instance_id, execution.agent_type)
+        bucket = self._rollups[day]
+        if key not in bucket:
+            bucket[key] = UsageRollup()
+        bucket[key].add(execution)
+
+    def _estimate_cost(
+        self,
+        agent_type: str,
+        input_tokens: int,
+        output_tokens: int,
+        tier: Optional[ClaudeModelTier] = None,
+    ) -> float:
+        """Estimate USD cost from token counts using pricing_config.json."""
+        from .llm_clients.credits import get_config
+
+        tier = tier or get_agent_tier(f"{agent_type}_agent")
+        token_costs = get_config().get("provider_costs", {}).get("ai_tokens", {})
+        pricing = token_costs.get(TIER_PRICING_KEYS.get(tier, ""), {})
+        return (
+            (input_tokens / 1000) * pricing.get("input_per_1k", 0.0)
+            + (output_tokens / 1000) * pricing.get("output_per_1k", 0.0)
+        )
+
     def get_execution(self, execution_id: UUID) -> Optional[AgentExecution]:
         """Get execution by ID."""
         return self._executions.get(execution_id)
@@ -330,7 +456,7 @@ class AgentManager:
         limit: int = 100,
     ) -> list[AgentExecution]:
         """List executions with filters."""
-        executions = self._execution_history[-limit:]
+        executions = list(self._execution_history)[-limit:]
 
         if instance_id:
             executions = [e for e in executions if e.instance_id == instance_id]
@@ -469,37 +595,50 @@ class AgentManager:
         instance_id: Optional[UUID] = None,
         period_days: int = 30,
     ) -> dict:
-        """Get usage statistics."""
-        cutoff = datetime.utcnow()
+        """
+        Get usage statistics for the last period_days (including today).
 
-        executions = [
-            e for e in self._execution_history
-            if (not instance_id or e.instance_id == instance_id)
-        ]
+        Reads the daily rollups, so cost is O(days x agents) rather than
+        O(executions).
+        """
+        first_day = datetime.utcnow().date() - timedelta(days=period_days - 1)
 
-        # Aggregate by agent
-        by_agent = defaultdict(lambda: {"count": 0, "success": 0, "failed": 0})
-        for e in executions:
-            by_agent[e.agent_type]["count"] += 1
-            if e.status == ExecutionStatus.COMPLETED:
-                by_agent[e.agent_type]["success"] += 1
-            elif e.status == ExecutionStatus.FAILED:
-                by_agent[e.agent_type]["failed"] += 1
+        by_agent_totals: dict[str, UsageRollup] = defaultdict(UsageRollup)
+        for day, bucket in self._rollups.items():
+            if day < first_day:
+                continue
+            for (bucket_instance, agent_type), rollup in bucket.items():
+                if instance_id and bucket_instance != instance_id:
+                    continue
+                by_agent_totals[agent_type].merge(rollup)
 
-        # Aggregate by tier
+        by_agent = {}
         by_tier = defaultdict(lambda: {"count": 0, "cost": 0.0})
-        for e in executions:
-            agent_name = f"{e.agent_type}_agent"
-            internal_tier = get_agent_tier(agent_name)
+        total = UsageRollup()
+        for agent_type, rollup in by_agent_totals.items():
+            by_agent[agent_type] = {
+                "count": rollup.count,
+                "success": rollup.success,
+                "failed": rollup.failed,
+                "avg_duration_seconds": rollup.duration_seconds / rollup.count if rollup.count else 0.0,
+                "input_tokens": rollup.input_tokens,
+                "output_tokens": rollup.output_tokens,
+                "cost": rollup.cost,
+            }
+            internal_tier = get_agent_tier(f"{agent_type}_agent")
             external_tier = INTERNAL_TO_EXTERNAL_TIER.get(internal_tier, AgentTier.STANDARD)
-            by_tier[external_tier.value]["count"] += 1
-            by_tier[external_tier.value]["cost"] += e.cost_estimate
+            by_tier[external_tier.value]["count"] += rollup.count
+            by_tier[external_tier.value]["cost"] += rollup.cost
+            total.merge(rollup)
 
         return {
-            "total_executions": len(executions),
-            "by_agent": dict(by_agent),
+            "period_days": period_days,
+            "total_executions": total.count,
+            "by_agent": by_agent,
             "by_tier": dict(by_tier),
-            "total_cost": sum(e.cost_estimate for e in executions),
+            "total_input_tokens": total.input_tokens,
+            "total_output_tokens": total.output_tokens,
+            "total_cost": total.cost,
         }
 
     def get_provider_status(self) -> list[dict]:
@@ -0,0 +1,132 @@
+"""
+BM25 term index for agent recommendation.
+
+Each agent becomes one document built from its curated routing keywords,
+class docstring, external LLM capabilities and mapped marketing skills.
+Per-(term, agent) BM25 weights are precomputed at build time, so a query
+is a handful of dict lookups and a top-k selection.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Iterable
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "our", "please",
+    "that", "the", "this", "to", "us", "we", "with", "you", "your",
+})
+
+
+# Words ending in "s" that aren't plurals of another word
+_UNSTEMMED = frozenset({
+    "news", "series", "species", "always", "perhaps", "canvas", "lens",
+    "whereas", "ethics", "economics", "physics", "mathematics", "logistics",
+    "kudos", "chaos", "bias", "alias", "atlas", "gas", "yes", "plus", "bus",
+})
+
+# Singular endings that look like plurals (status, analysis, business, ...)
+_SINGULAR_ENDINGS = ("ss", "us", "is", "ous")
+
+
+def _stem(word: str) -> str:
+    """Very light plural stripping so 'decks' matches 'deck'."""
+    if word in _UNSTEMMED:
+        return word
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(_SINGULAR_ENDINGS):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords, stem."""
+    return [
+        _stem(token)
+        for token in _TOKEN_RE.findall(text.lower())
+        if token not in _STOPWORDS
+    ]
+
+
+class AgentSearchIndex:
+    """
+    Precomputed BM25 index over agent documents.
+
+    Args:
+        documents: agent_key -> list of (text, boost) fields. A boost repeats
+            the field's terms, e.g. curated keywords count 3x.
+        k1: BM25 term-frequency saturation
+        b: BM25 length normalization
+    """
+
+    def __init__(
+        self,
+        documents: dict[str, list[tuple[str, int]]],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        term_counts: dict[str, Counter] = {}
+        lengths: dict[str, int] = {}
+        for agent_key, fields in documents.items():
+            counts: Counter = Counter()
+            for text, boost in fields:
+                for token in tokenize(text):
+                    counts[token] += boost
+            term_counts[agent_key] = counts
+            lengths[agent_key] = sum(counts.values())
+
+        doc_count = len(documents) or 1
+        avg_length = (sum(lengths.values()) / doc_count) or 1.0
+
+        document_frequency: Counter = Counter()
+        for counts in term_counts.values():
+            document_frequency.update(counts.keys())
+
+        # term -> {agent_key: bm25 weight}
+        self._postings: dict[str, dict[str, float]] = {}
+        for agent_key, counts in term_counts.items():
+            norm = k1 * (1 - b + b * lengths[agent_key] / avg_length)
+            for term, tf in counts.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                weight = idf * tf * (k1 + 1) / (tf + norm)
+                self._postings.setdefault(term, {})[agent_key] = weight
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def search(
+        self, query: str, top_k: int = 5, min_score: float = 0.0,
+    ) -> list[tuple[str, float]]:
+        """Return up to top_k (agent_key, score) pairs scoring at least min_score, best first."""
+        scores: dict[str, float] = {}
+        for term in set(tokenize(query)):
+            for agent_key, weight in self._postings.get(term, {}).items():
+                scores[agent_key] = scores.get(agent_key, 0.0) + weight
+        candidates = [item for item in scores.items() if item[1] >= min_score]
+        return heapq.nlargest(top_k, candidates, key=lambda item: (item[1], item[0]))
+
+
+def build_agent_documents(
+    agent_keys: Iterable[str],
+    keywords: dict[str, list[str]],
+    docstrings: dict[str, str],
+    llm_capabilities: dict[str, list[str]],
+    skills: dict[str, list[str]],
+) -> dict[str, list[tuple[str, int]]]:
+    """Assemble per-agent (text, boost) fields for AgentSearchIndex."""
+    documents = {}
+    for agent_key in agent_keys:
+        documents[agent_key] = [
+            (agent_key.replace("_", " "), 3),
+            (" ".join(keywords.get(agent_key, [])), 3),
+            (docstrings.get(agent_key, ""), 1),
+            (" ".join(llm_capabilities.get(agent_key, [])), 1),
+            (" ".join(skills.get(agent_key, [])), 1),
+        ]
+    return documents
@@ -0,0 +1,41 @@
+"""
+Chat History Compaction
+
+Conversation turns are kept as plain {"role", "content"} messages. Before
+they are handed to an agent the history is compacted: only the most recent
+turns are kept, oversized messages are clipped, and the total is held under
+a character budget so prompts stay bounded however long a chat runs. The
+kept history always opens on a user turn.
+"""
+
+MAX_HISTORY_MESSAGES = 20
+MAX_HISTORY_CHARS = 24_000
+MAX_MESSAGE_CHARS = 4_000
+
+_TRUNCATED = " …[truncated]"
+
+
+def compact_history(
+    messages: list[dict],
+    max_messages: int = MAX_HISTORY_MESSAGES,
+    max_chars: int = MAX_HISTORY_CHARS,
+    max_message_chars: int = MAX_MESSAGE_CHARS,
+) -> list[dict]:
+    """Return the newest messages that fit the budgets, oldest first, starting on a user turn."""
+    kept: list[dict] = []
+    total = 0
+    for message in reversed(messages[-max_messages:] if max_messages else []):
+        content = message.get("content") or ""
+        if not isinstance(content, str):
+            content = str(content)
+        if len(content) > max_message_chars:
+            content = content[:max_message_chars] + _TRUNCATED
+        if total + len(content) > max_chars:
+            break
+        total += len(content)
+        kept.append({"role": message.get("role", "user"), "content": content})
+    # A reply whose question was cut off would open the prompt on an assistant turn
+    while kept and kept[-1]["role"] == "assistant":
+        kept.pop()
+    kept.reverse()
+    return kept
@@ -4,10 +4,21 @@ Context Injector — Formats ContextEntry records into system prompt blocks.
 Accepts entries directly from spokestack-core (passed in request body).
 Filters by type, confidence, and expiry. Prioritizes PREFERENCE > INSIGHT > ENTITY.
 Respects MAX_CONTEXT_CHARS to avoid bloating the prompt.
+
+Only the entries that can fit are kept (a bounded top-k, not a full sort),
+timestamps are parsed once per distinct value, and the formatted block is
+cached per (org, context version) so an unchanged context is not reformatted.
 """
 
-from datetime import datetime, timezone
-from typing import Optional
+import heapq
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Optional
+
+from src.services.request_context import CoreRequestContext
 
 
 # Maximum characters to inject (~2000 tokens = ~8000 chars, but keep it tight)
@@ -22,104 +33,184 @@ ENTRY_TYPE_PRIORITY = {
 }
 
 
-def format_context_entries(entries: list[dict]) -> str:
-    """
-    Takes a list of ContextEntry dicts (from spokestack-core API response)
-    and formats them into a system prompt injection block.
+# Insights older than this drop out of the prompt
+INSIGHT_MAX_AGE = timedelta(days=31).total_seconds()
+
+# Shortest possible line ("[ENTITY] : "), so at most this many entries can fit
+MIN_LINE_CHARS = len("[ENTITY] : ")
+MAX_CONTEXT_LINES = MAX_CONTEXT_CHARS // MIN_LINE_CHARS
+
+# Formatted blocks cached per org, keyed by context version
+CONTEXT_CACHE_MAX_ORGS = 512
+CONTEXT_CACHE_TTL = 300  # Seconds a block is trusted without re-checking expiry windows
+
+_block_cache: OrderedDict[str, tuple[Any, float, str]] = OrderedDict()  # org -> (version, valid_until, block)
+
+
+@lru_cache(maxsize=65536)
+def _parse_iso(raw: str) -> Optional[float]:
+    try:
+        parsed = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """Epoch seconds for an ISO string or datetime; None if absent or unparseable."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return _parse_iso(value)
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    return None
+
+
+def _context_version(entries: list[dict]) -> Optional[int]:
+    """Fingerprint of the fields that affect the formatted block (None if unhashable)."""
+    try:
+        # Values are hashed too: an edit doesn't always move updatedAt
+        return hash(tuple(
+            (e.get("id"), e.get("key"), e.get("updatedAt") or e.get("createdAt"),
+             e.get("expiresAt"), e.get("entryType"), e.get("confidence"),
+             hash(json.dumps(e.get("value"), sort_keys=True, default=str)))
+            for e in entries
+        ))
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_entry_line(entry: dict) -> str:
+    entry_type = entry.get("entryType", "ENTITY")
+    key = entry.get("key", "")
+    value = entry.get("value")
+
+    # Format value for display
+    if isinstance(value, dict):
+        if "body" in value:
+            value_str = value["body"]
+        elif "corrected" in value:
+            value_str = f"Prefer '{value['corrected']}' over '{value.get('original', '?')}'"
+        else:
+            parts = [f"{k}={v}" for k, v in value.items()
+                     if k not in ("generatedAt", "sourceEntryCount") and v is not None]
+            value_str = ", ".join(parts[:5])
+    elif isinstance(value, str):
+        value_str = value
+    else:
+        value_str = str(value) if value is not None else ""
 
-    Returns empty string if no entries.
-    """
-    if not entries:
-        return ""
+    return f"[{entry_type}] {key}: {value_str}"
 
-    now = datetime.now(timezone.utc)
 
-    # Filter and score entries
-    filtered = []
-    for entry in entries:
+def _rank_entries(entries: list[dict], now: float) -> tuple[list[tuple], float]:
+    """
+    Filter entries into a heap of (priority, -confidence, -created, index)
+    keys, plus the time at which the selection next changes (an entry
+    expiring or an insight ageing out). Callers pop only as many entries
+    as fit, so the full list is never sorted.
+    """
+    valid_until = float("inf")
+    scored = []
+    for index, entry in enumerate(entries):
         entry_type = entry.get("entryType", "ENTITY")
         confidence = entry.get("confidence") or 0.0
-        expires_at_raw = entry.get("expiresAt")
-
-        # Skip expired entries
-        if expires_at_raw:
-            try:
-                expires_at = datetime.fromisoformat(expires_at_raw.replace("Z", "+00:00"))
-                if expires_at < now:
-                    continue
-            except (ValueError, AttributeError):
-                pass
 
         # PREFERENCE: always include
-        if entry_type == "PREFERENCE":
-            filtered.append(entry)
+        # INSIGHT: include if from last 30 days (checked below)
+        # ENTITY: include if confidence > 0.5
+        if entry_type == "ENTITY":
+            if confidence <= 0.5:
+                continue
+        elif entry_type != "PREFERENCE" and entry_type != "INSIGHT":
             continue
 
-        # INSIGHT: include if from last 30 days
-        if entry_type == "INSIGHT":
-            created_raw = entry.get("createdAt", "")
-            try:
-                created_at = datetime.fromisoformat(created_raw.replace("Z", "+00:00"))
-                age_days = (now - created_at).days
-                if age_days <= 30:
-                    filtered.append(entry)
-            except (ValueError, AttributeError):
-                filtered.append(entry)  # include if we can't parse date
-            continue
+        # Skip expired entries
+        expires_at = _timestamp(entry.get("expiresAt"))
+        if expires_at is not None:
+            if expires_at < now:
+                continue
+            if expires_at < valid_until:
+                valid_until = expires_at
+
+        created_at = _timestamp(entry.get("createdAt"))
+        if entry_type == "INSIGHT" and created_at is not None:
+            # Included if we can't parse the date
+            ages_out = created_at + INSIGHT_MAX_AGE
+            if ages_out <= now:
+                continue
+            if ages_out < valid_until:
+                valid_until = ages_out
+
+        # Priority, then confidence descending, then most recent first
+        scored.append((
+            ENTRY_TYPE_PRIORITY[entry_type],
+            -confidence,
+            -(created_at or 0.0),
+            index,
+        ))
+
+    heapq.heapify(scored)
+    return scored, valid_until
+
+
+def format_context_entries(
+    entries: list[dict],
+    org_id: Optional[str] = None,
+    version: Any = None,
+) -> str:
+    """
+    Takes a list of ContextEntry dicts (from spokestack-core API response)
+    and formats them into a system prompt injection block.
 
-        # ENTITY: include if confidence > 0.5
-        if entry_type == "ENTITY" and confidence > 0.5:
-            filtered.append(entry)
-            continue
+    With an org_id, the block is cached per (org, context version); the
+    version defaults to a fingerprint of the entries.
 
-    if not filtered:
+    Returns empty string if no entries.
+    """
+    if not entries:
         return ""
 
-    # Sort by priority, then by confidence descending
-    filtered.sort(key=lambda e: (
-        ENTRY_TYPE_PRIORITY.get(e.get("entryType", "ENTITY"), 5),
-        -(e.get("confidence") or 0.0)
-    ))
+    now = time.time()
+    if org_id is not None and version is None:
+        version = _context_version(entries)
+    if version is None:
+        org_id = None  # Can't tell whether the context changed, so don't cache
+    if org_id is not None:
+        cached = _block_cache.get(org_id)
+        if cached is not None and cached[0] == version and now < cached[1]:
+            _block_cache.move_to_end(org_id)
+            return cached[2]
+
+    ranked, valid_until = _rank_entries(entries, now)
 
     lines = []
     total_chars = 0
-
-    for entry in filtered:
-        entry_type = entry.get("entryType", "ENTITY")
-        key = entry.get("key", "")
-        value = entry.get("value")
-
-        # Format value for display
-        if isinstance(value, dict):
-            if "body" in value:
-                value_str = value["body"]
-            elif "corrected" in value:
-                value_str = f"Prefer '{value['corrected']}' over '{value.get('original', '?')}'"
-            else:
-                parts = [f"{k}={v}" for k, v in value.items()
-                         if k not in ("generatedAt", "sourceEntryCount") and v is not None]
-                value_str = ", ".join(parts[:5])
-        elif isinstance(value, str):
-            value_str = value
-        else:
-            value_str = str(value) if value is not None else ""
-
-        line = f"[{entry_type}] {key}: {value_str}"
-
+    while ranked and len(lines) < MAX_CONTEXT_LINES:
+        line = _format_entry_line(entries[heapq.heappop(ranked)[3]])
         if total_chars + len(line) > MAX_CONTEXT_CHARS:
             break
-
         lines.append(line)
         total_chars += len(line)
 
-    if not lines:
-        return ""
+    block = ""
+    if lines:
+        block = (
+            "\n--- ORGANIZATIONAL CONTEXT ---\n"
+            + "\n".join(lines)
+            + "\n---\n"
+        )
 
-    return (
-        "\n--- ORGANIZATIONAL CONTEXT ---\n"
-        + "\n".join(lines)
-        + "\n---\n"
-    )
+    if org_id is not None:
+        _block_cache[org_id] = (version, min(valid_until, now + CONTEXT_CACHE_TTL), block)
+        _block_cache.move_to_end(org_id)
+        while len(_block_cache) > CONTEXT_CACHE_MAX_ORGS:
+            _block_cache.popitem(last=False)
+
+    return block
 
 
 def _format_single_integration(provider: str, seeded: dict) -> str:
@@ -248,20 +339,39 @@ def format_events(events: list[dict]) -> str:
 
 def inject_context_into_prompt(
     system_prompt: str,
-    context_entries: list[dict],
+    context_entries: list[dict] = None,
     integrations: list[dict] = None,
     events: list[dict] = None,
+    request_context: Optional[CoreRequestContext] = None,
 ) -> str:
     """
     Appends the formatted context block and integrations to the system prompt.
     Idempotent — if the context block is already present, returns unchanged.
+
+    Anything not passed explicitly is read from the prefetched request_context.
     """
     if "--- ORGANIZATIONAL CONTEXT ---" in system_prompt:
         return system_prompt
 
+    if request_context is not None:
+        if context_entries is None:
+            context_entries = request_context.context_entries
+        if integrations is None:
+            integrations = request_context.integrations
+        if events is None:
+            events = request_context.events
+
     additions = []
 
-    context_block = format_context_entries(context_entries)
+    if request_context is not None:
+        # An explicit version only describes the request's own entries
+        own_entries = context_entries is request_context.context_entries
+        context_block = format_context_entries(
+            context_entries, org_id=request_context.org_id,
+            version=request_context.context_version if own_entries else None,
+        )
+    else:
+        context_block = format_context_entries(context_entries)
     if context_block:
         additions.append(context_block)
 
@@ -18,6 +18,7 @@ from src.tools.core_tool_definitions import (
     TIER_TOOL_MAP, AGENT_CORE_TOOL_MAP, CORE_TOOL_NAMES,
 )
 from src.tools.spokestack_onboarding_modules import ONBOARDING_MODULE_TOOLS
+from src.services.request_context import CoreRequestContext
 
 logger = logging.getLogger(__name__)
 
@@ -159,10 +160,14 @@ async def build_agent_config(
     team_members: list[dict] = None,
     installed_modules: list[str] = None,
     module_tools: list[dict] = None,
+    request_context: Optional[CoreRequestContext] = None,
 ) -> dict:
     """
     Build the complete agent configuration for a spokestack-core request.
 
+    When a prefetched request_context is given, installed modules and module
+    tools not passed explicitly are taken from it.
+
     Returns:
         {
             "agent_type": str,
@@ -192,6 +197,12 @@ async def build_agent_config(
             ),
         }
 
+    if request_context is not None:
+        if installed_modules is None:
+            installed_modules = request_context.installed_modules or None
+        if module_tools is None:
+            module_tools = request_context.module_tools
+
     # Assemble tools
     tools = build_tools_for_tier(org_tier, agent_type)
 
@@ -0,0 +1,513 @@
+"""
+Durable background job queue on Redis streams.
+
+Jobs are appended to one stream per tenant (``jobs:{tenant_id}``) and read
+through a shared consumer group, so every API replica runs a bounded
+worker pool against the same queue:
+
+- Fairness: each fetch takes at most one job per tenant, rotating the
+  starting tenant, so one tenant's burst cannot starve the others. An
+  optional per-tenant cap limits how many of a tenant's jobs one process
+  runs at once.
+- Visibility timeout: a job claimed but not acked within
+  ``visibility_timeout`` seconds (worker crashed, pod restarted) is
+  reclaimed by another worker. Running jobs heartbeat to keep their claim.
+- At-least-once: handlers must tolerate redelivery. A job that raises is
+  left unacked and redelivered; after ``max_deliveries`` attempts it is
+  dropped and passed to the handler's dead-letter callback.
+- Delays: a job enqueued with ``delay`` waits in a sorted set
+  (``{namespace}:delayed``) scored by due time, and the fetch loop moves
+  due jobs onto their tenant's stream, so no worker is held while waiting.
+
+Without Redis, jobs go to in-process per-tenant deques with the same pool
+and fairness, but they do not survive a restart.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import heapq
+import socket
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
+
+from .task_store import _get_redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAMESPACE = "jobs"
+CONSUMER_GROUP = "agent-workers"
+
+JobHandler = Callable[[dict], Awaitable[None]]
+DeadLetterHandler = Callable[[dict, str], Awaitable[None]]
+
+# kind -> (handler, dead-letter handler)
+_handlers: dict[str, tuple[JobHandler, Optional[DeadLetterHandler]]] = {}
+
+# Drop a tenant from the active set once its stream is empty, atomically
+# with respect to enqueue (which adds to the stream, then the set).
+_PRUNE_SCRIPT = """
+if redis.call('XLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+# Move due delayed jobs onto their tenant streams. ZREM guards against two
+# replicas promoting the same job.
+_PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[3]))
+for _, member in ipairs(due) do
+    if redis.call('ZREM', KEYS[1], member) == 1 then
+        local job = cjson.decode(member)
+        redis.call('XADD', ARGV[2] .. job.tenant_id, '*', 'kind', job.kind, 'payload', job.payload)
+        redis.call('SADD', KEYS[2], job.tenant_id)
+    end
+end
+return #due
+"""
+_PROMOTE_BATCH = 100
+
+
+def register_job_handler(
+    kind: str,
+    handler: JobHandler,
+    on_dead_letter: Optional[DeadLetterHandler] = None,
+) -> None:
+    """Register the coroutine that runs jobs of ``kind``."""
+    _handlers[kind] = (handler, on_dead_letter)
+
+
+@dataclass
+class Job:
+    """A claimed unit of work."""
+    id: str
+    kind: str
+    tenant_id: str
+    payload: dict
+    deliveries: int = 1
+
+
+class JobQueue:
+    """
+    Per-process worker pool over the shared job queue.
+
+    Args:
+        workers: Max jobs this process runs concurrently
+        visibility_timeout: Seconds before an unacked job is redelivered
+        max_deliveries: Attempts before a job is dead-lettered
+        poll_interval: Idle wait between fetches when the queue is empty
+        tenant_concurrency: Max jobs per tenant this process runs at once
+        namespace: Redis key prefix, so separate queues do not share streams
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        visibility_timeout: int = 300,
+        max_deliveries: int = 3,
+        poll_interval: float = 1.0,
+        tenant_concurrency: Optional[int] = None,
+        namespace: str = DEFAULT_NAMESPACE,
+    ):
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.max_deliveries = max_deliveries
+        self.poll_interval = poll_interval
+        self.tenant_concurrency = tenant_concurrency
+        self.namespace = namespace
+        self._stream_prefix = f"{namespace}:"
+        self._tenants_key = f"{namespace}:tenants"
+        self._delayed_key = f"{namespace}:delayed"
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:6]}"
+
+        self._runner: Optional[asyncio.Task] = None
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._tenant_running: Counter = Counter()
+        self._wakeup = asyncio.Event()
+        self._tenant_cursor = 0
+        self._groups: set[str] = set()
+        self._prune_script = None
+        self._promote_script = None
+        self._last_reclaim = 0.0
+
+        # In-memory fallback: tenant -> deque of jobs
+        self._local: dict[str, deque[Job]] = {}
+        self._local_delayed: list[tuple[float, str, Job]] = []  # (due, id, job) heap
+
+        self.completed = 0
+        self.failed = 0
+        self.dead_lettered = 0
+
+    # ── Producer ─────────────────────────────────────────────────
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        tenant_id: str = "default",
+        delay: float = 0,
+    ) -> str:
+        """Queue a job and return its id. With ``delay``, it becomes runnable after that many seconds."""
+        if kind not in _handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+
+        r = await _get_redis()
+        if delay > 0:
+            job_id = uuid4().hex
+            due = time.time() + delay
+            if r:
+                member = json.dumps({
+                    "id": job_id, "tenant_id": tenant_id, "kind": kind, "payload": json.dumps(payload),
+                })
+                await r.zadd(self._delayed_key, {member: due})
+            else:
+                job = Job(id=job_id, kind=kind, tenant_id=tenant_id, payload=payload)
+                heapq.heappush(self._local_delayed, (due, job_id, job))
+        elif r:
+            stream = self._stream_key(tenant_id)
+            async with r.pipeline(transaction=True) as pipe:
+                pipe.xadd(stream, {"kind": kind, "payload": json.dumps(payload)})
+                pipe.sadd(self._tenants_key, tenant_id)
+                job_id, _ = await pipe.execute()
+        else:
+            job_id = uuid4().hex
+            self._local.setdefault(tenant_id, deque()).append(
+                Job(id=job_id, kind=kind, tenant_id=tenant_id, payload=payload)
+            )
+
+        self.start()
+        self._wakeup.set()
+        return job_id
+
+    # ── Lifecycle ────────────────────────────────────────────────
+
+    def start(self) -> None:
+        """Start the fetch loop if it is not already running."""
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self, grace: float = 10.0) -> None:
+        """
+        Stop fetching and give running jobs ``grace`` seconds to finish.
+
+        Jobs still running afterwards are cancelled without an ack, so the
+        queue redelivers them to another replica.
+        """
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+        running = list(self._in_flight.values())
+        if running:
+            _, pending = await asyncio.wait(running, timeout=grace)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    # ── Fetch loop ───────────────────────────────────────────────
+
+    async def _run(self) -> None:
+        while True:
+            free = self.workers - len(self._in_flight)
+            if free > 0:
+                try:
+                    jobs = await self._claim(free)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Job fetch failed: {e}")
+                    jobs = []
+                for job in jobs:
+                    self._tenant_running[job.tenant_id] += 1
+                    self._in_flight[job.id] = asyncio.create_task(self._execute(job))
+                if jobs:
+                    continue
+
+            self._wakeup.clear()
+            timeout = self.poll_interval
+            if self._local_delayed:
+                timeout = min(timeout, max(self._local_delayed[0][0] - time.time(), 0))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, limit: int) -> list[Job]:
+        r = await _get_redis()
+        if not r:
+            self._promote_local()
+            return self._claim_local(limit)
+
+        await self._promote_delayed(r)
+        jobs = await self._reclaim_expired(r, limit)
+        if len(jobs) < limit:
+            jobs.extend(await self._claim_new(r, limit - len(jobs)))
+        return jobs
+
+    def _stream_key(self, tenant_id: str) -> str:
+        return f"{self._stream_prefix}{tenant_id}"
+
+    def _has_capacity(self, tenant_id: str, claimed: Counter) -> bool:
+        if self.tenant_concurrency is None:
+            return True
+        running = self._tenant_running[tenant_id] + claimed[tenant_id]
+        return running < self.tenant_concurrency
+
+    def _rotated(self, tenants: list[str]) -> list[str]:
+        if not tenants:
+            return []
+        start = self._tenant_cursor % len(tenants)
+        return tenants[start:] + tenants[:start]
+
+    async def _promote_delayed(self, r) -> None:
+        if self._promote_script is None:
+            self._promote_script = r.register_script(_PROMOTE_SCRIPT)
+        await self._promote_script(
+            keys=[self._delayed_key, self._tenants_key],
+            args=[time.time(), self._stream_prefix, _PROMOTE_BATCH],
+        )
+
+    def _promote_local(self) -> None:
+        now = time.time()
+        while self._local_delayed and self._local_delayed[0][0] <= now:
+            _, _, job = heapq.heappop(self._local_delayed)
+            self._local.setdefault(job.tenant_id, deque()).append(job)
+
+    def _claim_local(self, limit: int) -> list[Job]:
+        jobs: list[Job] = []
+        claimed: Counter = Counter()
+        tenants = self._rotated(sorted(t for t, q in self._local.items() if q))
+        while len(jobs) < limit:
+            tenants = [t for t in tenants if self._local[t] and self._has_capacity(t, claimed)]
+            if not tenants:
+                break
+            # One job per tenant per pass
+            for tenant_id in tenants:
+                if len(jobs) >= limit:
+                    break
+                jobs.append(self._local[tenant_id].popleft())
+                claimed[tenant_id] += 1
+                self._tenant_cursor += 1
+        for tenant_id in [t for t, q in self._local.items() if not q]:
+            del self._local[tenant_id]
+        return jobs
+
+    async def _ensure_group(self, r, stream: str) -> None:
+        if stream in self._groups:
+            return
+        try:
+            await r.xgroup_create(stream, CONSUMER_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups.add(stream)
+
+    async def _claim_new(self, r, limit: int) -> list[Job]:
+        tenants = self._rotated(sorted(await r.smembers(self._tenants_key)))
+        tenants = [t for t in tenants if self._has_capacity(t, Counter())]
+        jobs: list[Job] = []
+        while tenants and len(jobs) < limit:
+            batch, tenants = tenants[:limit - len(jobs)], tenants[limit - len(jobs):]
+            streams = {}
+            for tenant_id in batch:
+                stream = self._stream_key(tenant_id)
+                await self._ensure_group(r, stream)
+                streams[stream] = ">"
+            # count=1 per stream: at most one job per tenant per read
+            response = await r.xreadgroup(CONSUMER_GROUP, self.consumer, streams, count=1)
+            for stream, entries in response or []:
+                for entry_id, fields in entries:
+                    jobs.append(self._job_from_entry(stream, entry_id, fields))
+            self._tenant_cursor += len(batch)
+        return jobs
+
+    async def _reclaim_expired(self, r, limit: int) -> list[Job]:
+        """Take over jobs whose consumer stopped heartbeating."""
+        loop = asyncio.get_running_loop()
+        if loop.time() - self._last_reclaim < self.visibility_timeout / 2:
+            return []
+        self._last_reclaim = loop.time()
+
+        idle_ms = self.visibility_timeout * 1000
+        jobs: list[Job] = []
+        claimed: Counter = Counter()
+        for tenant_id in sorted(await r.smembers(self._tenants_key)):
+            if len(jobs) >= limit:
+                break
+            if not self._has_capacity(tenant_id, claimed):
+                continue
+            stream = self._stream_key(tenant_id)
+            await self._ensure_group(r, stream)
+            pending = await r.xpending_range(
+                stream, CONSUMER_GROUP, min="-", max="+",
+                count=limit - len(jobs), idle=idle_ms,
+            )
+            for entry in pending:
+                if not self._has_capacity(tenant_id, claimed):
+                    break
+                entries = await r.xclaim(
+                    stream, CONSUMER_GROUP, self.consumer, idle_ms, [entry["message_id"]],
+                )
+                for entry_id, fields in entries:
+                    if not fields:
+                        continue  # Deleted since it was read
+                    job = self._job_from_entry(stream, entry_id, fields)
+                    job.deliveries = entry["times_delivered"] + 1
+                    if job.deliveries > self.max_deliveries:
+                        await self._dead_letter(job, "exceeded max deliveries")
+                        await self._ack(job)
+                    else:
+                        jobs.append(job)
+                        claimed[tenant_id] += 1
+        return jobs
+
+    def _job_from_entry(self, stream: str, entry_id: str, fields: dict) -> Job:
+        return Job(
+            id=entry_id,
+            kind=fields["kind"],
+            tenant_id=stream[len(self._stream_prefix):],
+            payload=json.loads(fields["payload"]),
+        )
+
+    # ── Execution ────────────────────────────────────────────────
+
+    async def _execute(self, job: Job) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            handler, _ = _handlers[job.kind]
+            await handler(job.payload)
+        except asyncio.CancelledError:
+            raise  # Shutdown: leave unacked for redelivery
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Job {job.kind}:{job.id} failed (attempt {job.deliveries}): {e}")
+            await self._retry_or_dead_letter(job, str(e))
+        else:
+            self.completed += 1
+            await self._ack(job)
+        finally:
+            heartbeat.cancel()
+            self._in_flight.pop(job.id, None)
+            self._tenant_running[job.tenant_id] -= 1
+            if self._tenant_running[job.tenant_id] <= 0:
+                del self._tenant_running[job.tenant_id]
+            self._wakeup.set()
+
+    async def _heartbeat(self, job: Job) -> None:
+        """Keep the claim fresh so long jobs are not reclaimed mid-run."""
+        r = await _get_redis()
+        if not r:
+            return
+        interval = max(self.visibility_timeout / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await r.xclaim(
+                    self._stream_key(job.tenant_id), CONSUMER_GROUP, self.consumer, 0,
+                    [job.id], justid=True,
+                )
+            except Exception as e:
+                logger.debug(f"Heartbeat for job {job.id} failed: {e}")
+
+    async def _retry_or_dead_letter(self, job: Job, error: str) -> None:
+        if job.deliveries >= self.max_deliveries:
+            await self._dead_letter(job, error)
+            await self._ack(job)
+            return
+        if not await _get_redis():
+            job.deliveries += 1
+            self._local.setdefault(job.tenant_id, deque()).append(job)
+        # With Redis the entry stays pending and is reclaimed after the
+        # visibility timeout.
+
+    async def _dead_letter(self, job: Job, error: str) -> None:
+        self.dead_lettered += 1
+        logger.error(f"Job {job.kind}:{job.id} dead-lettered after {job.deliveries} attempts: {error}")
+        _, on_dead_letter = _handlers.get(job.kind, (None, None))
+        if on_dead_letter:
+            try:
+                await on_dead_letter(job.payload, error)
+            except Exception as e:
+                logger.warning(f"Dead-letter handler for {job.kind} failed: {e}")
+
+    async def _ack(self, job: Job) -> None:
+        r = await _get_redis()
+        if not r:
+            return
+        stream = self._stream_key(job.tenant_id)
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.xack(stream, CONSUMER_GROUP, job.id)
+            pipe.xdel(stream, job.id)
+            await pipe.execute()
+        if self._prune_script is None:
+            self._prune_script = r.register_script(_PRUNE_SCRIPT)
+        await self._prune_script(keys=[stream, self._tenants_key], args=[job.tenant_id])
+
+    # ── Metrics ──────────────────────────────────────────────────
+
+    async def stats(self) -> dict:
+        """
+        Queue depth and worker counters.
+
+        ``depth`` counts jobs queued or running across all replicas (acked
+        jobs are deleted from their stream), which is the figure to scale
+        the worker deployment on. ``delayed`` counts jobs not yet due.
+        """
+        r = await _get_redis()
+        if r:
+            tenants = sorted(await r.smembers(self._tenants_key))
+            async with r.pipeline(transaction=False) as pipe:
+                for tenant_id in tenants:
+                    pipe.xlen(self._stream_key(tenant_id))
+                pipe.zcard(self._delayed_key)
+                *lengths, delayed = await pipe.execute()
+            by_tenant = {t: n for t, n in zip(tenants, lengths) if n}
+            backend = "redis"
+        else:
+            by_tenant = {t: len(q) for t, q in self._local.items() if q}
+            delayed = len(self._local_delayed)
+            backend = "memory"
+
+        return {
+            "namespace": self.namespace,
+            "backend": backend,
+            "depth": sum(by_tenant.values()),
+            "depth_by_tenant": by_tenant,
+            "delayed": delayed,
+            "in_flight": len(self._in_flight),
+            "workers": self.workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dead_lettered": self.dead_lettered,
+        }
+
+
+# Singleton instance
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Get the process-wide job queue, configured via settings:
+    job_queue_workers, job_queue_visibility_timeout and
+    job_queue_max_deliveries.
+    """
+    global _job_queue
+    if _job_queue is None:
+        from ..config import get_settings
+        settings = get_settings()
+        _job_queue = JobQueue(
+            workers=settings.job_queue_workers,
+            visibility_timeout=settings.job_queue_visibility_timeout,
+            max_deliveries=settings.job_queue_max_deliveries,
+        )
+    return _job_queue
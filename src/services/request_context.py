@@ -0,0 +1,35 @@
+"""
+Request Context
+
+Per-request data for a core agent run, gathered once up front so the
+config builder and the context injector read the same snapshot instead of
+each issuing their own lookups.
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class CoreRequestContext:
+    """Org data prefetched for one /core/execute request."""
+    org_id: str
+    module_records: list[dict] = field(default_factory=list)  # {"module_type", "agent_definition"}
+    integrations: list[dict] = field(default_factory=list)
+    events: list[dict] = field(default_factory=list)
+    context_entries: list[dict] = field(default_factory=list)
+    context_version: Optional[str] = None  # Sent by core when it tracks context revisions
+
+    @property
+    def installed_modules(self) -> list[str]:
+        return [r["module_type"] for r in self.module_records]
+
+    @property
+    def module_tools(self) -> list[dict]:
+        """Tool definitions contributed by the org's installed marketplace modules."""
+        tools = []
+        for record in self.module_records:
+            agent_definition = record.get("agent_definition")
+            if agent_definition and isinstance(agent_definition, dict):
+                tools.extend(agent_definition.get("tools", []))
+        return tools
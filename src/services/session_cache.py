@@ -0,0 +1,237 @@
+"""
+Session Cache
+
+Per-chat working set for WebSocket conversations: the chat state (agent
+type, model, skills, compacted message history) plus one agent instance
+reused across turns. Sessions are evicted after an idle TTL, by LRU once
+the session count or byte cap is exceeded, and evicted state can be
+spilled to the Redis session store so a later message or reconnect picks
+up where the chat left off.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from .chat_history import compact_history
+from .task_store import save_session, get_session, delete_session
+
+logger = logging.getLogger(__name__)
+
+SESSION_IDLE_TTL = 1800  # 30 minutes
+SESSION_MAX_ENTRIES = 1000
+SESSION_MAX_BYTES = 32 * 1024 * 1024  # 32 MB
+SWEEP_INTERVAL = 60  # Seconds between idle sweeps on write
+
+
+@dataclass
+class CachedSession:
+    """One chat's state and its reusable agent."""
+    state: dict
+    agent: Any = None
+    busy: bool = False  # Agent is checked out by a run
+    retired: bool = False  # Evicted while the agent was busy
+    last_used: float = field(default_factory=lambda: time.monotonic())
+    size: int = 0
+
+    def checkout_agent(self) -> Any:
+        """Borrow the cached agent, or None if there is none or it is in use."""
+        if self.agent is None or self.busy:
+            return None
+        self.busy = True
+        return self.agent
+
+    def adopt_agent(self, agent: Any) -> bool:
+        """Cache a freshly built agent (checked out) if the slot is free."""
+        if self.agent is not None or self.retired:
+            return False
+        self.agent = agent
+        self.busy = True
+        return True
+
+    def release_agent(self, agent: Any, keep: bool = True) -> bool:
+        """
+        Return a borrowed agent. Returns False if the caller now owns it and
+        must close it (agent dropped, or the session was evicted meanwhile).
+        """
+        if self.agent is not agent:
+            return False
+        self.busy = False
+        if keep and not self.retired:
+            return True
+        self.agent = None
+        return False
+
+
+class SessionCache:
+    """
+    Bounded in-memory chat sessions backed by the Redis session store.
+
+    Misses fall through to the session store, so spilled or persisted
+    sessions are rehydrated transparently (without their agent).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SESSION_MAX_ENTRIES,
+        max_bytes: int = SESSION_MAX_BYTES,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        spill: bool = True,
+        key_prefix: str = "ws:",
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.spill = spill
+        self.key_prefix = key_prefix
+        self._entries: OrderedDict[str, CachedSession] = OrderedDict()
+        self._bytes = 0
+        self._last_sweep = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, chat_id: str) -> bool:
+        return chat_id in self._entries
+
+    @staticmethod
+    def _sizeof(state: dict) -> int:
+        return len(json.dumps(state, default=str).encode())
+
+    def peek(self, chat_id: str) -> Optional[CachedSession]:
+        """In-memory lookup without touching LRU order or the store."""
+        return self._entries.get(chat_id)
+
+    async def get(self, chat_id: str) -> Optional[CachedSession]:
+        """Return the session, rehydrating it from the store on a miss."""
+        session = self._entries.get(chat_id)
+        if session is not None:
+            if time.monotonic() - session.last_used > self.idle_ttl:
+                await self._retire(chat_id)
+                self.expirations += 1
+            else:
+                session.last_used = time.monotonic()
+                self._entries.move_to_end(chat_id)
+                self.hits += 1
+                return session
+
+        self.misses += 1
+        state = await get_session(self.key_prefix + chat_id)
+        if not state:
+            return None
+        return await self.put(chat_id, state)
+
+    async def put(self, chat_id: str, state: dict) -> CachedSession:
+        """Insert or replace a session's state (dropping any cached agent)."""
+        if chat_id in self._entries:
+            await self._retire(chat_id, spill=False)
+        state["messages"] = compact_history(state.get("messages", []))
+        session = CachedSession(state=state, size=self._sizeof(state))
+        self._entries[chat_id] = session
+        self._bytes += session.size
+        await self._shrink()
+        return session
+
+    async def record_turn(self, chat_id: str, user: str, assistant: str) -> None:
+        """Append a completed exchange, re-compact the history and write it through to the store."""
+        session = self._entries.get(chat_id)
+        if session is None:
+            return
+        messages = session.state.setdefault("messages", [])
+        messages.append({"role": "user", "content": user})
+        messages.append({"role": "assistant", "content": assistant})
+        session.state["messages"] = compact_history(messages)
+        self._remeasure(session)
+        session.last_used = time.monotonic()
+        # Written now rather than on eviction, so a restart loses no turns
+        try:
+            await save_session(self.key_prefix + chat_id, session.state)
+        except Exception as e:
+            logger.warning(f"Failed to persist session {chat_id}: {e}")
+        await self._shrink()
+
+    def touch(self, chat_id: str) -> None:
+        """Re-measure a session after its state was mutated in place."""
+        session = self._entries.get(chat_id)
+        if session is not None:
+            self._remeasure(session)
+
+    async def persist(self, chat_id: str) -> None:
+        """Write a session's state through to the store."""
+        session = self._entries.get(chat_id)
+        if session is not None:
+            await save_session(self.key_prefix + chat_id, session.state)
+
+    async def pop(self, chat_id: str) -> Optional[dict]:
+        """Forget a session in memory and in the store."""
+        session = self._entries.get(chat_id)
+        if session is not None:
+            await self._retire(chat_id, spill=False)
+        await delete_session(self.key_prefix + chat_id)
+        return session.state if session else None
+
+    async def sweep(self) -> int:
+        """Evict sessions idle longer than the TTL."""
+        now = time.monotonic()
+        self._last_sweep = now
+        idle = [cid for cid, s in self._entries.items() if now - s.last_used > self.idle_ttl]
+        for chat_id in idle:
+            await self._retire(chat_id)
+            self.expirations += 1
+        return len(idle)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "agents": sum(1 for s in self._entries.values() if s.agent is not None),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remeasure(self, session: CachedSession) -> None:
+        size = self._sizeof(session.state)
+        self._bytes += size - session.size
+        session.size = size
+
+    async def _shrink(self) -> None:
+        if time.monotonic() - self._last_sweep > SWEEP_INTERVAL:
+            await self.sweep()
+        # Never evict the most recently used session
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            await self._retire(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def _retire(self, chat_id: str, spill: Optional[bool] = None) -> None:
+        session = self._entries.pop(chat_id, None)
+        if session is None:
+            return
+        self._bytes -= session.size
+        session.retired = True
+
+        if self.spill if spill is None else spill:
+            try:
+                await save_session(self.key_prefix + chat_id, session.state)
+            except Exception as e:
+                logger.warning(f"Failed to spill session {chat_id}: {e}")
+
+        # A busy agent is closed by its run when released
+        if session.agent is not None and not session.busy:
+            agent, session.agent = session.agent, None
+            try:
+                await agent.close()
+            except Exception:
+                pass
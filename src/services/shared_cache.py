@@ -0,0 +1,204 @@
+"""
+Shared Cache
+
+Two-tier cache for per-org lookups that every core request needs
+(integrations, recent events, installed modules):
+
+- Tier 1: a small per-process LRU, so hot keys cost no network round trip
+- Tier 2: Redis, so replicas share one warm copy and expire it together
+  (local entries inherit the Redis TTL instead of starting their own)
+
+Loads are single-flight per key and process, so an expiry under load
+triggers one fetch rather than a thundering herd. Invalidation deletes the
+Redis copy and publishes on ``cache_invalidate``; every replica's listener
+drops its local copy. A load that was in flight when its key was
+invalidated still answers its callers but is not written back, so it
+can't re-cache the value the invalidation was meant to drop.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from .task_store import _get_redis
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache_invalidate"
+LOCAL_MAX_ENTRIES = 1000
+
+
+class SharedCache:
+    """Process LRU in front of Redis, with single-flight loads and pub/sub invalidation."""
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int = LOCAL_MAX_ENTRIES):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local: OrderedDict[str, tuple[Any, float]] = OrderedDict()  # key -> (value, expires_at)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._invalidated_inflight: set[str] = set()  # Loads not to write back
+        self.hits = 0
+        self.shared_hits = 0
+        self.loads = 0
+        _register(self)
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value, loading it with `loader` on a miss.
+
+        If the load fails, a stale local value is returned when there is
+        one; otherwise the loader's exception propagates.
+        """
+        entry = self._local.get(key)
+        if entry is not None and time.monotonic() < entry[1]:
+            self._local.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(key, loader)
+        except Exception as e:
+            if entry is not None:
+                future.set_result(entry[0])
+                return entry[0]
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when there are no waiters
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+            self._invalidated_inflight.discard(key)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        r = await _get_redis()
+        if r:
+            try:
+                await _ensure_listener(r)
+                async with r.pipeline(transaction=False) as pipe:
+                    pipe.get(self._redis_key(key))
+                    pipe.pttl(self._redis_key(key))
+                    raw, pttl = await pipe.execute()
+                if raw is not None:
+                    self.shared_hits += 1
+                    remaining = pttl / 1000 if pttl and pttl > 0 else self.ttl
+                    value = json.loads(raw)
+                    if key not in self._invalidated_inflight:
+                        self._store_local(key, value, remaining)
+                    return value
+            except Exception as e:
+                logger.warning(f"Shared cache read failed for {self.namespace}:{key}: {e}")
+                r = None
+
+        self.loads += 1
+        value = await loader()
+        if key in self._invalidated_inflight:
+            return value
+        if r:
+            try:
+                await r.set(self._redis_key(key), json.dumps(value, default=str), ex=max(1, int(self.ttl)))
+            except Exception as e:
+                logger.warning(f"Shared cache write failed for {self.namespace}:{key}: {e}")
+        self._store_local(key, value, self.ttl)
+        return value
+
+    def _store_local(self, key: str, value: Any, ttl: float) -> None:
+        self._local[key] = (value, time.monotonic() + ttl)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def drop_local(self, key: Optional[str] = None) -> None:
+        """Forget the local copy of one key (or all keys)."""
+        if key is None:
+            self._local.clear()
+            self._invalidated_inflight.update(self._inflight)
+        else:
+            self._local.pop(key, None)
+            if key in self._inflight:
+                self._invalidated_inflight.add(key)
+
+    async def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop a key (or, with no key, only the local tier) on every replica."""
+        self.drop_local(key)
+        r = await _get_redis()
+        if not r:
+            return
+        try:
+            if key is not None:
+                await r.delete(self._redis_key(key))
+            await r.publish(INVALIDATION_CHANNEL, json.dumps({"ns": self.namespace, "key": key}))
+        except Exception as e:
+            logger.warning(f"Shared cache invalidation failed for {self.namespace}:{key}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._local),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "loads": self.loads,
+        }
+
+
+# ── Invalidation fan-in ──────────────────────────────────────────
+
+_caches: dict[str, SharedCache] = {}
+_listener: Optional[asyncio.Task] = None
+
+
+def _register(cache: SharedCache) -> None:
+    _caches[cache.namespace] = cache
+
+
+async def _ensure_listener(r) -> None:
+    global _listener
+    if _listener is not None and not _listener.done():
+        return
+    pubsub = r.pubsub()
+    await pubsub.subscribe(INVALIDATION_CHANNEL)
+    _listener = asyncio.create_task(_listen(pubsub))
+
+
+async def _listen(pubsub) -> None:
+    try:
+        async for message in pubsub.listen():
+            if message["type"] != "message":
+                continue
+            try:
+                payload = json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+            cache = _caches.get(payload.get("ns"))
+            if cache is not None:
+                cache.drop_local(payload.get("key"))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"Cache invalidation listener stopped: {e}")
+    finally:
+        await pubsub.aclose()
+
+
+# ── Per-org caches used by the core router ───────────────────────
+
+integrations_cache = SharedCache("integrations", ttl=300)  # 5 minutes
+events_cache = SharedCache("recent_events", ttl=120)  # 2 minutes
+org_modules_cache = SharedCache("org_modules", ttl=60)
+
+
+def shared_cache_stats() -> dict:
+    return {namespace: cache.stats() for namespace, cache in _caches.items()}
@@ -0,0 +1,199 @@
+"""
+Stream Replay
+
+Resumable SSE for streamed agent runs. The run is decoupled from the HTTP
+response: it writes every frame, tagged with a sequence id, into a bounded
+per-task replay buffer (a Redis list, or the in-memory fallback store).
+A client that drops and reconnects with Last-Event-ID gets the frames it
+missed and then follows the live stream, so the agent is never re-run.
+
+Followers on the replica that owns the run are fed from memory as soon as
+a frame is appended; a background flusher writes frames to the store in
+batches. Followers on other replicas poll the newest stored entry and read
+only the frames after their last one, until the end marker appears.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from .task_store import list_extend, list_range
+
+logger = logging.getLogger(__name__)
+
+REPLAY_MAX_EVENTS = 2000  # Frames retained per stream
+REPLAY_TTL = 3600  # Seconds a finished stream stays resumable
+POLL_INTERVAL = 0.25  # Seconds between buffer reads for remote followers
+REMOTE_IDLE_TIMEOUT = 300  # Give up following a remote stream after this much silence
+
+
+def _replay_key(stream_id: str) -> str:
+    return f"sse_replay:{stream_id}"
+
+
+def _gap_frame(after: int, first_retained: int) -> str:
+    return (
+        "event: replay_gap\n"
+        f'data: {{"missed_from": {after + 1}, "missed_to": {first_retained - 1}}}\n\n'
+    )
+
+
+class ReplayStream:
+    """Sequenced frames of one run, buffered locally and in the store."""
+
+    def __init__(self, stream_id: str, max_events: int = REPLAY_MAX_EVENTS, ttl: int = REPLAY_TTL):
+        self.stream_id = stream_id
+        self.max_events = max_events
+        self.ttl = ttl
+        self.last_id = 0
+        self.done = False
+        self._recent: deque[tuple[int, str]] = deque(maxlen=max_events)
+        self._changed = asyncio.Event()
+        self._unflushed: list[dict] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def append(self, frame: str) -> int:
+        """Tag a frame with the next sequence id, wake followers, and queue it for the store."""
+        self.last_id += 1
+        tagged = f"id: {self.last_id}\n{frame}"
+        self._recent.append((self.last_id, tagged))
+        self._notify()
+        self._buffer({"id": self.last_id, "frame": tagged})
+        return self.last_id
+
+    async def finish(self) -> None:
+        """Mark the stream complete and wait until every frame is stored."""
+        self.done = True
+        self._notify()
+        self._buffer({"id": self.last_id, "frame": "", "end": True})
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Wait for frames queued so far to reach the store."""
+        if self._flusher is not None:
+            await self._flusher
+
+    async def follow(self, after: int = 0) -> AsyncIterator[str]:
+        """Yield frames with ids greater than `after`, then live ones."""
+        while True:
+            changed = self._changed
+            pending = [(i, frame) for i, frame in self._recent if i > after]
+            if pending and pending[0][0] > after + 1:
+                yield _gap_frame(after, pending[0][0])
+            for i, frame in pending:
+                yield frame
+                after = i
+            if self.done and after >= self.last_id:
+                return
+            await changed.wait()
+
+    def _notify(self) -> None:
+        # Swap in a fresh event so every current waiter wakes exactly once
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _buffer(self, entry: dict) -> None:
+        self._unflushed.append(entry)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        # Frames appended while a write is in flight go out in the next batch
+        while self._unflushed:
+            batch, self._unflushed = self._unflushed, []
+            try:
+                await list_extend(
+                    _replay_key(self.stream_id), batch, ttl=self.ttl, maxlen=self.max_events,
+                )
+            except Exception as e:
+                logger.warning(f"Failed to buffer {len(batch)} SSE frames for {self.stream_id}: {e}")
+
+
+_streams: dict[str, ReplayStream] = {}
+_runs: set[asyncio.Task] = set()
+
+
+def start_replay_stream(stream_id: str, frames: AsyncIterator[str]) -> ReplayStream:
+    """Run a frame source to completion in the background, buffering its output."""
+    stream = ReplayStream(stream_id)
+    _streams[stream_id] = stream
+
+    async def pump():
+        try:
+            async for frame in frames:
+                await stream.append(frame)
+        except Exception as e:
+            logger.error(f"Streamed run {stream_id} failed: {e}")
+        finally:
+            await stream.finish()
+            _streams.pop(stream_id, None)
+
+    task = asyncio.create_task(pump())
+    _runs.add(task)
+    task.add_done_callback(_runs.discard)
+    return stream
+
+
+async def _read_stored_after(stream_id: str, after: int) -> Optional[list[dict]]:
+    """
+    Stored entries newer than `after`, read from the tail of the buffer.
+
+    Ids are consecutive, so the newest entry tells how many to read. Returns
+    None if the buffer has expired.
+    """
+    key = _replay_key(stream_id)
+    newest = await list_range(key, -1)
+    if not newest:
+        return None
+    count = newest[0]["id"] - after + (1 if newest[0].get("end") else 0)
+    if count <= 0:
+        return []
+    return [e for e in await list_range(key, -count) if e["id"] > after or e.get("end")]
+
+
+async def _follow_stored(
+    stream_id: str,
+    entries: list[dict],
+    after: int,
+    poll_interval: float,
+    idle_timeout: float,
+) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    last_progress = loop.time()
+    while True:
+        new = [e for e in entries if e["id"] > after and e["frame"]]
+        if new and new[0]["id"] > after + 1:
+            yield _gap_frame(after, new[0]["id"])
+        for entry in new:
+            yield entry["frame"]
+            after = entry["id"]
+        if entries and entries[-1].get("end"):
+            return
+        if new:
+            last_progress = loop.time()
+        elif loop.time() - last_progress > idle_timeout:
+            return
+        await asyncio.sleep(poll_interval)
+        entries = await _read_stored_after(stream_id, after)
+        if entries is None:
+            return
+
+
+async def resume_replay_stream(
+    stream_id: str,
+    after: int = 0,
+    poll_interval: float = POLL_INTERVAL,
+    idle_timeout: float = REMOTE_IDLE_TIMEOUT,
+) -> Optional[AsyncIterator[str]]:
+    """
+    Frames after `after` for a stream, followed live until it ends.
+    Returns None if the stream is unknown or has expired.
+    """
+    stream = _streams.get(stream_id)
+    if stream is not None:
+        return stream.follow(after)
+    entries = await _read_stored_after(stream_id, after)
+    if entries is None:
+        return None
+    return _follow_stored(stream_id, entries, after, poll_interval, idle_timeout)
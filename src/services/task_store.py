@@ -7,26 +7,156 @@ and support for horizontal scaling.
 Falls back to in-memory storage if Redis is unavailable.
 """
 
+import asyncio
 import json
 import logging
 import os
-from typing import Optional
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 
 logger = logging.getLogger(__name__)
 
+TASK_TTL = 86400  # 24 hours
+SESSION_TTL = 3600  # 1 hour
+FALLBACK_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+# After a failed connect, use the fallback this long before trying Redis again
+REDIS_RECONNECT_BACKOFF = 5.0  # seconds
+
+
+class FallbackStore:
+    """
+    In-memory stand-in for Redis: per-key TTL plus LRU eviction by size.
+
+    Sizes are the JSON-encoded byte length of each value, i.e. roughly what
+    the same entry would cost in Redis. Values mutated in place are not
+    re-encoded: callers report the size change to touch(), so appends and
+    field updates cost O(change), not O(value). Expired entries are dropped
+    lazily on access and whenever a write needs room.
+    """
+
+    def __init__(self, max_bytes: int = FALLBACK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # key -> (value, expires_at, size)
+        self._entries: OrderedDict[str, tuple[dict, float, int]] = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _sizeof(value) -> int:
+        return len(json.dumps(value, default=str).encode())
+
+    @classmethod
+    def sizeof_items(cls, items: list) -> int:
+        """Encoded size of list items as they'd add to an enclosing list."""
+        return sum(cls._sizeof(item) + 2 for item in items)  # ", " separators
+
+    @classmethod
+    def sizeof_field(cls, name: str, value) -> int:
+        """Encoded size of one '"name": value, ' member of an enclosing dict."""
+        return len(name) + 6 + cls._sizeof(value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: str, value: dict, ttl: int) -> None:
+        self._remove(key)
+        size = self._sizeof(value)
+        self._entries[key] = (value, time.monotonic() + ttl, size)
+        self._bytes += size
+        self._shrink()
+
+    def touch(self, key: str, ttl: int, delta: int = 0) -> None:
+        """Reset a key's TTL after an in-place mutation that changed its size by delta."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        size = max(0, entry[2] + delta)
+        self._entries[key] = (entry[0], time.monotonic() + ttl, size)
+        self._entries.move_to_end(key)
+        self._bytes += size - entry[2]
+        self._shrink()
+
+    def pop(self, key: str, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        self._remove(key)
+        return entry[0]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _shrink(self) -> None:
+        if self._bytes <= self.max_bytes:
+            return
+        now = time.monotonic()
+        for key in [k for k, entry in self._entries.items() if entry[1] <= now]:
+            self._remove(key)
+            self.expirations += 1
+        # Never evict the entry just written, even if it alone exceeds the cap
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+            logger.debug(f"Fallback store evicted {oldest}")
+
+
 _redis_client = None
-_fallback_store: dict[str, dict] = {}
+_redis_retry_at = 0.0
+_fallback_store = FallbackStore(
+    int(os.environ.get("FALLBACK_STORE_MAX_BYTES", FALLBACK_MAX_BYTES))
+)
 _use_redis = False
 
-TASK_TTL = 86400  # 24 hours
-SESSION_TTL = 3600  # 1 hour
+
+def fallback_store_stats() -> dict:
+    """Size and eviction counters for the in-memory fallback store."""
+    return {"active": not _use_redis, **_fallback_store.stats()}
 
 
 async def _get_redis():
     """Lazy-init Redis connection."""
-    global _redis_client, _use_redis
+    global _redis_client, _use_redis, _redis_retry_at
     if _redis_client is not None:
         return _redis_client
+    if time.monotonic() < _redis_retry_at:
+        return None
 
     redis_url = os.environ.get("REDIS_URL", "")
     if not redis_url:
@@ -45,18 +175,39 @@ async def _get_redis():
         logger.warning(f"Redis unavailable ({e}), using in-memory fallback")
         _use_redis = False
         _redis_client = None
+        _redis_retry_at = time.monotonic() + REDIS_RECONNECT_BACKOFF
         return None
 
 
 # ── Generic key-value operations ─────────────────────────────────
 
+# Replace a JSON value only if one of its top-level fields still holds the
+# expected value.
+#   KEYS[1] = key
+#   ARGV[1] = field, ARGV[2] = JSON expected value
+#   ARGV[3] = JSON new value, ARGV[4] = TTL seconds
+_STORE_CAS_SCRIPT = """
+local raw = redis.call('GET', KEYS[1])
+if not raw then
+    return 0
+end
+if cjson.decode(raw)[ARGV[1]] ~= cjson.decode(ARGV[2]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[3], 'EX', ARGV[4])
+return 1
+"""
+
+_store_cas_script = None
+
+
 async def store_set(key: str, value: dict, ttl: int = TASK_TTL) -> None:
     """Store a dict under the given key."""
     r = await _get_redis()
     if r:
         await r.setex(key, ttl, json.dumps(value))
     else:
-        _fallback_store[key] = value
+        _fallback_store.set(key, value, ttl)
 
 
 async def store_get(key: str) -> Optional[dict]:
@@ -77,6 +228,39 @@ async def store_delete(key: str) -> None:
         _fallback_store.pop(key, None)
 
 
+async def store_expire(key: str, ttl: int) -> None:
+    """Reset an existing key's TTL."""
+    r = await _get_redis()
+    if r:
+        await r.expire(key, ttl)
+    else:
+        _fallback_store.touch(key, ttl)
+
+
+async def store_compare_and_set(
+    key: str, value: dict, field: str, expected, ttl: int = TASK_TTL,
+) -> bool:
+    """
+    Replace a stored dict only if it exists and its ``field`` equals
+    ``expected``. Returns True if replaced.
+    """
+    r = await _get_redis()
+    if r:
+        global _store_cas_script
+        if _store_cas_script is None:
+            _store_cas_script = r.register_script(_STORE_CAS_SCRIPT)
+        applied = await _store_cas_script(
+            keys=[key], args=[field, json.dumps(expected), json.dumps(value), ttl],
+        )
+        return bool(applied)
+    # The event loop serialises fallback writers, so check-then-set is atomic
+    current = _fallback_store.get(key)
+    if current is None or current.get(field) != expected:
+        return False
+    _fallback_store.set(key, value, ttl)
+    return True
+
+
 async def store_exists(key: str) -> bool:
     """Check if a key exists."""
     r = await _get_redis()
@@ -85,42 +269,430 @@ async def store_exists(key: str) -> bool:
     return key in _fallback_store
 
 
+async def store_add(key: str, value: dict, ttl: int = TASK_TTL) -> bool:
+    """Store a dict only if the key is absent. Returns True if stored."""
+    r = await _get_redis()
+    if r:
+        return bool(await r.set(key, json.dumps(value), ex=ttl, nx=True))
+    if _fallback_store.get(key) is not None:
+        return False
+    _fallback_store.set(key, value, ttl)
+    return True
+
+
+async def list_append(key: str, item: dict, ttl: int = TASK_TTL) -> int:
+    """Append to a list, refreshing its TTL. Returns the new length."""
+    return await list_extend(key, [item], ttl)
+
+
+async def list_extend(
+    key: str, items: list[dict], ttl: int = TASK_TTL, maxlen: Optional[int] = None,
+) -> int:
+    """
+    Append several items to a list, refreshing its TTL. With maxlen, only
+    the newest maxlen items are kept. Returns the length before trimming.
+    """
+    r = await _get_redis()
+    if r:
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, *(json.dumps(item) for item in items))
+            if maxlen:
+                pipe.ltrim(key, -maxlen, -1)
+            pipe.expire(key, ttl)
+            results = await pipe.execute()
+        return results[0]
+    entry = _fallback_store.get(key)
+    if entry is None:
+        entry = {"items": []}
+        _fallback_store.set(key, entry, ttl)
+    entry["items"].extend(items)
+    delta = FallbackStore.sizeof_items(items)
+    length = len(entry["items"])
+    if maxlen and length > maxlen:
+        delta -= FallbackStore.sizeof_items(entry["items"][:-maxlen])
+        del entry["items"][:-maxlen]
+    _fallback_store.touch(key, ttl, delta)
+    return length
+
+
+async def list_range(key: str, start: int = 0, end: int = -1) -> list[dict]:
+    """Read list items from start to end inclusive (LRANGE semantics)."""
+    r = await _get_redis()
+    if r:
+        return [json.loads(item) for item in await r.lrange(key, start, end)]
+    entry = _fallback_store.get(key)
+    if entry is None:
+        return []
+    return entry["items"][start:None if end == -1 else end + 1]
+
+
+async def list_pop_all(key: str) -> list[dict]:
+    """Atomically take and delete every item in a list."""
+    r = await _get_redis()
+    if r:
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.lrange(key, 0, -1)
+            pipe.delete(key)
+            raw, _ = await pipe.execute()
+        return [json.loads(item) for item in raw]
+    entry = _fallback_store.get(key)
+    _fallback_store.pop(key)
+    return entry["items"] if entry else []
+
+
 # ── Task-specific helpers ────────────────────────────────────────
+#
+# Tasks are Redis hashes with one field per top-level key. Each field value
+# is JSON-encoded, so a status flip rewrites a few bytes instead of the
+# whole task (including large agent outputs), and field updates from
+# different replicas never clobber each other.
+#
+# Every write bumps a ``_version`` field and publishes the changed fields
+# on ``task_events:{task_id}``, so status waiters wake on change instead
+# of polling.
+#
+# Hashes live under ``task_fields:`` so they never collide with tasks
+# written as whole JSON strings under ``task:`` by older releases. Those
+# are still read, and converted to a hash on their first update.
+
+# Apply field updates only if the task exists and every expected field
+# currently holds one of its allowed (JSON-encoded) values.
+#   KEYS[1] = task key
+#   ARGV[1] = JSON {field: [allowed encoded values]}
+#   ARGV[2] = JSON {field: encoded value}
+#   ARGV[3] = TTL seconds
+#   ARGV[4] = event channel
+# Returns 1 if applied, 0 on a mismatch and -1 if there is no hash.
+_CAS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+local expected = cjson.decode(ARGV[1])
+for field, allowed in pairs(expected) do
+    local current = redis.call('HGET', KEYS[1], field)
+    local matched = false
+    for _, value in ipairs(allowed) do
+        if current == value then
+            matched = true
+            break
+        end
+    end
+    if not matched then
+        return 0
+    end
+end
+local updates = cjson.decode(ARGV[2])
+for field, value in pairs(updates) do
+    redis.call('HSET', KEYS[1], field, value)
+end
+local version = redis.call('HINCRBY', KEYS[1], '_version', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('PUBLISH', ARGV[4], '{"version":' .. version .. ',"updates":' .. ARGV[2] .. '}')
+return 1
+"""
+
+_cas_script = None
+
+# Convert a legacy JSON-string task into a hash, unless it changed since it
+# was read or the hash already exists.
+#   KEYS[1] = task hash key, KEYS[2] = legacy task key
+#   ARGV[1] = legacy value as read
+#   ARGV[2] = JSON {field: encoded value}
+#   ARGV[3] = TTL seconds
+_MIGRATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 or redis.call('GET', KEYS[2]) ~= ARGV[1] then
+    return 0
+end
+for field, value in pairs(cjson.decode(ARGV[2])) do
+    redis.call('HSET', KEYS[1], field, value)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('DEL', KEYS[2])
+return 1
+"""
+
+_migrate_script = None
+
+TASK_VERSION_FIELD = "_version"
+TASK_CHANNEL_PREFIX = "task_events:"
+
+# Statuses after which a task must not be moved by a late writer
+TERMINAL_TASK_STATUSES = ("completed", "failed", "cancelled")
+ACTIVE_TASK_STATUSES = ("pending", "running")
+
 
 def _task_key(task_id: str) -> str:
+    return f"task_fields:{task_id}"
+
+
+def _legacy_task_key(task_id: str) -> str:
     return f"task:{task_id}"
 
 
+def _encode_fields(data: dict) -> dict[str, str]:
+    return {field: json.dumps(value) for field, value in data.items()}
+
+
+def _decode_fields(raw: dict[str, str]) -> dict:
+    return {field: json.loads(value) for field, value in raw.items()}
+
+
+def _task_channel(task_id: str) -> str:
+    return f"{TASK_CHANNEL_PREFIX}{task_id}"
+
+
+async def _get_legacy_task(r, task_id: str) -> Optional[dict]:
+    """Read a task stored as one JSON string by an older release."""
+    raw = await r.get(_legacy_task_key(task_id))
+    return json.loads(raw) if raw is not None else None
+
+
+async def _migrate_legacy_task(r, task_id: str) -> bool:
+    """Convert a legacy task to a hash. Returns False if there was none."""
+    global _migrate_script
+    legacy_key = _legacy_task_key(task_id)
+    raw = await r.get(legacy_key)
+    if raw is None:
+        return False
+    if _migrate_script is None:
+        _migrate_script = r.register_script(_MIGRATE_SCRIPT)
+    fields = {**_encode_fields(json.loads(raw)), TASK_VERSION_FIELD: "1"}
+    await _migrate_script(
+        keys=[_task_key(task_id), legacy_key],
+        args=[raw, json.dumps(fields), TASK_TTL],
+    )
+    return True
+
+
+class TaskEventHub:
+    """
+    Fans task change events out to local waiters.
+
+    With Redis, one pattern subscription per process receives every task
+    event and hands it to the waiters for that task; without Redis, the
+    fallback writers dispatch directly. Events are dicts of
+    ``{"version": int, "updates": {field: value}}``.
+    """
+
+    def __init__(self):
+        self._waiters: dict[str, set[asyncio.Queue]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[asyncio.Queue]:
+        await self._ensure_listener()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+        self._waiters.setdefault(task_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            waiters = self._waiters.get(task_id)
+            if waiters is not None:
+                waiters.discard(queue)
+                if not waiters:
+                    del self._waiters[task_id]
+
+    def dispatch(self, task_id: str, event: dict) -> None:
+        for queue in self._waiters.get(task_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass  # A lagging waiter falls back to a full snapshot
+
+    async def _ensure_listener(self) -> None:
+        r = await _get_redis()
+        if r is None or (self._listener is not None and not self._listener.done()):
+            return
+        pubsub = r.pubsub()
+        await pubsub.psubscribe(f"{TASK_CHANNEL_PREFIX}*")
+        self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def _listen(self, pubsub) -> None:
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "pmessage":
+                    continue
+                task_id = message["channel"][len(TASK_CHANNEL_PREFIX):]
+                if task_id not in self._waiters:
+                    continue
+                event = json.loads(message["data"])
+                event["updates"] = _decode_fields(event["updates"])
+                self.dispatch(task_id, event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Task event listener stopped: {e}")
+        finally:
+            await pubsub.aclose()
+
+
+_task_events = TaskEventHub()
+
+
+def subscribe_task_events(task_id: str):
+    """
+    Async context manager yielding a queue of change events for a task.
+
+    Subscribe before reading the task's current version so no transition
+    between the read and the wait is missed.
+    """
+    return _task_events.subscribe(task_id)
+
+
 async def save_task(task_id: str, data: dict) -> None:
-    await store_set(_task_key(task_id), data, ttl=TASK_TTL)
+    """Create or replace a task."""
+    r = await _get_redis()
+    key = _task_key(task_id)
+    if r:
+        encoded = _encode_fields(data)
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.delete(key, _legacy_task_key(task_id))
+            pipe.hset(key, mapping={**encoded, TASK_VERSION_FIELD: 1})
+            pipe.expire(key, TASK_TTL)
+            pipe.publish(
+                _task_channel(task_id),
+                json.dumps({"version": 1, "updates": encoded}),
+            )
+            await pipe.execute()
+    else:
+        _fallback_store.set(key, {**data, TASK_VERSION_FIELD: 1}, TASK_TTL)
+        _task_events.dispatch(task_id, {"version": 1, "updates": dict(data)})
 
 
-async def get_task(task_id: str) -> Optional[dict]:
-    return await store_get(_task_key(task_id))
+async def get_task(task_id: str, fields: Optional[list[str]] = None) -> Optional[dict]:
+    """
+    Retrieve a task, or only the requested fields of it.
+
+    Missing fields are returned as None when ``fields`` is given. The
+    internal ``_version`` counter is only included when asked for.
+    """
+    r = await _get_redis()
+    key = _task_key(task_id)
+    if r:
+        if fields:
+            values = await r.hmget(key, fields)
+            if all(value is None for value in values) and not await r.exists(key):
+                task = await _get_legacy_task(r, task_id)
+                if task is None:
+                    return None
+                return {field: task.get(field) for field in fields}
+            return {
+                field: json.loads(value) if value is not None else None
+                for field, value in zip(fields, values)
+            }
+        raw = await r.hgetall(key)
+        if not raw:
+            return await _get_legacy_task(r, task_id)
+        raw.pop(TASK_VERSION_FIELD, None)
+        return _decode_fields(raw)
+
+    task = _fallback_store.get(key)
+    if task is None:
+        return None
+    if fields:
+        return {field: task.get(field) for field in fields}
+    return {field: value for field, value in task.items() if field != TASK_VERSION_FIELD}
 
 
 async def delete_task(task_id: str) -> None:
     await store_delete(_task_key(task_id))
+    await store_delete(_legacy_task_key(task_id))
 
 
 async def task_exists(task_id: str) -> bool:
-    return await store_exists(_task_key(task_id))
-
+    return (
+        await store_exists(_task_key(task_id))
+        or await store_exists(_legacy_task_key(task_id))
+    )
+
+
+async def compare_and_set_task(
+    task_id: str,
+    updates: dict,
+    expected: Optional[dict] = None,
+) -> bool:
+    """
+    Atomically apply field updates if the task matches ``expected``.
+
+    Args:
+        task_id: Task to update
+        updates: Fields to set
+        expected: field -> value, or field -> list/tuple of allowed values.
+            Every field must match for the update to apply.
+
+    Returns:
+        True if the task existed, matched and was updated.
+    """
+    expected = expected or {}
+    allowed = {
+        field: list(value) if isinstance(value, (list, tuple)) else [value]
+        for field, value in expected.items()
+    }
 
-async def update_task(task_id: str, updates: dict) -> None:
-    """Merge updates into an existing task."""
-    task = await get_task(task_id)
-    if task:
-        task.update(updates)
-        await save_task(task_id, task)
+    r = await _get_redis()
+    key = _task_key(task_id)
+    if r:
+        global _cas_script
+        if _cas_script is None:
+            _cas_script = r.register_script(_CAS_SCRIPT)
+        encoded_expected = {
+            field: [json.dumps(value) for value in values]
+            for field, values in allowed.items()
+        }
+        args = [
+            json.dumps(encoded_expected),
+            json.dumps(_encode_fields(updates)),
+            TASK_TTL,
+            _task_channel(task_id),
+        ]
+        applied = await _cas_script(keys=[key], args=args)
+        if applied == -1 and await _migrate_legacy_task(r, task_id):
+            applied = await _cas_script(keys=[key], args=args)
+        return applied == 1
+
+    # The event loop serialises fallback writers, so check-then-set is atomic
+    task = _fallback_store.get(key)
+    if task is None:
+        return False
+    for field, values in allowed.items():
+        if task.get(field) not in values:
+            return False
+    delta = sum(
+        FallbackStore.sizeof_field(field, value)
+        - (FallbackStore.sizeof_field(field, task[field]) if field in task else 0)
+        for field, value in updates.items()
+    )
+    task.update(updates)
+    task[TASK_VERSION_FIELD] = task.get(TASK_VERSION_FIELD, 0) + 1
+    _fallback_store.touch(key, TASK_TTL, delta)
+    _task_events.dispatch(
+        task_id, {"version": task[TASK_VERSION_FIELD], "updates": dict(updates)}
+    )
+    return True
+
+
+async def update_task(task_id: str, updates: dict) -> bool:
+    """Set fields on an existing task. Returns False if the task is gone."""
+    return await compare_and_set_task(task_id, updates)
 
 
 # ── Chat session helpers ─────────────────────────────────────────
+#
+# Session metadata is a small JSON blob; the conversation lives in its own
+# append-only list so each turn writes only the new messages.
 
 def _session_key(session_id: str) -> str:
     return f"session:{session_id}"
 
 
+def _session_messages_key(session_id: str) -> str:
+    return f"session:{session_id}:messages"
+
+
+def _session_migrated_key(session_id: str) -> str:
+    return f"session:{session_id}:migrated"
+
+
 async def save_session(session_id: str, data: dict) -> None:
     await store_set(_session_key(session_id), data, ttl=SESSION_TTL)
 
@@ -131,6 +703,23 @@ async def get_session(session_id: str) -> Optional[dict]:
 
 async def delete_session(session_id: str) -> None:
     await store_delete(_session_key(session_id))
+    await store_delete(_session_messages_key(session_id))
+    await store_delete(_session_migrated_key(session_id))
+
+
+async def append_session_messages(session_id: str, messages: list[dict]) -> int:
+    """Append messages to a session's history. Returns the new length."""
+    return await list_extend(_session_messages_key(session_id), messages, ttl=SESSION_TTL)
+
+
+async def get_session_messages(session_id: str, last: Optional[int] = None) -> list[dict]:
+    """Read a session's history, or only its last N messages."""
+    return await list_range(_session_messages_key(session_id), -last if last else 0, -1)
+
+
+async def claim_session_migration(session_id: str) -> bool:
+    """Claim the one-time move of a legacy session's inline messages. Only one caller wins."""
+    return await store_add(_session_migrated_key(session_id), {"migrated": True}, ttl=SESSION_TTL)
 
 
 async def session_exists(session_id: str) -> bool:
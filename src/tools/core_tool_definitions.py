@@ -681,7 +681,7 @@ CORE_INTENT_PATTERNS: dict[str, list[str]] = {
     "core_briefs": [
         "brief", "scope", "proposal", "creative brief",
         "deliverables", "objectives", "review", "approval",
-        "artifact", "document", "copy",
+        "artifact", "document", "documentation", "copy", "copywriting",
     ],
     "core_orders": [
         "order", "invoice", "payment", "client",
@@ -0,0 +1,288 @@
+"""
+Minimal in-memory stand-in for redis.asyncio, covering the commands the
+job queue, task store and stream replay use. Lua scripts are emulated by
+registering a Python function for the script text (see ``scripts``).
+"""
+
+import time
+from collections import OrderedDict
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        method = getattr(self._redis, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        calls, self._calls = self._calls, []
+        return [await method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.now_ms = 0  # Stream idle times are measured on this clock
+        self.strings: dict[str, str] = {}
+        self.sets: dict[str, set] = {}
+        self.lists: dict[str, list] = {}
+        self.zsets: dict[str, dict] = {}
+        self.hashes: dict[str, dict] = {}
+        self.streams: dict[str, OrderedDict] = {}
+        # stream -> {"pending": {id: {"consumer", "delivered_at", "times_delivered"}}, "last": id}
+        self.groups: dict[str, dict] = {}
+        self.scripts: dict[str, object] = {}
+        self.ttls: dict[str, int] = {}
+        self.commands: list[str] = []
+        self.published: list[tuple[str, str]] = []
+        self._seq = 0
+
+    def advance(self, seconds: float) -> None:
+        self.now_ms += int(seconds * 1000)
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    def register_script(self, script):
+        fn = self.scripts[script.strip()]
+
+        async def run(keys=(), args=()):
+            return fn(self, list(keys), list(args))
+        return run
+
+    def _log(self, name):
+        self.commands.append(name)
+
+    # ── Keys ─────────────────────────────────────────────────────
+
+    async def delete(self, *keys):
+        self._log("delete")
+        removed = 0
+        for key in keys:
+            for space in self._spaces():
+                if space.pop(key, None) is not None:
+                    removed += 1
+        return removed
+
+    async def expire(self, key, ttl):
+        self._log("expire")
+        self.ttls[key] = ttl
+        return 1
+
+    async def exists(self, key):
+        return int(any(key in space for space in self._spaces()))
+
+    def _spaces(self):
+        return (self.strings, self.hashes, self.sets, self.lists, self.zsets, self.streams)
+
+    # ── Strings ──────────────────────────────────────────────────
+
+    async def get(self, key):
+        self._log("get")
+        return self.strings.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        self._log("set")
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value
+        if ex:
+            self.ttls[key] = ex
+        return True
+
+    async def setex(self, key, ttl, value):
+        return await self.set(key, value, ex=ttl)
+
+    # ── Hashes ───────────────────────────────────────────────────
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        self._log("hset")
+        h = self.hashes.setdefault(key, {})
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        added = sum(1 for f in items if f not in h)
+        h.update({f: str(v) for f, v in items.items()})
+        return added
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def hmget(self, key, fields):
+        self._log("hmget")
+        h = self.hashes.get(key, {})
+        return [h.get(f) for f in fields]
+
+    async def hgetall(self, key):
+        self._log("hgetall")
+        return dict(self.hashes.get(key, {}))
+
+    async def hincrby(self, key, field, amount=1):
+        h = self.hashes.setdefault(key, {})
+        h[field] = str(int(h.get(field, 0)) + amount)
+        return int(h[field])
+
+    # ── Sets ─────────────────────────────────────────────────────
+
+    async def sadd(self, key, *members):
+        self._log("sadd")
+        s = self.sets.setdefault(key, set())
+        before = len(s)
+        s.update(members)
+        return len(s) - before
+
+    async def srem(self, key, *members):
+        s = self.sets.get(key, set())
+        before = len(s)
+        s.difference_update(members)
+        if not s:
+            self.sets.pop(key, None)
+        return before - len(s)
+
+    async def smembers(self, key):
+        self._log("smembers")
+        return set(self.sets.get(key, set()))
+
+    # ── Lists ────────────────────────────────────────────────────
+
+    async def rpush(self, key, *values):
+        self._log("rpush")
+        items = self.lists.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    async def ltrim(self, key, start, end):
+        items = self.lists.get(key, [])
+        end = len(items) + end if end < 0 else end
+        start = max(0, len(items) + start if start < 0 else start)
+        self.lists[key] = items[start:end + 1]
+        return True
+
+    async def lrange(self, key, start, end):
+        self._log("lrange")
+        items = self.lists.get(key, [])
+        end = len(items) + end if end < 0 else end
+        start = max(0, len(items) + start if start < 0 else start)
+        return items[start:end + 1]
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    # ── Sorted sets ──────────────────────────────────────────────
+
+    async def zadd(self, key, mapping):
+        self._log("zadd")
+        z = self.zsets.setdefault(key, {})
+        added = sum(1 for m in mapping if m not in z)
+        z.update(mapping)
+        return added
+
+    async def zrangebyscore(self, key, min, max, start=None, num=None):
+        z = self.zsets.get(key, {})
+        lo = float("-inf") if min == "-inf" else float(min)
+        hi = float("inf") if max == "+inf" else float(max)
+        members = [m for m, s in sorted(z.items(), key=lambda i: (i[1], i[0])) if lo <= s <= hi]
+        if start is not None:
+            members = members[start:start + num]
+        return members
+
+    async def zrem(self, key, *members):
+        z = self.zsets.get(key, {})
+        return sum(1 for m in members if z.pop(m, None) is not None)
+
+    async def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    # ── Streams ──────────────────────────────────────────────────
+
+    async def xadd(self, stream, fields):
+        self._log("xadd")
+        self._seq += 1
+        entry_id = f"{self.now_ms}-{self._seq}"
+        self.streams.setdefault(stream, OrderedDict())[entry_id] = dict(fields)
+        return entry_id
+
+    async def xlen(self, stream):
+        return len(self.streams.get(stream, {}))
+
+    async def xdel(self, stream, *ids):
+        entries = self.streams.get(stream, OrderedDict())
+        return sum(1 for i in ids if entries.pop(i, None) is not None)
+
+    async def xgroup_create(self, stream, group, id="0", mkstream=False):
+        if stream in self.groups:
+            raise Exception("BUSYGROUP Consumer Group name already exists")
+        self.streams.setdefault(stream, OrderedDict())
+        self.groups[stream] = {"pending": {}, "delivered": set()}
+        return True
+
+    async def xreadgroup(self, group, consumer, streams, count=None):
+        self._log("xreadgroup")
+        response = []
+        for stream in streams:
+            state = self.groups[stream]
+            fresh = [
+                (i, f) for i, f in self.streams.get(stream, {}).items()
+                if i not in state["delivered"]
+            ][:count]
+            for entry_id, _ in fresh:
+                state["delivered"].add(entry_id)
+                state["pending"][entry_id] = {
+                    "consumer": consumer, "delivered_at": self.now_ms, "times_delivered": 1,
+                }
+            if fresh:
+                response.append((stream, fresh))
+        return response
+
+    async def xpending_range(self, stream, group, min, max, count, idle=None):
+        self._log("xpending_range")
+        result = []
+        for entry_id, p in self.groups[stream]["pending"].items():
+            idle_ms = self.now_ms - p["delivered_at"]
+            if idle is not None and idle_ms < idle:
+                continue
+            result.append({
+                "message_id": entry_id, "consumer": p["consumer"],
+                "time_since_delivered": idle_ms, "times_delivered": p["times_delivered"],
+            })
+        return result[:count]
+
+    async def xclaim(self, stream, group, consumer, min_idle_time, message_ids, justid=False):
+        self._log("xclaim")
+        claimed = []
+        pending = self.groups[stream]["pending"]
+        for entry_id in message_ids:
+            p = pending.get(entry_id)
+            if p is None or self.now_ms - p["delivered_at"] < min_idle_time:
+                continue
+            p["consumer"] = consumer
+            p["delivered_at"] = self.now_ms
+            if justid:
+                claimed.append(entry_id)
+            else:
+                p["times_delivered"] += 1
+                claimed.append((entry_id, self.streams.get(stream, {}).get(entry_id)))
+        return claimed
+
+    async def xack(self, stream, group, *ids):
+        self._log("xack")
+        pending = self.groups[stream]["pending"]
+        return sum(1 for i in ids if pending.pop(i, None) is not None)
+
+    # ── Pub/sub ──────────────────────────────────────────────────
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
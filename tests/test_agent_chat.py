@@ -0,0 +1,128 @@
+"""Tests for /agent/chat append-only session history."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+import pytest
+
+import src.services  # noqa: F401 -- import before src.api to avoid the agents/services cycle
+from src.agents.base import AgentResult
+from src.api import routes
+from src.api.routes import ChatRequest, chat_with_agent, get_chat_session_route
+from src.services import task_store
+from src.services.task_store import FallbackStore, get_session, get_session_messages, save_session
+
+
+class EchoAgent:
+    def __init__(self):
+        self.contexts = []
+
+        self.fail_next = False
+
+    async def run(self, context):
+        self.contexts.append(context)
+        await asyncio.sleep(0)  # Let concurrent requests interleave
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError("model timeout")
+        return AgentResult(success=True, output=f"re: {context.task}")
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    async def _no_redis():
+        return None
+    monkeypatch.setattr(task_store, "_get_redis", _no_redis)
+    monkeypatch.setattr(task_store, "_fallback_store", FallbackStore())
+    echo = EchoAgent()
+    monkeypatch.setattr(routes, "get_agent", lambda agent_type: echo)
+    return echo
+
+
+def _request(message, session_id=None):
+    return ChatRequest(session_id=session_id, message=message, tenant_id="org_1", user_id="user_1")
+
+
+@pytest.mark.asyncio
+async def test_turns_append_to_history_not_task(agent):
+    first = await chat_with_agent(_request("hello"))
+    await chat_with_agent(_request("and again", first.session_id))
+
+    context = agent.contexts[-1]
+    assert context.task == "and again"
+    assert context.history == [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "content": "re: hello"},
+    ]
+    assert "messages" not in await get_session(first.session_id)
+    assert len(await get_session_messages(first.session_id)) == 4
+
+
+@pytest.mark.asyncio
+async def test_only_recent_history_reaches_the_agent(agent):
+    session_id = (await chat_with_agent(_request("m0"))).session_id
+    for i in range(1, 20):
+        await chat_with_agent(_request(f"m{i}", session_id))
+    assert len(agent.contexts[-1].history) == 20
+    assert agent.contexts[-1].history[-1] == {"role": "assistant", "content": "re: m18"}
+
+    full = await get_chat_session_route(session_id)
+    assert len(full["messages"]) == 40
+
+
+@pytest.mark.asyncio
+async def test_legacy_inline_messages_are_migrated(agent):
+    await save_session("legacy", {
+        "id": "legacy", "agent_type": "instance_onboarding", "tenant_id": "org_1",
+        "user_id": "user_1", "state": {}, "metadata": {},
+        "messages": [{"role": "user", "content": "old"}],
+    })
+    await chat_with_agent(_request("new", "legacy"))
+    assert agent.contexts[-1].history == [{"role": "user", "content": "old"}]
+    assert [m["content"] for m in await get_session_messages("legacy")] == ["old", "new", "re: new"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_migrate_legacy_messages_once(agent, monkeypatch):
+    from tests.fake_redis import FakeRedis
+
+    # Redis hands each request its own copy of the session, as in production
+    redis = FakeRedis()
+
+    async def _redis():
+        return redis
+    monkeypatch.setattr(task_store, "_get_redis", _redis)
+
+    await save_session("legacy", {
+        "id": "legacy", "agent_type": "instance_onboarding", "tenant_id": "org_1",
+        "user_id": "user_1", "state": {}, "metadata": {},
+        "messages": [{"role": "user", "content": "old"}, {"role": "assistant", "content": "re: old"}],
+    })
+    await asyncio.gather(
+        chat_with_agent(_request("a", "legacy")),
+        chat_with_agent(_request("b", "legacy")),
+    )
+    contents = [m["content"] for m in await get_session_messages("legacy")]
+    assert contents.count("old") == 1
+    assert len(contents) == 6
+
+
+@pytest.mark.asyncio
+async def test_failed_turn_leaves_no_orphan_user_message(agent):
+    session_id = (await chat_with_agent(_request("hello"))).session_id
+    agent.fail_next = True
+    response = await chat_with_agent(_request("lost", session_id))
+    assert response.message.startswith("I encountered an error")
+
+    await chat_with_agent(_request("retry", session_id))
+    roles = [m["role"] for m in agent.contexts[-1].history]
+    assert roles == ["user", "assistant"]
+    assert [m["content"] for m in await get_session_messages(session_id)] == [
+        "hello", "re: hello", "retry", "re: retry",
+    ]
@@ -0,0 +1,181 @@
+"""Tests for queued, deduplicated and coalesced agent event handling."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+import pytest
+
+from src.api import agent_events
+from src.api.agent_events import (
+    AgentEventRequest, EventPayload, handle_agent_event, format_batch_for_agent,
+)
+from src.services import job_queue, task_store
+from src.services.job_queue import JobQueue, register_job_handler
+from src.services.task_store import FallbackStore
+
+
+@pytest.fixture(autouse=True)
+def in_memory(monkeypatch):
+    async def _no_redis():
+        return None
+    monkeypatch.setattr(task_store, "_get_redis", _no_redis)
+    monkeypatch.setattr(job_queue, "_get_redis", _no_redis)
+    monkeypatch.setattr(task_store, "_fallback_store", FallbackStore())
+    monkeypatch.delenv("AGENT_RUNTIME_SECRET", raising=False)
+
+    queue = JobQueue(workers=2, tenant_concurrency=1, poll_interval=0.01, namespace="agent_events")
+    monkeypatch.setattr(agent_events, "_event_queue", queue)
+    return queue
+
+
+def _request(entity_id="proj_1", action="updated", org="org_a"):
+    return AgentEventRequest(
+        agentId="core_projects",
+        organizationId=org,
+        event=EventPayload(
+            entityType="Project",
+            entityId=entity_id,
+            action=action,
+            organizationId=org,
+        ),
+    )
+
+
+@pytest.mark.asyncio
+async def test_duplicate_delivery_is_ignored(in_memory):
+    in_memory.start = lambda: None  # Keep jobs queued for inspection
+    first = await handle_agent_event(_request(), x_event_id="evt-1")
+    retry = await handle_agent_event(_request(), x_event_id="evt-1")
+    assert first.message.startswith("Event queued")
+    assert retry.message.startswith("Duplicate delivery ignored")
+    assert (await in_memory.stats())["delayed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_burst_for_one_entity_becomes_one_run(in_memory):
+    in_memory.start = lambda: None
+    for action in ("created", "updated", "status_changed"):
+        response = await handle_agent_event(_request(action=action), x_event_id=None)
+    assert "coalesced" in response.message
+    await handle_agent_event(_request(entity_id="proj_2"), x_event_id=None)
+    stats = await in_memory.stats()
+    # Runs wait out the coalescing window in the queue, not in a worker
+    assert (stats["depth"], stats["delayed"]) == (0, 2)
+
+    batch = await task_store.list_pop_all(agent_events._batch_key(_request()))
+    assert [event["action"] for event in batch] == ["created", "updated", "status_changed"]
+
+
+def test_batch_message_lists_every_event():
+    events = [_request(action=a).event for a in ("created", "updated")]
+    message = format_batch_for_agent(events)
+    assert message.startswith("2 events for Project proj_1")
+    assert "was created" in message and "was updated" in message
+
+
+@pytest.mark.asyncio
+async def test_org_concurrency_cap(monkeypatch):
+    running: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    async def handler(payload):
+        org = payload["org"]
+        running[org] = running.get(org, 0) + 1
+        peak[org] = max(peak.get(org, 0), running[org])
+        await asyncio.sleep(0.01)
+        running[org] -= 1
+
+    monkeypatch.setattr(job_queue, "_handlers", {})
+    register_job_handler("capped", handler)
+    queue = JobQueue(workers=4, tenant_concurrency=1, poll_interval=0.01)
+    for _ in range(3):
+        await queue.enqueue("capped", {"org": "a"}, tenant_id="a")
+        await queue.enqueue("capped", {"org": "b"}, tenant_id="b")
+
+    async def _wait():
+        while queue.completed < 6:
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(_wait(), 2)
+    await queue.stop()
+    assert peak == {"a": 1, "b": 1}
+
+
+@pytest.mark.asyncio
+async def test_run_takes_whole_batch_once(monkeypatch):
+    from types import SimpleNamespace
+    from src.api import core_router
+
+    calls = []
+
+    async def fake_execute(request, background_tasks):
+        calls.append(request)
+        return SimpleNamespace(status="completed")
+
+    monkeypatch.setattr(core_router, "execute_core_agent", fake_execute)
+    batch_key = agent_events._batch_key(_request())
+    for action in ("created", "updated"):
+        await task_store.list_append(batch_key, _request(action=action).event.model_dump())
+
+    payload = {
+        "batch_key": batch_key,
+        "agent_id": "core_projects",
+        "organization_id": "org_a",
+    }
+    await agent_events._run_event_batch(payload)
+    await agent_events._run_event_batch(payload)  # Redelivery finds nothing
+
+    assert len(calls) == 1
+    assert calls[0].agent_type == "core_projects"
+    assert calls[0].task.startswith("2 events for Project proj_1")
+
+
+@pytest.mark.asyncio
+async def test_failed_run_requeues_its_events(in_memory, monkeypatch):
+    from src.api import core_router
+
+    async def failing_execute(request, background_tasks):
+        raise RuntimeError("core unavailable")
+
+    monkeypatch.setattr(core_router, "execute_core_agent", failing_execute)
+    in_memory.start = lambda: None
+    batch_key = agent_events._batch_key(_request())
+    await task_store.list_append(batch_key, _request(action="created").event.model_dump())
+    payload = {"batch_key": batch_key, "agent_id": "core_projects", "organization_id": "org_a"}
+
+    await agent_events._run_event_batch(payload)
+
+    # A new event for the entity is coalesced into the retry rather than stranded
+    response = await handle_agent_event(_request(action="updated"), x_event_id=None)
+    assert "coalesced" in response.message
+    (due, _, job), = in_memory._local_delayed
+    assert job.payload == {**payload, "attempt": 2}
+    batch = await task_store.list_pop_all(batch_key)
+    assert [event["action"] for event in batch] == ["created", "updated"]
+
+
+@pytest.mark.asyncio
+async def test_failed_run_is_dropped_after_max_attempts(in_memory, monkeypatch):
+    from src.api import core_router
+    from src.config import get_settings
+
+    async def failing_execute(request, background_tasks):
+        raise RuntimeError("core unavailable")
+
+    monkeypatch.setattr(core_router, "execute_core_agent", failing_execute)
+    in_memory.start = lambda: None
+    batch_key = agent_events._batch_key(_request())
+    await task_store.list_append(batch_key, _request().event.model_dump())
+    payload = {
+        "batch_key": batch_key, "agent_id": "core_projects", "organization_id": "org_a",
+        "attempt": get_settings().job_queue_max_deliveries,
+    }
+
+    await agent_events._run_event_batch(payload)
+
+    assert in_memory._local_delayed == []
+    # The next event starts a fresh run
+    response = await handle_agent_event(_request(action="updated"), x_event_id=None)
+    assert response.message.startswith("Event queued")
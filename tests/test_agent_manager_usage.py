@@ -0,0 +1,77 @@
+"""Tests for AgentManager execution history retention and usage rollups."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from src.services.agent_manager import AgentManager, AgentExecution, ExecutionStatus
+
+
+def _execution(instance_id, agent_type="copy", status=ExecutionStatus.COMPLETED, days_ago=0, cost=0.5):
+    started = datetime.utcnow() - timedelta(days=days_ago, seconds=10)
+    return AgentExecution(
+        id=uuid4(),
+        agent_type=agent_type,
+        instance_id=instance_id,
+        client_id=None,
+        status=status,
+        started_at=started,
+        completed_at=started + timedelta(seconds=4),
+        input_tokens=1000,
+        output_tokens=200,
+        cost_estimate=cost,
+    )
+
+
+def test_history_is_a_bounded_ring_buffer():
+    manager = AgentManager(factory=None, history_size=3)
+    instance = uuid4()
+    executions = [_execution(instance) for _ in range(5)]
+    for e in executions:
+        manager._executions[e.id] = e
+        manager._record_execution(e)
+
+    assert [e.id for e in manager.list_executions()] == [e.id for e in executions[-3:]]
+    assert manager.get_execution(executions[0].id) is None
+    assert manager.get_execution(executions[-1].id) is not None
+    # Rollups still count everything that was evicted from the ring
+    assert manager.get_usage_stats()["total_executions"] == 5
+
+
+def test_usage_stats_respect_period_and_instance():
+    manager = AgentManager(factory=None)
+    instance, other = uuid4(), uuid4()
+    manager._record_execution(_execution(instance, days_ago=0))
+    manager._record_execution(_execution(instance, status=ExecutionStatus.FAILED, days_ago=2))
+    manager._record_execution(_execution(instance, days_ago=40))
+    manager._record_execution(_execution(other, agent_type="legal"))
+
+    stats = manager.get_usage_stats(instance_id=instance, period_days=7)
+    assert stats["total_executions"] == 2
+    assert stats["by_agent"]["copy"]["success"] == 1
+    assert stats["by_agent"]["copy"]["failed"] == 1
+    assert stats["by_agent"]["copy"]["avg_duration_seconds"] == 4
+    assert stats["total_input_tokens"] == 2000
+    assert stats["total_cost"] == 1.0
+
+    assert manager.get_usage_stats(instance_id=instance, period_days=60)["total_executions"] == 3
+    assert manager.get_usage_stats(period_days=7)["total_executions"] == 3
+
+
+def test_rollups_older_than_retention_are_dropped():
+    manager = AgentManager(factory=None, rollup_retention_days=10)
+    instance = uuid4()
+    manager._record_execution(_execution(instance, days_ago=30))
+    manager._record_execution(_execution(instance, days_ago=0))
+    assert len(manager._rollups) == 1
+
+
+def test_cost_estimate_uses_token_pricing():
+    manager = AgentManager(factory=None)
+    # legal_agent runs on the premium (Opus) tier
+    premium = manager._estimate_cost("legal", 1000, 1000)
+    standard = manager._estimate_cost("copy", 1000, 1000)
+    assert premium > standard > 0
@@ -0,0 +1,71 @@
+"""Tests for BM25 agent recommendation."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.services.agent_search import AgentSearchIndex, tokenize
+from src.services.agent_manager import AgentManager
+
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("Create the Decks for our Agencies") == ["create", "deck", "agency"]
+
+
+def test_tokenize_keeps_words_that_only_look_plural():
+    assert tokenize("news status analysis business campus") == [
+        "news", "status", "analysis", "business", "campus",
+    ]
+
+
+def test_index_ranks_boosted_fields_higher():
+    index = AgentSearchIndex({
+        "copy": [("headline tagline", 3)],
+        "content": [("blog article with a headline", 1)],
+    })
+    ranked = index.search("headline", top_k=2)
+    assert [key for key, _ in ranked] == ["copy", "content"]
+    assert index.search("nothing matches", top_k=2) == []
+
+
+def test_recommend_agents_ranked_top_k():
+    manager = AgentManager(factory=None)
+    results = manager.recommend_agents("Build a pitch deck with slides", max_results=3)
+    assert results[0]["key"] == "presentation"
+    assert len(results) <= 3
+    scores = [r["relevance_score"] for r in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_recommend_agents_avoids_substring_false_positives():
+    """'ad' in 'add' and 'pr' in 'project' no longer count as matches."""
+    manager = AgentManager(factory=None)
+    keys = [r["key"] for r in manager.recommend_agents("add a task to the project")]
+    assert "copy" not in keys
+    assert "pr" not in keys
+
+
+def test_recommend_agents_new_is_not_news():
+    manager = AgentManager(factory=None)
+    keys = [r["key"] for r in manager.recommend_agents("add a new task")]
+    assert "pr" not in keys
+    assert "news" in tokenize("press news") and "pr" in [
+        r["key"] for r in manager.recommend_agents("write a press release for the news")
+    ]
+
+
+def test_recommend_agents_drops_weak_matches():
+    manager = AgentManager(factory=None)
+    results = manager.recommend_agents("draft a contract")
+    assert [r["key"] for r in results] == ["legal"]
+    assert manager.recommend_agents("hello there") == []
+    assert len(manager.recommend_agents("draft a contract", min_score=0)) > 1
+
+
+def test_index_min_score_cutoff():
+    index = AgentSearchIndex({
+        "copy": [("headline tagline", 3)],
+        "content": [("blog article with a headline", 1)],
+    })
+    best = index.search("headline", top_k=2)[0][1]
+    assert index.search("headline", top_k=2, min_score=best) == [("copy", best)]
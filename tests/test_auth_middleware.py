@@ -0,0 +1,171 @@
+"""Tests for the ASGI auth and rate limit middlewares."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import hashlib
+import hmac
+
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.api import auth, rate_limit
+from src.api.auth import (
+    APIKeyAuthMiddleware, API_KEY, get_principal, require_agent_secret, verify_credential,
+)
+from src.api.rate_limit import RateLimitMiddleware, RateLimiter
+
+
+async def echo(request: Request):
+    return JSONResponse({"body": (await request.body()).decode()})
+
+
+async def whoami(request: Request):
+    principal = get_principal(request)
+    return JSONResponse({
+        "auth_method": principal.auth_method,
+        "organization_id": principal.organization_id,
+    })
+
+
+async def stream(request: Request):
+    async def chunks():
+        yield b"data: 1\n\n"
+        yield b"data: 2\n\n"
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def _no_redis():
+        return None
+    monkeypatch.setattr(rate_limit, "_get_redis", _no_redis)
+    monkeypatch.setattr(rate_limit, "_limiter", RateLimiter())
+    monkeypatch.setenv("ERP_API_KEY", "erp-key")
+    monkeypatch.setenv("ERP_CALLBACK_SECRET", "callback-secret")
+
+    app = Starlette(routes=[
+        Route("/api/v1/echo", echo, methods=["POST"]),
+        Route("/api/v1/stream", stream),
+        Route("/api/v1/whoami", whoami),
+        Route("/health", lambda request: JSONResponse({"ok": True})),
+    ])
+    app.add_middleware(APIKeyAuthMiddleware)
+    app.add_middleware(RateLimitMiddleware)
+    return TestClient(app)
+
+
+def _sign(body: bytes) -> str:
+    return "sha256=" + hmac.new(b"callback-secret", body, hashlib.sha256).hexdigest()
+
+
+def test_public_paths_skip_auth(client):
+    assert client.get("/health").status_code == 200
+
+
+def test_missing_key_is_rejected(client):
+    response = client.post("/api/v1/echo", content=b"{}")
+    assert response.status_code == 401
+
+
+def test_signed_body_is_verified_and_replayed(client):
+    body = b'{"invocation_id": "inv_1"}'
+    response = client.post(
+        "/api/v1/echo", content=body, headers={"X-Webhook-Signature": _sign(body)},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"body": body.decode()}
+
+
+def test_bad_signature_is_rejected(client):
+    response = client.post(
+        "/api/v1/echo", content=b"{}", headers={"X-Webhook-Signature": _sign(b"other")},
+    )
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid webhook signature"
+
+
+def test_streaming_response_gets_rate_limit_headers(client):
+    response = client.get("/api/v1/stream", headers={"X-API-Key": "erp-key"})
+    assert response.status_code == 200
+    assert response.text == "data: 1\n\ndata: 2\n\n"
+    assert response.headers["X-RateLimit-Limit"] == str(rate_limit.DEFAULT_RATE_LIMIT)
+    assert response.headers["X-RateLimit-Remaining"] == str(rate_limit.DEFAULT_RATE_LIMIT - 1)
+
+
+def test_rate_limited_request_gets_429(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "DEFAULT_RATE_LIMIT", 1)
+    headers = {"X-API-Key": "erp-key", "X-Organization-Id": "org_limited"}
+    assert client.get("/api/v1/stream", headers=headers).status_code == 200
+    response = client.get("/api/v1/stream", headers=headers)
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+
+def test_principal_scope_is_on_request_state(client):
+    response = client.get(
+        "/api/v1/whoami", headers={"X-API-Key": "erp-key", "X-Organization-Id": "org_7"},
+    )
+    assert response.json() == {"auth_method": "api_key", "organization_id": "org_7"}
+
+
+def test_webhook_key_is_absorbed_once(client):
+    auth._keyed_mac.cache_clear()
+    for n in range(3):
+        body = b'{"n": %d}' % n
+        response = client.post("/api/v1/echo", content=body, headers={"X-Webhook-Signature": _sign(body)})
+        assert response.status_code == 200
+    assert auth._keyed_mac.cache_info().misses == 1
+
+
+def test_rotated_key_stops_working_at_once(client, monkeypatch):
+    assert verify_credential(API_KEY, "erp-key")
+    monkeypatch.setenv("ERP_API_KEY", "rotated-key")
+    assert not verify_credential(API_KEY, "erp-key")
+    assert verify_credential(API_KEY, "rotated-key")
+    response = client.get("/api/v1/whoami", headers={"X-API-Key": "erp-key"})
+    assert response.status_code == 401
+
+
+@pytest.fixture
+def core_client(monkeypatch):
+    from fastapi import Depends, FastAPI
+
+    monkeypatch.setenv("ERP_API_KEY", "erp-key")
+    monkeypatch.setenv("AGENT_RUNTIME_SECRET", "core-secret")
+    app = FastAPI()
+
+    @app.get("/api/v1/core/ping", dependencies=[Depends(require_agent_secret)])
+    async def ping(request: Request):
+        return {"auth_method": get_principal(request).auth_method}
+
+    app.add_middleware(APIKeyAuthMiddleware)
+    return TestClient(app)
+
+
+def test_agent_secret_is_checked_once(core_client, monkeypatch):
+    calls = []
+    real_compare = auth.hmac.compare_digest
+
+    def counting_compare(a, b):
+        calls.append(a)
+        return real_compare(a, b)
+
+    monkeypatch.setattr(auth.hmac, "compare_digest", counting_compare)
+    response = core_client.get("/api/v1/core/ping", headers={"X-Agent-Secret": "core-secret"})
+    assert response.json() == {"auth_method": "agent_secret"}
+    assert calls == ["core-secret"]  # By the middleware only
+
+
+def test_core_endpoint_needs_agent_secret_behind_api_key(core_client):
+    response = core_client.get("/api/v1/core/ping", headers={"X-API-Key": "erp-key"})
+    assert response.status_code == 401
+    response = core_client.get(
+        "/api/v1/core/ping", headers={"X-API-Key": "erp-key", "X-Agent-Secret": "core-secret"},
+    )
+    assert response.json() == {"auth_method": "api_key"}
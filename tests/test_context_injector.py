@@ -125,3 +125,87 @@ def test_max_chars_respected():
     ]
     result = format_context_entries(large_entries)
     assert len(result) <= 6200  # MAX_CONTEXT_CHARS + header/footer overhead
+
+
+def test_top_k_matches_full_sort_order():
+    from src.services import context_injector
+    entries = [
+        {"entryType": "ENTITY", "key": f"e{i}", "value": "v", "confidence": 0.51 + (i % 40) / 100}
+        for i in range(3000)
+    ] + [{"entryType": "PREFERENCE", "key": "tone", "value": "concise", "confidence": 0.1}]
+    result = format_context_entries(entries)
+    lines = result.strip().split("\n")[1:-1]
+    assert lines[0] == "[PREFERENCE] tone: concise"
+    assert len(lines) <= context_injector.MAX_CONTEXT_LINES
+    # Highest-confidence entities come first
+    assert lines[1].startswith("[ENTITY] e39:")
+
+
+def test_recency_breaks_confidence_ties():
+    from datetime import datetime, timezone, timedelta
+    now = datetime.now(timezone.utc)
+    entries = [
+        {"entryType": "INSIGHT", "key": "older", "value": "a", "createdAt": (now - timedelta(days=3)).isoformat()},
+        {"entryType": "INSIGHT", "key": "newer", "value": "b", "createdAt": (now - timedelta(days=1)).isoformat()},
+    ]
+    result = format_context_entries(entries)
+    assert result.index("newer") < result.index("older")
+
+
+def test_naive_and_datetime_timestamps_accepted():
+    from datetime import datetime, timezone, timedelta
+    utcnow = datetime.now(timezone.utc).replace(tzinfo=None)
+    past = utcnow - timedelta(days=1)
+    entries = [
+        {"entryType": "PREFERENCE", "key": "gone", "value": "x", "expiresAt": past.isoformat()},
+        {"entryType": "PREFERENCE", "key": "kept", "value": "y", "expiresAt": utcnow + timedelta(days=1)},
+    ]
+    result = format_context_entries(entries)
+    assert "gone" not in result
+    assert "kept" in result
+
+
+def test_block_cached_per_org_and_version(monkeypatch):
+    from src.services import context_injector
+    calls = []
+    real = context_injector._rank_entries
+    monkeypatch.setattr(context_injector, "_rank_entries", lambda *a: calls.append(1) or real(*a))
+
+    entries = [{"id": "c1", "entryType": "PREFERENCE", "key": "tone", "value": "concise"}]
+    first = format_context_entries(entries, org_id="org_cache")
+    assert format_context_entries(list(entries), org_id="org_cache") == first
+    assert len(calls) == 1
+
+    changed = [{"id": "c1", "entryType": "PREFERENCE", "key": "tone", "value": "formal",
+                "updatedAt": "2026-01-02T00:00:00Z"}]
+    assert "formal" in format_context_entries(changed, org_id="org_cache")
+    assert len(calls) == 2
+
+    format_context_entries(changed, org_id="org_cache", version="v7")
+    format_context_entries(changed, org_id="org_cache", version="v7")
+    assert len(calls) == 3
+
+
+def test_block_cache_sees_value_and_key_edits_without_timestamp_change():
+    stamp = "2026-01-01T00:00:00Z"
+    entries = [{"id": "c2", "entryType": "PREFERENCE", "key": "tone",
+                "value": {"body": "concise"}, "updatedAt": stamp}]
+    assert "concise" in format_context_entries(entries, org_id="org_value_edit")
+
+    entries = [dict(entries[0], value={"body": "formal"})]
+    assert "formal" in format_context_entries(entries, org_id="org_value_edit")
+
+    entries = [dict(entries[0], key="voice")]
+    assert "voice" in format_context_entries(entries, org_id="org_value_edit")
+
+
+def test_cached_block_dropped_when_entry_expires(monkeypatch):
+    from src.services import context_injector
+    clock = [1_000_000.0]
+    monkeypatch.setattr(context_injector.time, "time", lambda: clock[0])
+
+    entries = [{"id": "c1", "entryType": "PREFERENCE", "key": "tone", "value": "concise",
+                "expiresAt": "1970-01-12T13:46:50+00:00"}]  # 1_000_010
+    assert "tone" in format_context_entries(entries, org_id="org_expiry")
+    clock[0] += 20
+    assert format_context_entries(entries, org_id="org_expiry") == ""
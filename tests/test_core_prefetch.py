@@ -0,0 +1,140 @@
+"""Tests for the concurrent org-context prefetch in the core router."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+import pytest
+
+import src.services  # noqa: F401 -- import before src.api to avoid the agents/services cycle
+from src.api import core_router
+from src.api.core_router import CoreExecuteRequest, prefetch_core_context
+from src.services.context_injector import inject_context_into_prompt
+from src.services.core_config_builder import build_agent_config
+from src.services.request_context import CoreRequestContext
+
+MODULE_RECORDS = [
+    {"module_type": "CRM", "agent_definition": {"tools": [{"name": "crm_lookup"}]}},
+    {"module_type": "ANALYTICS", "agent_definition": None},
+]
+
+
+@pytest.fixture
+def loaders(monkeypatch):
+    calls = []
+
+    def fake(name, value, delay=0.05):
+        async def load(*args, **kwargs):
+            calls.append(name)
+            await asyncio.sleep(delay)
+            return value
+        return load
+
+    monkeypatch.setattr(core_router, "get_org_module_records", fake("modules", MODULE_RECORDS))
+    monkeypatch.setattr(core_router, "_get_cached_integrations", fake("integrations", [{"provider": "slack"}]))
+    monkeypatch.setattr(core_router, "_get_cached_events", fake("events", [{"entityType": "task"}]))
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_prefetch_runs_lookups_concurrently(loaders):
+    request = CoreExecuteRequest(task="plan the week", org_id="org_1")
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    ctx = await prefetch_core_context(request, "org_1", toolkit=None)
+    elapsed = loop.time() - started
+
+    assert sorted(loaders) == ["events", "integrations", "modules"]
+    assert elapsed < 0.12  # Three 50 ms lookups overlapped
+    assert ctx.installed_modules == ["CRM", "ANALYTICS"]
+    assert ctx.module_tools == [{"name": "crm_lookup"}]
+    assert ctx.integrations == [{"provider": "slack"}]
+    assert ctx.events == [{"entityType": "task"}]
+
+
+@pytest.mark.asyncio
+async def test_prefetch_prefers_request_data(loaders):
+    request = CoreExecuteRequest(
+        task="plan the week", org_id="org_1",
+        integrations=[{"provider": "gmail"}], recent_events=[{"entityType": "brief"}],
+        context_entries=[{"entryType": "PREFERENCE", "key": "tone", "value": "formal"}],
+    )
+    ctx = await prefetch_core_context(request, "org_1", toolkit=None)
+
+    assert loaders == ["modules"]
+    assert ctx.integrations == [{"provider": "gmail"}]
+    assert ctx.events == [{"entityType": "brief"}]
+    assert ctx.context_entries == request.context_entries
+
+
+@pytest.mark.asyncio
+async def test_prefetch_skips_org_context_for_synthesis(loaders):
+    request = CoreExecuteRequest(task="[SYNTHESIS] summarise", org_id="org_1")
+    ctx = await prefetch_core_context(request, "org_1", toolkit=None)
+    assert loaders == ["modules"]
+    assert ctx.integrations == [] and ctx.events == []
+
+
+@pytest.mark.asyncio
+async def test_prefetch_survives_module_lookup_failure(loaders, monkeypatch):
+    async def broken(org_id):
+        raise RuntimeError("db down")
+    monkeypatch.setattr(core_router, "get_org_module_records", broken)
+
+    request = CoreExecuteRequest(task="plan the week", org_id="org_1")
+    ctx = await prefetch_core_context(request, "org_1", toolkit=None)
+    assert ctx.module_records == []
+    assert ctx.integrations == [{"provider": "slack"}]
+
+
+@pytest.mark.asyncio
+async def test_build_agent_config_reads_request_context():
+    ctx = CoreRequestContext(org_id="org_1", module_records=MODULE_RECORDS)
+    config = await build_agent_config(
+        org_id="org_1", org_name="Acme", org_tier="FREE",
+        agent_type="core_tasks", request_context=ctx,
+    )
+    assert {"name": "crm_lookup"} in config["tools"]
+    assert "CRM" in config["system_prompt_context"]
+
+
+def test_inject_context_reads_request_context():
+    ctx = CoreRequestContext(
+        org_id="org_1",
+        context_entries=[{"entryType": "PREFERENCE", "key": "tone", "value": "formal", "confidence": 0.9}],
+        integrations=[{"provider": "slack", "status": "ACTIVE"}],
+    )
+    result = inject_context_into_prompt("You are helpful.", request_context=ctx)
+    assert "--- ORGANIZATIONAL CONTEXT ---" in result
+    assert "tone" in result
+    assert inject_context_into_prompt("You are helpful.", [], request_context=ctx).count("tone") == 0
+
+
+@pytest.mark.parametrize("failing", ["build_agent_config", "_load_agent_class"])
+@pytest.mark.asyncio
+async def test_toolkit_closed_when_agent_setup_fails(loaders, monkeypatch, failing):
+    closed = []
+
+    class FakeToolkit:
+        def __init__(self, **kwargs):
+            pass
+
+        async def close(self):
+            closed.append(True)
+
+    async def available_config(**kwargs):
+        return {"available": True, "model": "test-model", "tools": []}
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("setup failed")
+
+    monkeypatch.setattr(core_router, "CoreToolkit", FakeToolkit)
+    monkeypatch.setattr(core_router, "build_agent_config", available_config)
+    monkeypatch.setattr(core_router, failing, broken)
+
+    request = CoreExecuteRequest(task="list my tasks", agent_type="core_tasks", org_id="org_1")
+    with pytest.raises(RuntimeError, match="setup failed"):
+        await core_router.execute_core_agent(request, background_tasks=None)
+    assert closed == [True]
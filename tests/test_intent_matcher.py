@@ -0,0 +1,74 @@
+"""Tests for the compiled core intent matcher."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+import src.services  # noqa: F401 -- import before src.api to avoid the agents/services cycle
+from src.api.core_router import IntentMatcher, classify_intent, rank_intents
+
+
+def test_keywords_match_on_word_boundaries():
+    matcher = IntentMatcher({"greet": ["hi"], "orders": ["order"]})
+    assert matcher.scores("this is a border") == {}
+    assert matcher.scores("Hi, two orders please") == {"greet": 1.0, "orders": 1.0}
+
+
+def test_inflected_keywords_match():
+    matcher = IntentMatcher({"greet": ["hi"], "orders": ["order"], "briefs": ["review"]})
+    assert matcher.scores("what's the ordering status") == {"orders": 1.0}
+    assert matcher.scores("has the deck been reviewed?") == {"briefs": 1.0}
+    assert matcher.scores("show my history") == {}  # Short keywords only pluralise
+
+
+def test_only_inflections_extend_a_keyword():
+    matcher = IntentMatcher({
+        "orders": ["bill"], "briefs": ["brief", "copy", "delegate"],
+        "studio": ["logo"], "projects": ["project"], "onboarding": ["set up"],
+    })
+    assert matcher.scores("bills billed billing") == {"orders": 3.0}
+    assert matcher.scores("delegates delegated delegating") == {"briefs": 3.0}
+    for message in (
+        "a billion impressions", "briefly", "logout", "copyright notice",
+        "revenue projection", "set upload limits",
+    ):
+        assert matcher.scores(message) == {}, message
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("Show me the billing summary", "core_orders"),
+    ("I uploaded the new hero images", "content_studio"),
+    ("Has the deck been reviewed yet?", "core_briefs"),
+    ("Write documentation for the launch", "core_briefs"),
+    ("I need copywriting for the landing page", "core_briefs"),
+    ("delegated tasks from Sam", "delegation"),
+    ("what's the ordering status", "core_orders"),
+])
+@pytest.mark.asyncio
+async def test_inflected_messages_route_to_their_agent(message, intent):
+    assert await classify_intent(message, "FREE") == intent
+
+
+def test_phrases_outweigh_single_words_and_longest_wins():
+    matcher = IntentMatcher({"briefs": ["brief"], "creative": ["creative brief"]})
+    assert matcher.scores("draft a creative brief") == {"creative": 1.5}
+
+
+def test_shared_keyword_scores_every_listing_intent():
+    matcher = IntentMatcher({"a": ["review"], "b": ["review", "approval"]})
+    assert matcher.rank("review the approval") == [("b", 2.0), ("a", 1.0)]
+
+
+def test_rank_excludes_pseudo_intents():
+    assert rank_intents("hello, what happened?") == []
+    assert rank_intents("show the project timeline")[0] == ("core_projects", 2.0)
+
+
+@pytest.mark.asyncio
+async def test_classification_fallbacks():
+    assert await classify_intent("recent activity please", "FREE") == "core_tasks"
+    assert await classify_intent("hello there", "FREE") == "core_onboarding"
+    assert await classify_intent("something unrelated", "FREE") == "core_tasks"
+    assert await classify_intent("this thing", "FREE") == "core_tasks"  # "hi" is not a cue here
@@ -0,0 +1,251 @@
+"""Tests for the background job queue (in-memory and Redis streams backends)."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import json
+
+import pytest
+
+from src.services import job_queue
+from src.services.job_queue import JobQueue, register_job_handler
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    async def _no_redis():
+        return None
+    monkeypatch.setattr(job_queue, "_get_redis", _no_redis)
+    monkeypatch.setattr(job_queue, "_handlers", {})
+
+
+async def _drain(queue: JobQueue, timeout: float = 2.0):
+    async def _wait():
+        while (await queue.stats())["depth"] or queue._in_flight:
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(_wait(), timeout)
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_requires_registered_handler():
+    queue = JobQueue()
+    with pytest.raises(ValueError):
+        await queue.enqueue("unknown", {})
+
+
+@pytest.mark.asyncio
+async def test_tenants_are_served_round_robin():
+    order = []
+
+    async def handler(payload):
+        order.append(payload["tenant"])
+
+    register_job_handler("record", handler)
+    queue = JobQueue(workers=1, poll_interval=0.01)
+    # Enqueue never yields without Redis, so all jobs are queued before
+    # the fetch loop first runs
+    for _ in range(3):
+        await queue.enqueue("record", {"tenant": "big"}, tenant_id="big")
+    await queue.enqueue("record", {"tenant": "small"}, tenant_id="small")
+    await _drain(queue)
+    assert order == ["big", "small", "big", "big"]
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_caps_concurrency():
+    running = 0
+    peak = 0
+
+    async def handler(payload):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    register_job_handler("sleep", handler)
+    queue = JobQueue(workers=2, poll_interval=0.01)
+    for i in range(6):
+        await queue.enqueue("sleep", {}, tenant_id=f"t{i}")
+    await _drain(queue)
+    assert peak == 2
+    assert queue.completed == 6
+
+
+@pytest.mark.asyncio
+async def test_failed_jobs_retry_then_dead_letter():
+    attempts = 0
+    dead = []
+
+    async def handler(payload):
+        nonlocal attempts
+        attempts += 1
+        raise RuntimeError("boom")
+
+    async def on_dead(payload, error):
+        dead.append((payload, error))
+
+    register_job_handler("flaky", handler, on_dead_letter=on_dead)
+    queue = JobQueue(workers=1, max_deliveries=3, poll_interval=0.01)
+    await queue.enqueue("flaky", {"id": 1})
+    await _drain(queue)
+    assert attempts == 3
+    assert dead == [({"id": 1}, "boom")]
+    assert queue.dead_lettered == 1
+
+
+@pytest.mark.asyncio
+async def test_delayed_job_waits_without_holding_a_worker():
+    ran = []
+
+    async def handler(payload):
+        ran.append(payload["n"])
+
+    register_job_handler("later", handler)
+    queue = JobQueue(workers=1, poll_interval=1.0)
+    await queue.enqueue("later", {"n": 1}, delay=0.05)
+    await queue.enqueue("later", {"n": 2})
+    await asyncio.sleep(0.01)
+    assert ran == [2]
+    stats = await queue.stats()
+    assert (stats["depth"], stats["delayed"], stats["in_flight"]) == (0, 1, 0)
+
+    # The fetch loop wakes for the due time rather than the poll interval
+    await asyncio.sleep(0.1)
+    assert ran == [2, 1]
+    assert (await queue.stats())["delayed"] == 0
+    await queue.stop()
+
+
+# ── Redis streams backend ───────────────────────────────────────
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    from tests.fake_redis import FakeRedis
+
+    r = FakeRedis()
+
+    def prune(redis, keys, args):
+        if not redis.streams.get(keys[0]):
+            redis.sets.get(keys[1], set()).discard(args[0])
+        return 1
+
+    def promote(redis, keys, args):
+        now, prefix, batch = float(args[0]), args[1], int(args[2])
+        due = [m for m, score in sorted(redis.zsets.get(keys[0], {}).items(), key=lambda i: i[1]) if score <= now]
+        for member in due[:batch]:
+            del redis.zsets[keys[0]][member]
+            job = json.loads(member)
+            redis._seq += 1
+            entry_id = f"{redis.now_ms}-{redis._seq}"
+            redis.streams.setdefault(prefix + job["tenant_id"], {})[entry_id] = {
+                "kind": job["kind"], "payload": job["payload"],
+            }
+            redis.sets.setdefault(keys[1], set()).add(job["tenant_id"])
+        return len(due[:batch])
+
+    r.scripts[job_queue._PRUNE_SCRIPT.strip()] = prune
+    r.scripts[job_queue._PROMOTE_SCRIPT.strip()] = promote
+
+    async def _redis():
+        return r
+    monkeypatch.setattr(job_queue, "_get_redis", _redis)
+    return r
+
+
+@pytest.mark.asyncio
+async def test_redis_failed_job_is_reclaimed_and_redelivered(fake_redis):
+    attempts = []
+
+    async def handler(payload):
+        attempts.append(payload["n"])
+        if len(attempts) == 1:
+            raise RuntimeError("transient")
+
+    register_job_handler("retry", handler)
+    queue = JobQueue(workers=2, visibility_timeout=10, max_deliveries=3)
+    await queue.enqueue("retry", {"n": 1}, tenant_id="acme")
+    await queue.stop()
+
+    jobs = await queue._claim(2)
+    assert [j.deliveries for j in jobs] == [1]
+    for job in jobs:
+        queue._tenant_running[job.tenant_id] += 1
+        await queue._execute(job)
+    assert queue.failed == 1
+    assert fake_redis.groups["jobs:acme"]["pending"]  # Left unacked
+
+    # Not reclaimed before the visibility timeout
+    assert await queue._claim(2) == []
+
+    fake_redis.advance(11)
+    queue._last_reclaim = -1e9
+    jobs = await queue._claim(2)
+    assert [(j.payload, j.deliveries) for j in jobs] == [({"n": 1}, 2)]
+    for job in jobs:
+        queue._tenant_running[job.tenant_id] += 1
+        await queue._execute(job)
+
+    assert attempts == [1, 1]
+    assert queue.completed == 1
+    assert not fake_redis.groups["jobs:acme"]["pending"]
+    assert fake_redis.streams["jobs:acme"] == {}
+    assert "acme" not in fake_redis.sets.get("jobs:tenants", set())
+
+
+@pytest.mark.asyncio
+async def test_redis_reclaim_respects_tenant_cap_and_dead_letters(fake_redis):
+    dead = []
+
+    async def handler(payload):
+        raise RuntimeError("always")
+
+    async def on_dead(payload, error):
+        dead.append(payload["n"])
+
+    register_job_handler("doomed", handler, on_dead_letter=on_dead)
+    queue = JobQueue(workers=4, visibility_timeout=10, max_deliveries=2, tenant_concurrency=1)
+    for n in range(2):
+        await queue.enqueue("doomed", {"n": n}, tenant_id="acme")
+    await queue.stop()
+
+    # Crashed consumer: two jobs delivered, never acked
+    await queue._ensure_group(fake_redis, "jobs:acme")
+    await fake_redis.xreadgroup(job_queue.CONSUMER_GROUP, "dead-pod", {"jobs:acme": ">"}, count=2)
+    fake_redis.advance(11)
+
+    jobs = await queue._reclaim_expired(fake_redis, 4)
+    assert [j.payload["n"] for j in jobs] == [0]  # tenant_concurrency=1
+    assert jobs[0].deliveries == 2
+
+    # At max deliveries the failure is dead-lettered and acked
+    queue._tenant_running["acme"] += 1
+    await queue._execute(jobs[0])
+    assert dead == [0]
+    assert queue.dead_lettered == 1
+    # The second job is still pending for the next reclaim
+    assert list(fake_redis.groups["jobs:acme"]["pending"]) != [jobs[0].id]
+    assert len(fake_redis.groups["jobs:acme"]["pending"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_delayed_job_is_promoted_when_due(fake_redis):
+    async def handler(payload):
+        pass
+
+    register_job_handler("later", handler)
+    queue = JobQueue(workers=2, visibility_timeout=10)
+    await queue.enqueue("later", {"n": 1}, tenant_id="acme", delay=0.05)
+    await queue.stop()
+
+    assert len(fake_redis.zsets["jobs:delayed"]) == 1
+    assert await queue._claim(2) == []
+    assert (await queue.stats())["delayed"] == 1
+
+    await asyncio.sleep(0.06)
+    jobs = await queue._claim(2)
+    assert [(j.tenant_id, j.payload) for j in jobs] == [("acme", {"n": 1})]
+    assert fake_redis.zsets["jobs:delayed"] == {}
@@ -0,0 +1,59 @@
+"""Tests for orchestration AgentRegistry capability search and caching."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.orchestration.registry import (
+    AgentRegistry,
+    AgentInfo,
+    AgentCapability,
+    CapabilityCategory,
+)
+
+
+def _tool_names(results):
+    return [cap.tool_name for _, cap in results]
+
+
+def test_tool_name_match_ranks_first():
+    registry = AgentRegistry()
+    assert _tool_names(registry.search_capabilities("performance"))[0] == "run_performance_audit"
+
+
+def test_prefix_and_multi_word_queries():
+    registry = AgentRegistry()
+    assert _tool_names(registry.search_capabilities("perf audit")) == ["run_performance_audit"]
+    assert "verify_gdpr_compliance" in _tool_names(registry.search_capabilities("GDPR"))
+
+
+def test_no_match_and_limit():
+    registry = AgentRegistry()
+    assert registry.search_capabilities("zzzz") == []
+    assert registry.search_capabilities("") == []
+    assert len(registry.search_capabilities("capture", limit=2)) == 2
+
+
+def test_reregistering_agent_replaces_index_and_invalidates_dict():
+    registry = AgentRegistry()
+    before = registry.to_dict()
+    assert registry.to_dict() is before
+
+    registry.register_agent(AgentInfo(
+        agent_id="qa_agent",
+        name="QA Agent",
+        description="Replaced",
+        capabilities=[
+            AgentCapability(
+                tool_name="check_widgets",
+                description="Check widgets render",
+                category=CapabilityCategory.VERIFICATION,
+                input_schema={},
+            ),
+        ],
+    ))
+
+    assert registry.to_dict() is not before
+    assert _tool_names(registry.search_capabilities("widgets")) == ["check_widgets"]
+    assert registry.search_capabilities("perf audit") == []
+    assert registry.find_agents_with_capability("run_performance_audit") == []
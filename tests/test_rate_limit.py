@@ -0,0 +1,142 @@
+"""Tests for the GCRA rate limiter: Redis script, local fallback and header values."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.api import rate_limit
+from src.api.rate_limit import RateLimiter, _LocalGCRA
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_allows_burst_up_to_limit_then_denies(clock):
+    limiter = _LocalGCRA()
+    results = [limiter.hit("k", limit=3, period=60) for _ in range(4)]
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results[:3]] == [2, 1, 0]
+    assert results[3].retry_after == pytest.approx(20)
+
+
+def test_capacity_replenishes_at_emission_interval(clock):
+    limiter = _LocalGCRA()
+    for _ in range(3):
+        limiter.hit("k", limit=3, period=60)
+    clock[0] += 20
+    result = limiter.hit("k", limit=3, period=60)
+    assert result.allowed
+    assert result.remaining == 0
+    assert not limiter.hit("k", limit=3, period=60).allowed
+
+
+def test_keys_are_independent_and_bounded(clock):
+    limiter = _LocalGCRA(max_keys=2)
+    limiter.hit("a", limit=1, period=60)
+    assert limiter.hit("b", limit=1, period=60).allowed
+    limiter.hit("c", limit=1, period=60)
+    assert "a" not in limiter._tat
+    assert len(limiter._tat) == 2
+
+
+def test_denied_headers_include_retry_after(clock):
+    limiter = _LocalGCRA()
+    limiter.hit("k", limit=1, period=60)
+    headers = limiter.hit("k", limit=1, period=60).headers()
+    assert headers["X-RateLimit-Remaining"] == "0"
+    assert headers["Retry-After"] == "60"
+    assert headers["X-RateLimit-Limit"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_limiter_falls_back_without_redis(monkeypatch, clock):
+    async def _no_redis():
+        return None
+    monkeypatch.setattr(rate_limit, "_get_redis", _no_redis)
+    limiter = RateLimiter()
+    assert (await limiter.hit("k", limit=1)).allowed
+    assert not (await limiter.hit("k", limit=1)).allowed
+
+
+class _LuaRedis:
+    """Runs registered scripts in a real Lua 5.1 (as Redis does) over a dict."""
+
+    def __init__(self, clock):
+        lua51 = pytest.importorskip("lupa.lua51")
+        self.clock = clock
+        self.strings = {}
+        self.lua = lua51.LuaRuntime()
+        self.lua.globals().redis = self.lua.table_from({"call": self._call})
+
+    def _call(self, command, *args):
+        command = command.upper()
+        if command == "TIME":
+            seconds = int(self.clock[0])
+            return self.lua.table(str(seconds), str(int((self.clock[0] - seconds) * 1_000_000)))
+        if command == "GET":
+            return self.strings.get(args[0], False)  # nil replies reach Lua as false
+        if command == "SET":
+            self.strings[args[0]] = args[1]
+            return "OK"
+        raise AssertionError(f"unexpected command {command}")
+
+    def register_script(self, script):
+        fn = self.lua.eval(f"function(KEYS, ARGV)\n{script}\nend")
+
+        async def run(keys=(), args=()):
+            reply = fn(self.lua.table(*keys), self.lua.table(*(str(a) for a in args)))
+            return [int(value) for value in reply.values()]  # Redis truncates Lua numbers
+        return run
+
+
+@pytest.mark.asyncio
+async def test_redis_script_allows_denies_and_sets_retry_after(monkeypatch, clock):
+    r = _LuaRedis(clock)
+
+    async def _redis():
+        return r
+    monkeypatch.setattr(rate_limit, "_get_redis", _redis)
+    limiter = RateLimiter()
+
+    results = [await limiter.hit("k", limit=3, period=60) for _ in range(4)]
+    assert [res.allowed for res in results] == [True, True, True, False]
+    assert [res.remaining for res in results[:3]] == [2, 1, 0]
+    denied = results[3].headers()
+    assert denied["Retry-After"] == "20"
+    assert denied["X-RateLimit-Reset"] == "60"
+    assert denied["X-RateLimit-Remaining"] == "0"
+
+    clock[0] += 20
+    assert (await limiter.hit("k", limit=3, period=60)).allowed
+    assert not (await limiter.hit("k", limit=3, period=60)).allowed
+    assert (await limiter.hit("other", limit=3, period=60)).remaining == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_redis_connect_backs_off(monkeypatch, clock):
+    import redis.asyncio
+    from src.services import task_store
+
+    attempts = []
+
+    def _unreachable(url, **kwargs):
+        attempts.append(url)
+        raise ConnectionError("refused")
+    monkeypatch.setenv("REDIS_URL", "redis://unreachable:6379")
+    monkeypatch.setattr(redis.asyncio, "from_url", _unreachable)
+    monkeypatch.setattr(task_store, "_redis_client", None)
+    monkeypatch.setattr(task_store, "_redis_retry_at", 0.0)
+
+    assert await task_store._get_redis() is None
+    assert await task_store._get_redis() is None
+    assert len(attempts) == 1
+
+    clock[0] += task_store.REDIS_RECONNECT_BACKOFF
+    assert await task_store._get_redis() is None
+    assert len(attempts) == 2
@@ -0,0 +1,137 @@
+"""Tests for the WebSocket chat session cache and history compaction."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.services import session_cache, task_store
+from src.services.chat_history import compact_history
+from src.services.session_cache import SessionCache
+from src.services.task_store import FallbackStore
+
+
+class FakeAgent:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def in_memory(monkeypatch):
+    async def _no_redis():
+        return None
+    monkeypatch.setattr(task_store, "_get_redis", _no_redis)
+    monkeypatch.setattr(task_store, "_fallback_store", FallbackStore())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _state(**extra):
+    return {"agent_type": "brief", "model": "m", "messages": [], **extra}
+
+
+def test_compaction_keeps_newest_messages_within_budget():
+    messages = [{"role": "user", "content": f"m{i}"} for i in range(30)]
+    kept = compact_history(messages, max_messages=5)
+    assert [m["content"] for m in kept] == ["m25", "m26", "m27", "m28", "m29"]
+
+    long = [{"role": "assistant", "content": "a" * 50}, {"role": "user", "content": "b" * 50}]
+    kept = compact_history(long, max_chars=60, max_message_chars=40)
+    assert len(kept) == 1
+    assert kept[0]["content"].startswith("b" * 40) and kept[0]["content"].endswith("[truncated]")
+
+
+def test_compaction_never_opens_on_an_assistant_turn():
+    messages = []
+    for i in range(3):
+        messages += [{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": f"a{i}"}]
+    kept = compact_history(messages, max_messages=3)
+    assert [m["content"] for m in kept] == ["q2", "a2"]
+    kept = compact_history(messages, max_chars=7)  # Room for a1 but not q1
+    assert [m["content"] for m in kept] == ["q2", "a2"]
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_spills_state_and_closes_agent():
+    cache = SessionCache(max_entries=2)
+    first = await cache.put("a", _state())
+    agent = FakeAgent()
+    first.agent = agent
+    await cache.put("b", _state())
+    await cache.get("a")  # "b" is now least recently used
+    await cache.put("c", _state())
+    assert "b" not in cache and "a" in cache
+
+    await cache.put("d", _state())
+    assert "a" not in cache
+    assert agent.closed
+    assert cache.evictions == 2
+
+    # Spilled sessions come back from the store, without an agent
+    restored = await cache.get("a")
+    assert restored.state["agent_type"] == "brief"
+    assert restored.agent is None
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_expire(clock):
+    cache = SessionCache(idle_ttl=60, spill=False)
+    await cache.put("a", _state())
+    clock[0] += 61
+    assert await cache.get("a") is None
+    assert cache.expirations == 1
+
+
+@pytest.mark.asyncio
+async def test_byte_cap_evicts_oldest():
+    cache = SessionCache(max_bytes=400)
+    await cache.put("a", _state(context="x" * 200))
+    await cache.put("b", _state(context="y" * 200))
+    assert "a" not in cache and "b" in cache
+    assert cache.stats()["bytes"] <= 400
+
+
+@pytest.mark.asyncio
+async def test_turns_are_recorded_and_compacted():
+    cache = SessionCache()
+    await cache.put("a", _state())
+    for i in range(15):
+        await cache.record_turn("a", f"q{i}", f"a{i}")
+    messages = (await cache.get("a")).state["messages"]
+    assert len(messages) == 20
+    assert messages[-2:] == [{"role": "user", "content": "q14"}, {"role": "assistant", "content": "a14"}]
+
+
+@pytest.mark.asyncio
+async def test_recorded_turns_survive_a_restart():
+    cache = SessionCache(spill=False)
+    await cache.put("a", _state())
+    await cache.record_turn("a", "q0", "a0")
+
+    restarted = SessionCache()
+    restored = await restarted.get("a")
+    assert restored.state["messages"] == [
+        {"role": "user", "content": "q0"}, {"role": "assistant", "content": "a0"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_agent_evicted_while_busy_is_handed_back_to_caller():
+    cache = SessionCache(max_entries=1)
+    session = await cache.put("a", _state())
+    agent = FakeAgent()
+    assert session.adopt_agent(agent)
+    assert session.checkout_agent() is None  # Already in use
+
+    await cache.put("b", _state())
+    assert not agent.closed  # Still running
+    assert not session.release_agent(agent)  # Caller must close it
@@ -0,0 +1,117 @@
+"""Tests for the two-tier shared cache (local tier, no Redis)."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+import pytest
+
+from src.modules import module_checker
+from src.services import shared_cache
+from src.services.shared_cache import SharedCache
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    async def _no_redis():
+        return None
+    monkeypatch.setattr(shared_cache, "_get_redis", _no_redis)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(shared_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once():
+    cache = SharedCache("t_single_flight", ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["value"]
+
+    results = await asyncio.gather(*(cache.get("org", loader) for _ in range(10)))
+    assert results == [["value"]] * 10
+    assert calls == 1
+    assert await cache.get("org", loader) == ["value"]
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_expiry_reloads_and_failure_serves_stale(clock):
+    cache = SharedCache("t_stale", ttl=60)
+    assert await cache.get("org", _returning(["v1"])) == ["v1"]
+    clock[0] += 61
+
+    async def failing():
+        raise RuntimeError("down")
+
+    assert await cache.get("org", failing) == ["v1"]
+    with pytest.raises(RuntimeError):
+        await cache.get("other", failing)
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_reload():
+    cache = SharedCache("t_invalidate", ttl=60)
+    await cache.get("org", _returning(["old"]))
+    await cache.invalidate("org")
+    assert await cache.get("org", _returning(["new"])) == ["new"]
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_load_skips_write_back():
+    cache = SharedCache("t_invalidate_inflight", ttl=60)
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_loader():
+        started.set()
+        await release.wait()
+        return ["old"]
+
+    load = asyncio.create_task(cache.get("org", slow_loader))
+    await started.wait()
+    await cache.invalidate("org")
+    release.set()
+    assert await load == ["old"]  # Callers that asked before the change still get an answer
+
+    assert await cache.get("org", _returning(["new"])) == ["new"]
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_bounded():
+    cache = SharedCache("t_bounded", ttl=60, max_entries=2)
+    for key in ("a", "b", "c"):
+        await cache.get(key, _returning(key))
+    assert list(cache._local) == ["b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_installed_modules_are_cached_until_invalidated(monkeypatch):
+    loads = []
+
+    async def load(org_id):
+        loads.append(org_id)
+        return [{"module_type": "CRM", "agent_definition": None}]
+
+    monkeypatch.setattr(module_checker, "_load_org_modules", load)
+    module_checker.invalidate_all()
+    assert await module_checker.get_installed_modules("org_1") == ["CRM"]
+    assert await module_checker.get_installed_modules("org_1") == ["CRM"]
+    await module_checker.invalidate_cache("org_1")
+    await module_checker.get_installed_modules("org_1")
+    assert loads == ["org_1", "org_1"]
+
+
+def _returning(value):
+    async def loader():
+        return value
+    return loader
@@ -0,0 +1,83 @@
+"""Tests for SSE framing, delta coalescing and frame batching."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import json
+
+import pytest
+
+from src.protocols import sse
+from src.protocols.sse import DeltaCoalescer, batch_frames, dumps, sse_frame
+
+
+def test_frame_format():
+    assert sse_frame({"a": 1}) == 'data: {"a":1}\n\n'
+    assert sse_frame("[DONE]", event="done", event_id="7") == "id: 7\nevent: done\ndata: [DONE]\n\n"
+
+
+def test_dumps_without_orjson(monkeypatch):
+    monkeypatch.setattr(sse, "orjson", None)
+    assert dumps({"path": Path("a"), "n": 1}) == '{"path":"a","n":1}'
+
+
+@pytest.mark.asyncio
+async def test_deltas_coalesce_into_one_frame():
+    coalescer = DeltaCoalescer(window=60)
+    assert all(coalescer.add(t) is None for t in ("Hel", "lo ", "world"))
+    frame = coalescer.flush()
+    assert json.loads(frame[len("data: "):]) == {"type": "message:stream", "text": "Hello world"}
+    assert coalescer.flush() is None
+
+
+@pytest.mark.asyncio
+async def test_deltas_flush_at_size_limit():
+    coalescer = DeltaCoalescer(window=60, max_chars=4)
+    assert coalescer.add("ab") is None
+    assert coalescer.add("cd") is not None
+
+
+@pytest.mark.asyncio
+async def test_burst_is_written_as_one_chunk():
+    async def frames():
+        for i in range(50):
+            yield f"data: {i}\n\n"
+        await asyncio.sleep(0.05)
+        yield "data: [DONE]\n\n"
+
+    chunks = [chunk async for chunk in batch_frames(frames(), flush_interval=0.01)]
+    assert len(chunks) == 2
+    assert "".join(chunks) == "".join(f"data: {i}\n\n" for i in range(50)) + "data: [DONE]\n\n"
+
+
+@pytest.mark.asyncio
+async def test_source_errors_surface_after_pending_frames():
+    async def frames():
+        yield "data: 1\n\n"
+        raise RuntimeError("boom")
+
+    received = []
+    with pytest.raises(RuntimeError):
+        async for chunk in batch_frames(frames(), flush_interval=0.01):
+            received.append(chunk)
+    assert received == ["data: 1\n\n"]
+
+
+@pytest.mark.asyncio
+async def test_closing_the_writer_closes_the_source():
+    closed = asyncio.Event()
+
+    async def frames():
+        try:
+            while True:
+                yield "data: x\n\n"
+                await asyncio.sleep(0)
+        finally:
+            closed.set()
+
+    writer = batch_frames(frames(), flush_interval=0)
+    await writer.__anext__()
+    await writer.aclose()
+    assert closed.is_set()
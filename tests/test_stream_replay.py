@@ -0,0 +1,154 @@
+"""Tests for resumable SSE streams with Last-Event-ID replay."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+import pytest
+
+from src.services import stream_replay, task_store
+from src.services.stream_replay import ReplayStream, resume_replay_stream, start_replay_stream
+from src.services.task_store import FallbackStore
+
+
+@pytest.fixture(autouse=True)
+def in_memory(monkeypatch):
+    async def _no_redis():
+        return None
+    monkeypatch.setattr(task_store, "_get_redis", _no_redis)
+    monkeypatch.setattr(task_store, "_fallback_store", FallbackStore())
+    monkeypatch.setattr(stream_replay, "_streams", {})
+
+
+async def _collect(frames, limit=None):
+    out = []
+    async for frame in frames:
+        out.append(frame)
+        if limit and len(out) == limit:
+            break
+    return out
+
+
+@pytest.mark.asyncio
+async def test_frames_are_sequenced():
+    async def source():
+        yield "data: a\n\n"
+        yield "data: b\n\n"
+
+    stream = start_replay_stream("t1", source())
+    frames = await asyncio.wait_for(_collect(stream.follow()), 1)
+    assert frames == ["id: 1\ndata: a\n\n", "id: 2\ndata: b\n\n"]
+
+
+@pytest.mark.asyncio
+async def test_reconnect_resumes_without_rerunning():
+    runs = []
+    release = asyncio.Event()
+
+    async def source():
+        runs.append(1)
+        for i in range(3):
+            yield f"data: {i}\n\n"
+        await release.wait()
+        yield "data: [DONE]\n\n"
+
+    stream = start_replay_stream("t2", source())
+    first = await asyncio.wait_for(_collect(stream.follow(), limit=1), 1)  # Client drops here
+    assert first == ["id: 1\ndata: 0\n\n"]
+
+    resumed = await resume_replay_stream("t2", after=1)
+    release.set()
+    frames = await asyncio.wait_for(_collect(resumed), 1)
+    assert frames == ["id: 2\ndata: 1\n\n", "id: 3\ndata: 2\n\n", "id: 4\ndata: [DONE]\n\n"]
+    assert runs == [1]
+
+
+@pytest.mark.asyncio
+async def test_finished_stream_replays_from_store():
+    async def source():
+        yield "data: x\n\n"
+        yield "data: y\n\n"
+
+    stream = start_replay_stream("t3", source())
+    await asyncio.wait_for(_collect(stream.follow()), 1)
+    await asyncio.sleep(0)
+    assert "t3" not in stream_replay._streams
+
+    frames = await asyncio.wait_for(_collect(await resume_replay_stream("t3", after=1)), 1)
+    assert frames == ["id: 2\ndata: y\n\n"]
+
+
+@pytest.mark.asyncio
+async def test_trimmed_buffer_reports_gap():
+    stream = ReplayStream("t4", max_events=2)
+    for i in range(4):
+        await stream.append(f"data: {i}\n\n")
+    await stream.finish()
+
+    frames = await _collect(stream.follow(after=0))
+    assert frames[0].startswith("event: replay_gap")
+    assert '"missed_to": 2' in frames[0]
+    assert frames[1:] == ["id: 3\ndata: 2\n\n", "id: 4\ndata: 3\n\n"]
+
+
+@pytest.mark.asyncio
+async def test_unknown_stream_returns_none():
+    assert await resume_replay_stream("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_followers_are_not_held_up_by_store_writes(monkeypatch):
+    batches = []
+    store_up = asyncio.Event()
+    real_extend = stream_replay.list_extend
+
+    async def stalled_extend(key, items, **kwargs):
+        await store_up.wait()
+        batches.append(len(items))
+        return await real_extend(key, items, **kwargs)
+
+    monkeypatch.setattr(stream_replay, "list_extend", stalled_extend)
+    stream = ReplayStream("t5")
+    follower = asyncio.ensure_future(_collect(stream.follow(), limit=20))
+    await asyncio.sleep(0)
+    for i in range(20):
+        await stream.append(f"data: {i}\n\n")
+    frames = await asyncio.wait_for(follower, 1)
+    assert len(frames) == 20
+    assert batches == []  # Delivered while the store write is still stuck
+
+    store_up.set()
+    await asyncio.wait_for(stream.finish(), 1)
+    assert sum(batches) == 21  # Every frame plus the end marker
+    assert len(batches) < 5
+    stored = await task_store.list_range(stream_replay._replay_key("t5"))
+    assert stored[-1].get("end") and len(stored) == 21
+
+
+@pytest.mark.asyncio
+async def test_remote_follower_reads_only_new_entries(monkeypatch):
+    reads = []
+    real_range = stream_replay.list_range
+
+    async def recording_range(key, start=0, end=-1):
+        entries = await real_range(key, start, end)
+        reads.append(len(entries))
+        return entries
+
+    monkeypatch.setattr(stream_replay, "list_range", recording_range)
+    stream = ReplayStream("t6")  # Owned by another replica: not in _streams
+    for i in range(50):
+        await stream.append(f"data: {i}\n\n")
+    await stream.flush()
+
+    follower = await resume_replay_stream("t6", after=48, poll_interval=0.01)
+    task = asyncio.ensure_future(_collect(follower))
+    await asyncio.sleep(0.03)
+    await stream.append("data: 50\n\n")
+    await stream.finish()
+    frames = await asyncio.wait_for(task, 1)
+
+    assert frames == ["id: 49\ndata: 48\n\n", "id: 50\ndata: 49\n\n", "id: 51\ndata: 50\n\n"]
+    assert max(reads) <= 2  # Never the whole 51-entry buffer
@@ -0,0 +1,267 @@
+"""Tests for the task store's field-level updates and in-memory fallback."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import json
+
+import pytest
+
+from src.services import task_store
+from src.services.task_store import (
+    FallbackStore, TaskEventHub, save_task, get_task, update_task,
+    compare_and_set_task, subscribe_task_events, ACTIVE_TASK_STATUSES,
+)
+
+
+@pytest.fixture(autouse=True)
+def fallback_store(monkeypatch):
+    async def _no_redis():
+        return None
+    monkeypatch.setattr(task_store, "_get_redis", _no_redis)
+    monkeypatch.setattr(task_store, "_fallback_store", FallbackStore())
+    monkeypatch.setattr(task_store, "_task_events", TaskEventHub())
+
+
+def _cas(redis, keys, args):
+    """Python twin of task_store._CAS_SCRIPT."""
+    task = redis.hashes.get(keys[0])
+    if task is None:
+        return -1
+    for field, allowed in json.loads(args[0]).items():
+        if task.get(field) not in allowed:
+            return 0
+    task.update(json.loads(args[1]))
+    version = int(task.get("_version", 0)) + 1
+    task["_version"] = str(version)
+    redis.ttls[keys[0]] = int(args[2])
+    redis.published.append((args[3], '{"version":%d,"updates":%s}' % (version, args[1])))
+    return 1
+
+
+def _migrate(redis, keys, args):
+    """Python twin of task_store._MIGRATE_SCRIPT."""
+    if keys[0] in redis.hashes or redis.strings.get(keys[1]) != args[0]:
+        return 0
+    redis.hashes[keys[0]] = json.loads(args[1])
+    redis.ttls[keys[0]] = int(args[2])
+    del redis.strings[keys[1]]
+    return 1
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    from tests.fake_redis import FakeRedis
+
+    r = FakeRedis()
+    r.scripts[task_store._CAS_SCRIPT.strip()] = _cas
+    r.scripts[task_store._MIGRATE_SCRIPT.strip()] = _migrate
+
+    async def _redis():
+        return r
+    monkeypatch.setattr(task_store, "_get_redis", _redis)
+    monkeypatch.setattr(task_store, "_cas_script", None)
+    monkeypatch.setattr(task_store, "_migrate_script", None)
+    return r
+
+
+@pytest.mark.asyncio
+async def test_update_sets_fields_without_touching_others():
+    await save_task("t1", {"status": "pending", "result": {"output": "x" * 100}})
+    assert await update_task("t1", {"status": "running"})
+    task = await get_task("t1")
+    assert task == {"status": "running", "result": {"output": "x" * 100}}
+
+
+@pytest.mark.asyncio
+async def test_update_missing_task_is_a_noop():
+    assert not await update_task("missing", {"status": "running"})
+    assert await get_task("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_compare_and_set_rejects_mismatch():
+    await save_task("t2", {"status": "cancelled"})
+    applied = await compare_and_set_task("t2", {"status": "completed"}, {"status": "running"})
+    assert not applied
+    assert (await get_task("t2"))["status"] == "cancelled"
+
+
+@pytest.mark.asyncio
+async def test_compare_and_set_accepts_any_allowed_value():
+    await save_task("t3", {"status": "pending"})
+    assert await compare_and_set_task(
+        "t3", {"status": "cancelled"}, {"status": ACTIVE_TASK_STATUSES}
+    )
+    assert (await get_task("t3"))["status"] == "cancelled"
+
+
+@pytest.mark.asyncio
+async def test_get_task_projects_fields():
+    await save_task("t4", {"status": "completed", "result": {"ok": True}})
+    assert await get_task("t4", fields=["status", "error"]) == {
+        "status": "completed",
+        "error": None,
+    }
+
+
+def test_fallback_store_expires_entries(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(task_store.time, "monotonic", lambda: clock[0])
+    store = FallbackStore()
+    store.set("session:a", {"messages": []}, ttl=60)
+    assert store.get("session:a") == {"messages": []}
+    clock[0] += 61
+    assert store.get("session:a") is None
+    assert store.stats()["expirations"] == 1
+    assert store.size_bytes == 0
+
+
+def test_fallback_store_evicts_least_recently_used_by_size():
+    value = {"payload": "x" * 100}
+    entry_size = len(task_store.json.dumps(value).encode())
+    store = FallbackStore(max_bytes=entry_size * 2)
+    store.set("a", dict(value), ttl=60)
+    store.set("b", dict(value), ttl=60)
+    store.get("a")  # a is now most recently used
+    store.set("c", dict(value), ttl=60)
+    assert "a" in store and "c" in store
+    assert "b" not in store
+    assert store.stats()["evictions"] == 1
+    assert store.size_bytes == entry_size * 2
+
+
+@pytest.mark.asyncio
+async def test_update_remeasures_fallback_entry():
+    await save_task("t5", {"status": "running"})
+    before = task_store._fallback_store.size_bytes
+    await update_task("t5", {"result": {"output": "y" * 500}})
+    assert task_store._fallback_store.size_bytes > before + 500
+
+
+@pytest.mark.asyncio
+async def test_update_size_tracks_encoded_size():
+    await save_task("t6", {"status": "running", "result": {"output": "a" * 300}})
+    await update_task("t6", {"result": {"output": "b"}, "error": "x" * 200})
+    task = task_store._fallback_store.get(task_store._task_key("t6"))
+    exact = FallbackStore._sizeof(task)
+    assert abs(task_store._fallback_store.size_bytes - exact) <= 8
+
+
+@pytest.mark.asyncio
+async def test_list_extend_does_not_reencode_whole_list(monkeypatch):
+    for i in range(50):
+        await task_store.list_extend("grow", [{"n": i, "text": "z" * 20}], maxlen=30)
+    store = task_store._fallback_store
+    exact = FallbackStore._sizeof(store.get("grow"))
+    assert abs(store.size_bytes - exact) <= 8
+
+    encoded = []
+    real = FallbackStore._sizeof
+    monkeypatch.setattr(FallbackStore, "_sizeof", staticmethod(lambda v: encoded.append(v) or real(v)))
+    await task_store.list_extend("grow", [{"n": 50}], maxlen=30)
+    assert all(not (isinstance(v, dict) and "items" in v) for v in encoded)
+    assert len(encoded) == 2  # the new item and the one trimmed
+
+
+@pytest.mark.asyncio
+async def test_writes_publish_versioned_deltas():
+    await save_task("t6", {"status": "pending", "result": None})
+    async with subscribe_task_events("t6") as events:
+        await update_task("t6", {"status": "running"})
+        event = events.get_nowait()
+    assert event == {"version": 2, "updates": {"status": "running"}}
+    assert await get_task("t6") == {"status": "running", "result": None}
+
+
+@pytest.mark.asyncio
+async def test_rejected_compare_and_set_publishes_nothing():
+    await save_task("t7", {"status": "completed"})
+    async with subscribe_task_events("t7") as events:
+        await compare_and_set_task("t7", {"status": "failed"}, {"status": "running"})
+        assert events.empty()
+
+
+@pytest.mark.asyncio
+async def test_long_poll_wakes_with_delta():
+    from src.api.routes import wait_for_task_status
+
+    await save_task("t8", {"status": "pending", "result": None})
+
+    async def _finish():
+        await asyncio.sleep(0.01)
+        await update_task("t8", {"status": "completed", "result": {"ok": True}})
+
+    finisher = asyncio.create_task(_finish())
+    change = await wait_for_task_status("t8", version=1, timeout=2)
+    await finisher
+    assert change.version == 2
+    assert change.changes == {"status": "completed", "result": {"ok": True}}
+    assert change.is_complete and not change.snapshot
+
+
+@pytest.mark.asyncio
+async def test_long_poll_returns_snapshot_when_behind():
+    from src.api.routes import wait_for_task_status
+
+    await save_task("t9", {"status": "pending"})
+    await update_task("t9", {"status": "running"})
+    change = await wait_for_task_status("t9", version=0, timeout=0)
+    assert change.snapshot
+    assert change.version == 2
+    assert change.changes == {"status": "running"}
+
+
+@pytest.mark.asyncio
+async def test_long_poll_times_out_without_change():
+    from src.api.routes import wait_for_task_status
+
+    await save_task("t10", {"status": "running"})
+    change = await wait_for_task_status("t10", version=1, timeout=0.01)
+    assert change.timed_out
+    assert change.changes == {}
+
+
+# ── Redis hashes ────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_redis_compare_and_set_bumps_version_and_publishes(fake_redis):
+    await save_task("r1", {"status": "pending", "result": None})
+    assert fake_redis.hashes["task_fields:r1"]["_version"] == "1"
+
+    assert await compare_and_set_task("r1", {"status": "running"}, {"status": ACTIVE_TASK_STATUSES})
+    assert fake_redis.hashes["task_fields:r1"]["_version"] == "2"
+    channel, message = fake_redis.published[-1]
+    assert channel == "task_events:r1"
+    assert json.loads(message) == {"version": 2, "updates": {"status": '"running"'}}
+    assert await get_task("r1") == {"status": "running", "result": None}
+    assert await get_task("r1", fields=["status", "error"]) == {"status": "running", "error": None}
+
+
+@pytest.mark.asyncio
+async def test_redis_compare_and_set_conflict_changes_nothing(fake_redis):
+    await save_task("r2", {"status": "cancelled"})
+    published = len(fake_redis.published)
+
+    assert not await compare_and_set_task("r2", {"status": "completed"}, {"status": "running"})
+    assert fake_redis.hashes["task_fields:r2"]["_version"] == "1"
+    assert len(fake_redis.published) == published
+    assert (await get_task("r2"))["status"] == "cancelled"
+    assert not await update_task("missing", {"status": "running"})
+
+
+@pytest.mark.asyncio
+async def test_redis_reads_and_migrates_legacy_json_tasks(fake_redis):
+    fake_redis.strings["task:old"] = json.dumps({"status": "running", "result": None})
+
+    assert await get_task("old") == {"status": "running", "result": None}
+    assert await get_task("old", fields=["status"]) == {"status": "running"}
+    assert await task_store.task_exists("old")
+
+    assert await update_task("old", {"status": "completed", "result": {"ok": True}})
+    assert "task:old" not in fake_redis.strings
+    assert fake_redis.ttls["task_fields:old"] == task_store.TASK_TTL
+    assert fake_redis.hashes["task_fields:old"]["_version"] == "2"
+    assert await get_task("old") == {"status": "completed", "result": {"ok": True}}
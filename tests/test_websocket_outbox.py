@@ -0,0 +1,115 @@
+"""Tests for per-connection WebSocket outbound queues and fan-out."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import json
+
+import pytest
+
+import src.services  # noqa: F401 -- import before src.api to avoid the agents/services cycle
+from src.api.websocket import ConnectionManager, ConnectionOutbox, OverflowPolicy
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent: list[dict] = []
+        self.closed_with = None
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.gate.wait()
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed_with = code
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_stall_broadcast():
+    manager = ConnectionManager(send_queue_size=16, overflow_policy=OverflowPolicy.DROP_OLDEST)
+    slow, fast = FakeWebSocket(), FakeWebSocket()
+    slow.gate.clear()  # Slow client never drains
+    await manager.connect("slow", slow)
+    await manager.connect("fast", fast)
+
+    await asyncio.wait_for(manager.broadcast("message:stream", {"delta": "hi"}), 0.1)
+    await _settle()
+    assert fast.sent == [{"type": "message:stream", "payload": {"delta": "hi"}}]
+    assert slow.sent == []
+    manager.disconnect("slow")
+    manager.disconnect("fast")
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_policy():
+    ws = FakeWebSocket()
+    ws.gate.clear()
+    outbox = ConnectionOutbox("c", ws, max_size=2, policy=OverflowPolicy.DROP_OLDEST)
+    await _settle()  # Writer is now blocked holding nothing
+    for i in range(4):
+        outbox.put("message:stream", json.dumps({"i": i}))
+    ws.gate.set()
+    await _settle()
+    assert ws.sent == [{"i": 2}, {"i": 3}]
+    assert outbox.dropped == 2
+    outbox.close()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_keeps_latest_state_update():
+    ws = FakeWebSocket()
+    ws.gate.clear()
+    outbox = ConnectionOutbox("c", ws, max_size=2, policy=OverflowPolicy.COALESCE)
+    await _settle()
+    outbox.put("state:update", json.dumps({"state": "thinking"}))
+    outbox.put("message:stream", json.dumps({"delta": "a"}))
+    outbox.put("state:update", json.dumps({"state": "working"}))
+    ws.gate.set()
+    await _settle()
+    assert ws.sent == [{"delta": "a"}, {"state": "working"}]
+    outbox.close()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_socket():
+    ws = FakeWebSocket()
+    ws.gate.clear()
+    outbox = ConnectionOutbox("c", ws, max_size=1, policy=OverflowPolicy.DISCONNECT)
+    await _settle()
+    assert outbox.put("message:stream", "{}")
+    assert not outbox.put("message:stream", "{}")
+    await _settle()
+    assert ws.closed_with == 1013
+    assert not outbox.put("message:stream", "{}")
+
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_never_drops_stream_frames():
+    ws = FakeWebSocket()
+    ws.gate.clear()
+    outbox = ConnectionOutbox("c", ws, max_size=2, policy=OverflowPolicy.COALESCE)
+    await _settle()
+    assert outbox.put("message:stream", json.dumps({"delta": "a"}))
+    assert outbox.put("message:stream", json.dumps({"delta": "b"}))
+
+    # Nothing left that may be dropped: the slow client is disconnected
+    # rather than sent a message with a hole in it
+    assert not outbox.put("message:complete", json.dumps({"done": True}))
+    await _settle()
+    assert ws.closed_with == 1013
+    assert outbox.dropped == 0
+    assert not outbox.put("state:update", "{}")
@@ -0,0 +1,110 @@
+"""Tests for tracked, cancellable WebSocket agent runs."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+import pytest
+
+import src.services  # noqa: F401 -- import before src.api to avoid the agents/services cycle
+from src.agents.base import AgentContext, BaseAgent
+from src.api import websocket
+from src.api.websocket import ConnectionManager
+from src.services.session_cache import CachedSession
+
+
+class HangingClient:
+    """LLM client whose request never returns until cancelled."""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.closed = False
+
+    async def chat(self, **kwargs):
+        self.started.set()
+        await asyncio.Event().wait()
+
+    async def close(self):
+        self.closed = True
+
+
+class SlowAgent(BaseAgent):
+    def __init__(self, client):
+        super().__init__(client=client, model="test-model")
+        self.agent_closed = False
+
+    @property
+    def name(self) -> str:
+        return "slow_agent"
+
+    @property
+    def system_prompt(self) -> str:
+        return "You are slow."
+
+    def _define_tools(self) -> list[dict]:
+        return []
+
+    async def _execute_tool(self, tool_name, tool_input):
+        return ""
+
+    async def close(self):
+        self.agent_closed = True
+
+
+def _context() -> AgentContext:
+    return AgentContext(tenant_id="org_1", user_id="user_1", task="hello", chat_id="chat_1")
+
+
+@pytest.mark.asyncio
+async def test_cancelling_run_closes_agent_clients():
+    client = HangingClient()
+    agent = SlowAgent(client)
+    task = asyncio.create_task(agent.run(_context()))
+    await asyncio.wait_for(client.started.wait(), 1)
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert client.closed
+    assert agent.agent_closed
+
+
+@pytest.mark.asyncio
+async def test_runs_are_capped_per_connection():
+    manager = ConnectionManager(max_concurrent_runs=2)
+    gate = asyncio.Event()
+
+    async def run():
+        await gate.wait()
+
+    assert manager.start_run("chat_1", run()) is not None
+    assert manager.start_run("chat_1", run()) is not None
+    assert manager.start_run("chat_1", run()) is None
+    assert manager.start_run("chat_2", run()) is not None
+
+    gate.set()
+    await asyncio.sleep(0.01)
+    assert manager.runs == {}
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_in_flight_ws_run(monkeypatch):
+    from src.api import routes
+
+    client = HangingClient()
+    agent = SlowAgent(client)
+    monkeypatch.setattr(routes, "get_agent", lambda agent_type: agent)
+    manager = ConnectionManager(max_concurrent_runs=1)
+    monkeypatch.setattr(websocket, "manager", manager)
+
+    session = CachedSession(state={"agent_type": "brief", "model": None, "messages": []})
+    task = manager.start_run("chat_1", websocket._run_agent_for_ws("chat_1", session, _context()))
+    await asyncio.wait_for(client.started.wait(), 1)
+
+    assert await manager.cancel_runs("chat_1") == 1
+    assert task.cancelled()
+    assert client.closed and agent.agent_closed
+    assert "chat_1" not in manager.runs
+    assert session.agent is None  # A cancelled agent is never reused
@@ -0,0 +1,74 @@
+"""Tests for compiled workflow condition expressions."""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.orchestration.conditions import compile_condition, ConditionError
+from src.orchestration.workflow import WorkflowCondition, WorkflowStep, Workflow, WorkflowTrigger, TriggerType
+from src.orchestration.templates import WorkflowTemplates
+
+
+def _ctx(context=None, results=None, previous_step=None):
+    return {"context": context or {}, "results": results or {}, "previous_step": previous_step or {}}
+
+
+class TestWorkflowCondition:
+
+    def test_attribute_access_reads_context_dict(self):
+        cond = WorkflowCondition("context.client_tier == 'premium'")
+        assert cond.evaluate(_ctx(context={"client_tier": "premium"}))
+        assert not cond.evaluate(_ctx(context={"client_tier": "basic"}))
+
+    def test_missing_key_is_none(self):
+        cond = WorkflowCondition("context.facebook_ad_account != None")
+        assert not cond.evaluate(_ctx())
+        assert cond.evaluate(_ctx(context={"facebook_ad_account": "act_1"}))
+
+    def test_len_and_membership(self):
+        assert WorkflowCondition("len(context.urls) > 1").evaluate(_ctx(context={"urls": ["a", "b"]}))
+        cond = WorkflowCondition("context.content_type in ['sponsored', 'ad']")
+        assert cond.evaluate(_ctx(context={"content_type": "ad"}))
+
+    def test_previous_step_and_results(self):
+        cond = WorkflowCondition("previous_step.status == 'success' and results.qa.score >= 80")
+        ctx = _ctx(results={"qa": {"score": 90}}, previous_step={"status": "success"})
+        assert cond.evaluate(ctx)
+
+    def test_runtime_error_evaluates_false(self):
+        assert not WorkflowCondition("len(context.missing) > 0").evaluate(_ctx())
+
+    @pytest.mark.parametrize("expression", [
+        "__import__('os').system('true')",
+        "context.__class__",
+        "open('/etc/passwd')",
+        "[x for x in context]",
+        "lambda: 1",
+        "context.x ==",
+    ])
+    def test_unsafe_or_invalid_expressions_rejected(self, expression):
+        with pytest.raises(ConditionError):
+            compile_condition(expression)
+        cond = WorkflowCondition(expression)
+        assert cond.error
+        assert not cond.evaluate(_ctx())
+
+    def test_compiled_once_per_expression(self):
+        assert compile_condition("context.a == 1") is compile_condition("context.a == 1")
+
+    def test_validate_reports_invalid_condition(self):
+        step = WorkflowStep(id="s1", name="S1", agent="qa", tool="t",
+                            condition=WorkflowCondition("open('x')"))
+        workflow = Workflow(id="w", name="W", description="", steps=[step],
+                            trigger=WorkflowTrigger(type=TriggerType.MANUAL))
+        is_valid, errors = workflow.validate()
+        assert not is_valid
+        assert "invalid condition" in errors[0]
+
+    def test_template_conditions_compile(self):
+        for workflow in WorkflowTemplates.get_all_templates().values():
+            for step in workflow.steps:
+                if step.condition:
+                    assert step.condition.error is None, step.condition.expression